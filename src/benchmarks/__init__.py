@@ -0,0 +1,5 @@
+"""
+Offline benchmark suite. OpenAI and Twitter calls are stubbed, so no keys or network access are needed.
+Execute from command line (from the src directory):
+python -m benchmarks.run
+"""
@@ -0,0 +1,16 @@
+"""
+ContentObject serialize and deserialize throughput.
+"""
+
+from content import TwitterContentObject
+from .common import measure, stub_gen, stub_post, stub_auth
+
+
+def run(quick: bool = False) -> dict:
+    co = TwitterContentObject(gen_func=stub_gen, post_func=stub_post, auth_func=stub_auth, cron="0 12 * * *")
+    co.run_gen_func()
+    serialized = co.serialize()
+    number = 20 if quick else 200
+    return {"serialize": measure(co.serialize, number=number),
+            # deserialize converts values in place, so each call gets a fresh copy
+            "deserialize": measure(lambda: TwitterContentObject.deserialize(dict(serialized)), number=number)}
@@ -0,0 +1,30 @@
+"""
+image_editor render speed per output format, with cold (cleared) and warm in-memory font and image caches.
+"""
+
+import os
+import tempfile
+
+from modules.image_editor import Templates, cache
+from .common import measure
+
+IMAGES_PATH = "../assets/images"
+TEXT = "The impediment to action advances action. What stands in the way becomes the way."
+
+
+def run(quick: bool = False) -> dict:
+    image_file_path = os.path.join(IMAGES_PATH, sorted(os.listdir(IMAGES_PATH))[0])
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        for output_format in ("PNG", "JPEG", "WEBP"):
+            def render():
+                Templates.image_with_text(image_file_path=image_file_path, text=TEXT, output_path=tmp_dir,
+                                          output_format=output_format, file_name=f"benchmark.{output_format}")
+
+            def render_cold():
+                cache.clear()
+                render()
+
+            results[output_format] = {"cold": measure(render_cold, repeat=2 if quick else 5),
+                                      "warm": measure(render, repeat=2 if quick else 5)}
+    return results
@@ -0,0 +1,52 @@
+"""
+Scheduler refresh time (core jobs _update_database and _update_scheduler) at 10/100/1000 content objects.
+"""
+
+import os
+import time
+import tempfile
+
+import scheduler
+from .common import measure
+
+SIZES = (10, 100, 1000)
+
+
+def _config(n: int, sql_database: str) -> dict:
+    # Distinct cron expressions, so every content object has its own hash
+    return {"paths": {"sql_database": sql_database},
+            "scheduler": {"content_object_params": [
+                {"gen_func": "benchmarks.common.stub_gen",
+                 "post_func": "benchmarks.common.stub_post",
+                 "auth_func": "benchmarks.common.stub_auth",
+                 "cron": f"{i % 60} {(i // 60) % 24} * * *",
+                 "is_authorized": False,
+                 "keys_path": None} for i in range(n)]}}
+
+
+def run(quick: bool = False) -> dict:
+    results = {}
+    load_config = scheduler._load_config
+    try:
+        for n in SIZES[:2] if quick else SIZES:
+            with tempfile.TemporaryDirectory() as tmp_dir:
+                config = _config(n, os.path.join(tmp_dir, "benchmark.db"))
+                scheduler._load_config = lambda: config
+
+                # Startup only schedules stored content. The first update generates, authorizes and stores every
+                # content object, later updates find them all in the database.
+                start = time.perf_counter()
+                s = scheduler.Scheduler()
+                startup = time.perf_counter() - start
+                start = time.perf_counter()
+                s._update_database()
+                first_update = time.perf_counter() - start
+
+                results[n] = {"startup": startup,
+                              "first_update_database": first_update,
+                              "update_database": measure(s._update_database, repeat=3),
+                              "update_scheduler": measure(s._update_scheduler, repeat=3),
+                              "jobs": len(s.get_jobs())}
+    finally:
+        scheduler._load_config = load_config
+    return results
@@ -0,0 +1,46 @@
+"""
+sqlite_db.Database upsert and select rates on a content object table.
+"""
+
+import os
+import tempfile
+
+from content import TwitterContentObject
+from modules import sqlite_db
+from .common import measure, stub_gen, stub_post, stub_auth
+
+SIZES = (10, 100, 1000)
+
+
+def _rows(n: int) -> tuple[list[str], list[list[str]]]:
+    co = TwitterContentObject(gen_func=stub_gen, post_func=stub_post, auth_func=stub_auth, cron="0 12 * * *")
+    co.run_gen_func()
+    row = co.serialize()
+    fields = list(row.keys())
+    return fields, [[f"{i:064x}" if field == "hash" else row[field] for field in fields] for i in range(n)]
+
+
+def run(quick: bool = False) -> dict:
+    results = {}
+    table_name = TwitterContentObject.__name__
+    for n in SIZES[:2] if quick else SIZES:
+        fields, rows = _rows(n)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            db = sqlite_db.Database(db_file_path=os.path.join(tmp_dir, "benchmark.db"))
+            db.create_table(table_name=table_name, fields=fields)
+
+            def upsert_each():
+                for values in rows:
+                    db.update(table_name=table_name, fields=fields, values=values, where=f"hash='{values[0]}'")
+
+            hash_index = fields.index("hash")
+            results[n] = {
+                "upsert_each": measure(upsert_each, repeat=3),
+                "update_many": measure(lambda: db.update_many(table_name=table_name, fields=fields, rows=rows,
+                                                              key_field="hash"), repeat=3),
+                "select_all": measure(lambda: db.select(table_name=table_name, fields="*", where=""), repeat=5),
+                "select_by_hash": measure(lambda: db.select(table_name=table_name, fields="*",
+                                                            where=f"hash='{rows[-1][hash_index]}'"), repeat=5),
+            }
+            db.close()
+    return results
@@ -0,0 +1,22 @@
+"""
+VectorDB load and query latency on the bundled corpora.
+"""
+
+from pathlib import Path
+
+from modules.vector_db import VectorDB
+from .common import measure, stub_embedding
+
+VECTOR_DB_DIR = "../databases/vector"
+
+
+def run(quick: bool = False) -> dict:
+    results = {}
+    for storage_file in sorted(Path(VECTOR_DB_DIR).glob("*/*.pickle.gz")):
+        vdb = VectorDB(None, embedding_function=stub_embedding)
+        load = measure(lambda: vdb.load(str(storage_file)), repeat=1 if quick else 3)
+        query = {f"top_{top_k}": measure(lambda: vdb.query("What is virtue?", top_k=top_k),
+                                         repeat=5 if quick else 20)
+                 for top_k in (1, 5)}
+        results[storage_file.parent.name] = {"documents": len(vdb.documents), "load": load, "query": query}
+    return results
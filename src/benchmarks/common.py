@@ -0,0 +1,69 @@
+"""
+Shared timing helpers and stubs for the benchmark suite.
+"""
+
+import time
+import zlib
+import statistics
+
+import numpy as np
+
+EMBEDDING_DIMENSIONS = 1536  # text-embedding-ada-002
+
+
+def measure(func: callable, repeat: int = 5, number: int = 1) -> dict:
+    """
+    Time a function.
+    :param func: Function without arguments
+    :param repeat: Number of timed rounds
+    :param number: Calls per round
+    :return: Dict of seconds per call (min, median, mean, max) and calls per second (from the median)
+    """
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for _ in range(number):
+            func()
+        times.append((time.perf_counter() - start) / number)
+    median = statistics.median(times)
+    return {"min": min(times),
+            "median": median,
+            "mean": statistics.mean(times),
+            "max": max(times),
+            "per_second": 1 / median if median else float("inf")}
+
+
+def stub_embedding(documents: list, dimensions: int = EMBEDDING_DIMENSIONS) -> np.ndarray:
+    """
+    Deterministic stand-in for the OpenAI embedding endpoint. Texts map to fixed pseudo-random unit vectors.
+    """
+    vectors = []
+    for document in documents:
+        text = document if isinstance(document, str) else str(document)
+        rng = np.random.default_rng(zlib.crc32(text.encode()))
+        vector = rng.standard_normal(dimensions).astype(np.float32)
+        vectors.append(vector / np.linalg.norm(vector))
+    return np.array(vectors)
+
+
+def stub_gen(keys: dict) -> dict:
+    """
+    Stand-in for a generator. Returns a thread long enough to be split, as the LLM generators do.
+    """
+    return {"text": "The impediment to action advances action. What stands in the way becomes the way.",
+            "thread": " ".join(["You have power over your mind - not outside events. Realize this, and you will find "
+                                "strength."] * 6)}
+
+
+def stub_post(content_dict: dict, keys: dict) -> str:
+    """
+    Stand-in for twitter_api.create_tweet.
+    """
+    return "0"
+
+
+def stub_auth(content_dict: dict, keys: dict) -> bool:
+    """
+    Stand-in for discord_api.authorize_content. Approves everything.
+    """
+    return True
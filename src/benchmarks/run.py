@@ -0,0 +1,94 @@
+"""
+Run the benchmark suite and write the results to JSON. Pass a previous results file as --baseline to print how each
+median changed.
+Execute from command line (from the src directory):
+python -m benchmarks.run
+python -m benchmarks.run --only vector_db sqlite --baseline ../logs/benchmarks/<previous>.json
+"""
+
+import sys
+import json
+import time
+import logging
+import platform
+import argparse
+import importlib
+import traceback
+from pathlib import Path
+
+BENCHMARKS = ("vector_db", "content", "sqlite", "render", "scheduler")
+
+
+def _medians(results: dict, prefix: str = "") -> dict:
+    """
+    Flatten results to a dict of "path.to.measurement" -> median seconds.
+    """
+    medians = {}
+    for k, v in results.items():
+        if isinstance(v, dict) and "median" in v:
+            medians[f"{prefix}{k}"] = v["median"]
+        elif isinstance(v, dict):
+            medians.update(_medians(v, f"{prefix}{k}."))
+    return medians
+
+
+def compare(results: dict, baseline: dict) -> str:
+    """
+    Compare medians with a baseline run.
+    :param results: Results of this run
+    :param baseline: Results of a previous run
+    :return: Report, one line per measurement found in both runs
+    """
+    current = _medians(results["results"])
+    previous = _medians(baseline["results"])
+    lines = []
+    for key in sorted(current.keys() & previous.keys()):
+        ratio = current[key] / previous[key] if previous[key] else float("inf")
+        flag = "  REGRESSION" if ratio > 1.2 else ""
+        lines.append(f"{key:<60}{previous[key] * 1000:>12.3f} ms{current[key] * 1000:>12.3f} ms{ratio:>8.2f}x{flag}")
+    return "\n".join(lines)
+
+
+def main():
+    # Get command line arguments
+    parser = argparse.ArgumentParser(description="Run the offline benchmark suite.")
+    parser.add_argument("--only", nargs="+", choices=BENCHMARKS, default=BENCHMARKS, help="Benchmarks to run.")
+    parser.add_argument("--quick", action="store_true", help="Fewer rounds and sizes, for a fast sanity check.")
+    parser.add_argument("--output", type=str, default=None,
+                        help="Results file. Defaults to ../logs/benchmarks/<timestamp>.json.")
+    parser.add_argument("--baseline", type=str, default=None, help="Previous results file to compare against.")
+    args = parser.parse_args()
+
+    # Keep the per-object log lines of the scheduler out of the timings
+    logging.disable(logging.INFO)
+
+    results = {"started": time.strftime("%Y-%m-%dT%H:%M:%S"),
+               "python": sys.version.split()[0],
+               "platform": platform.platform(),
+               "quick": args.quick,
+               "results": {}}
+    for name in args.only:
+        print(f"Running {name}...")
+        start = time.perf_counter()
+        try:
+            module = importlib.import_module(f"benchmarks.bench_{name}")
+            results["results"][name] = module.run(quick=args.quick)
+        except Exception as e:
+            # e.g. an optional dependency missing for this benchmark; the others still run
+            traceback.print_exc()
+            results["results"][name] = {"error": repr(e)}
+        print(f"Finished {name} in {time.perf_counter() - start:.1f} seconds.")
+
+    output = Path(args.output or f"../logs/benchmarks/{time.strftime('%Y%m%d-%H%M%S')}.json")
+    output.parent.mkdir(parents=True, exist_ok=True)
+    with open(output, "w") as f:
+        json.dump(results, f, indent=4)
+    print(f"Results written to {output}")
+
+    if args.baseline:
+        with open(args.baseline, "r") as f:
+            print(compare(results, json.load(f)))
+
+
+if __name__ == "__main__":
+    main()
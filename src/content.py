@@ -4,14 +4,49 @@ Content Object definitions.
 
 import ast
 import json
+import time
+import logging
+import datetime
 from dataclasses import dataclass
 from copy import deepcopy
+from contextlib import ExitStack
 import pickle
 from hashlib import sha256
 import inspect
 
 import croniter
 
+from modules import thread_splitter, metrics, tracing, cron_planner
+from modules.imports import lazy_import
+
+twitter_api = lazy_import("modules.twitter_api")  # Only loaded by content with media to upload
+
+logger = logging.getLogger(__name__)
+
+
+def _convert_value(v: str):
+    """
+    Convert a serialized value to its type
+    :param v: Serialized value
+    :return: Value
+    """
+    if v == "None":
+        return None
+    elif v == "True":
+        return True
+    elif v == "False":
+        return False
+    elif v.isdigit():
+        return int(v)
+    elif v.replace(".", "", 1).isdigit():
+        return float(v)
+    # Check if object is a dict or list
+    elif v.startswith("{") and v.endswith("}"):
+        return _convert_value_types(ast.literal_eval(v))
+    elif v.startswith("[") and v.endswith("]"):
+        return [_convert_value(x) if isinstance(x, str) else x for x in ast.literal_eval(v)]
+    return v
+
 
 def _convert_value_types(attr_dict: dict) -> dict:
     """
@@ -20,25 +55,8 @@ def _convert_value_types(attr_dict: dict) -> dict:
     :return: Dict of ContentObject
     """
     for k, v in attr_dict.items():
-        if v == "None":
-            attr_dict[k] = None
-        elif v == "True":
-            attr_dict[k] = True
-        elif v == "False":
-            attr_dict[k] = False
-        elif v.isdigit():
-            attr_dict[k] = int(v)
-        elif v.replace(".", "", 1).isdigit():
-            attr_dict[k] = float(v)
-        # Check if object is a dict or list
-        elif v.startswith("{") and v.endswith("}"):
-            attr_dict[k] = ast.literal_eval(v)
-            attr_dict[k] = _convert_value_types(attr_dict[k])
-        elif v.startswith("[") and v.endswith("]"):
-            attr_dict[k] = ast.literal_eval(v)
-            attr_dict[k] = _convert_value_types(attr_dict[k])
-        else:
-            attr_dict[k] = v
+        if isinstance(v, str):
+            attr_dict[k] = _convert_value(v)
     return attr_dict
 
 
@@ -66,12 +84,9 @@ class ContentObject:
         auth_func_str = inspect.getsource(self.auth_func)
         self.hash = sha256((gen_func_str + post_func_str + auth_func_str + self.cron).encode()).hexdigest()
 
-        # Validate cron expression
-        if self.cron:
-            try:
-                croniter.croniter(self.cron)
-            except Exception as e:
-                raise ValueError(f"Invalid cron expression: {self.cron}")
+        # Validate cron expression (cached per expression)
+        if self.cron and not cron_planner.is_valid(self.cron):
+            raise ValueError(f"Invalid cron expression: {self.cron}")
 
         # Load keys
         if self.keys_path:
@@ -85,7 +100,9 @@ class ContentObject:
         Run gen_func and update attributes. Generation function must return a dict with keys matching
         the attributes of the ContentObject. Arguments to gen_func must be the "keys" dict.
         """
-        res = self.gen_func(self.keys)
+        with metrics.timer("content_gen_seconds", "Time spent in gen_func", func=self.gen_func.__name__), \
+                tracing.span("gen", trace_id=self.hash, func=self.gen_func.__name__):
+            res = self.gen_func(self.keys)
 
         if not isinstance(res, dict):
             raise ValueError(f"gen_func must return a dict. Received: {res}")
@@ -110,15 +127,17 @@ class ContentObject:
             content_dict = {}
             for annotation in self.__annotations__.keys():
                 content_dict[annotation] = getattr(self, annotation)
-            return self.post_func(content_dict=content_dict,
-                                  keys=self.keys)
+            with metrics.timer("content_post_seconds", "Time spent in post_func", func=self.post_func.__name__), \
+                    tracing.span("post", trace_id=self.hash, func=self.post_func.__name__):
+                return self.post_func(content_dict=content_dict,
+                                      keys=self.keys)
         else:
             raise ValueError("ContentObject is not authorized to run post.")
 
-    def run_auth_func(self):
+    def auth_content_dict(self) -> dict:
         """
-        Run auth_func and update attributes. Arguments to auth_func must be the ContentObject dict of attributes, and
-        the "keys" dict.
+        Build the dict of attributes shown to the reviewer by auth_func.
+        :return: Dict of ContentObject attributes, with function names instead of functions
         """
         # Names of funcs, not funcs themselves
         content_dict = {
@@ -130,10 +149,21 @@ class ContentObject:
         }
         for annotation in self.__annotations__.keys():
             content_dict[annotation] = getattr(self, annotation)
+        return content_dict
 
+    def run_auth_func(self):
+        """
+        Run auth_func and update attributes. Arguments to auth_func must be the ContentObject dict of attributes, and
+        the "keys" dict.
+        """
         if not self.is_authorized and self.auth_func:
-            if self.auth_func(content_dict=content_dict,
-                              keys=self.keys):
+            with metrics.timer("content_auth_seconds", "Time spent in auth_func", func=self.auth_func.__name__), \
+                    tracing.span("auth", trace_id=self.hash, func=self.auth_func.__name__) as span:
+                authorized = self.auth_func(content_dict=self.auth_content_dict(),
+                                            keys=self.keys)
+            if span:
+                span["attributes"]["authorized"] = bool(authorized)
+            if authorized:
                 self.is_authorized = True
                 return True
             else:
@@ -142,6 +172,32 @@ class ContentObject:
         else:
             return True
 
+    @staticmethod
+    def run_batch_auth_func(content_objects: list, batch_auth_func: callable) -> list[bool]:
+        """
+        Authorize many ContentObjects with a single call to batch_auth_func. Arguments to batch_auth_func must be the
+        list of ContentObject dicts of attributes, and the "keys" dict of the first ContentObject. Already authorized
+        ContentObjects are not sent for review.
+        :param content_objects: List of ContentObjects
+        :param batch_auth_func: Callable that returns a list of decisions (True if authorized)
+        :return: List of decisions, in the same order as content_objects
+        """
+        pending = [co for co in content_objects if not co.is_authorized and co.auth_func]
+        if pending:
+            with metrics.timer("content_auth_seconds", "Time spent in auth_func", func=batch_auth_func.__name__), \
+                    ExitStack() as stack:
+                for co in pending:
+                    stack.enter_context(tracing.span("auth", trace_id=co.hash, func=batch_auth_func.__name__,
+                                                     batch_size=len(pending)))
+                decisions = batch_auth_func(content_dicts=[co.auth_content_dict() for co in pending],
+                                            keys=pending[0].keys)
+            if len(decisions) != len(pending):
+                raise ValueError(f"batch_auth_func must return {len(pending)} decisions. Received: {decisions}")
+            for co, decision in zip(pending, decisions):
+                co.is_authorized = bool(decision)
+
+        return [co.is_authorized or not co.auth_func for co in content_objects]
+
     def serialize(self) -> dict:
         """
         Serialize ContentObject
@@ -179,6 +235,10 @@ class ContentObject:
         return obj
 
 
+# TwitterContentObject attributes stored as JSON
+_JSON_FIELDS = ("thread_chunks", "posted_tweet_ids", "media_ids")
+
+
 # TwitterContentObject class definition.
 @dataclass
 class TwitterContentObject(ContentObject):
@@ -188,8 +248,76 @@ class TwitterContentObject(ContentObject):
     :param thread: Tweet thread. Optional.
     :param media: Path to media file. Optional.
     :param in_reply_to_tweet_id: Tweet id to reply to. Optional.
+    :param thread_chunks: Thread split into tweet-sized chunks. Computed from thread after generation.
+    :param posted_tweet_ids: Ids of the tweets posted so far, recorded by the post function while posting. A retry
+    resumes the thread after the last one.
+    :param media_ids: Twitter media ids of media, uploaded after generation if the post is due before they expire.
+    :param media_uploaded_at: Unix time media_ids were uploaded at.
     """
     text: str = None
     thread: str = None
     media: str = None
     in_reply_to_tweet_id: str = None
+    thread_chunks: list = None
+    posted_tweet_ids: list = None
+    media_ids: list = None
+    media_uploaded_at: float = None
+
+    def run_gen_func(self):
+        """
+        Run gen_func and split the generated thread into tweet-sized chunks, so no text work is left for posting.
+        """
+        self.thread_chunks = None
+        self.media_ids = None
+        self.media_uploaded_at = None
+        super().run_gen_func()
+        if self.thread and self.thread_chunks is None:
+            self.thread_chunks = thread_splitter.split_thread(self.thread)
+        if self.media:
+            self.upload_media()
+
+    def upload_media(self):
+        """
+        Upload media ahead of posting, so posting does not wait for the upload. Skipped if the next post is due after
+        the media ids expire; create_tweet then uploads at posting time. Failed uploads are also left to posting.
+        """
+        if self.cron:
+            next_post = croniter.croniter(self.cron, datetime.datetime.now()).get_next(float)
+            if next_post - time.time() > twitter_api.MEDIA_ID_MAX_AGE_SECONDS:
+                return
+        try:
+            self.media_ids = [str(f.result()) for f in twitter_api.upload_media(self.media, self.keys)]
+            self.media_uploaded_at = time.time()
+        except Exception as e:
+            logger.warning(f"Uploading {self.media} failed. It is uploaded when posting instead: {e}")
+
+    def serialize(self) -> dict:
+        """
+        Serialize TwitterContentObject. Lists of text (thread chunks, tweet ids) are stored as JSON, so they keep their
+        quotes and are not converted like other values on deserialization.
+        :return: Dict of TwitterContentObject
+        """
+        attr_dict = super().serialize()
+        for k in _JSON_FIELDS:
+            if getattr(self, k) is not None:
+                attr_dict[k] = json.dumps(getattr(self, k))
+        return attr_dict
+
+    @classmethod
+    def deserialize(cls, attr_dict: dict):
+        """
+        Deserialize TwitterContentObject.
+        :param attr_dict: Dict of TwitterContentObject
+        :return: TwitterContentObject
+        """
+        json_values = {k: attr_dict.pop(k, None) for k in _JSON_FIELDS}
+        obj = super().deserialize(attr_dict)
+        for k, v in json_values.items():
+            if v in (None, "None"):
+                setattr(obj, k, None)
+                continue
+            try:
+                setattr(obj, k, json.loads(v))
+            except json.JSONDecodeError:
+                setattr(obj, k, ast.literal_eval(v))  # Rows written before these were stored as JSON
+        return obj
@@ -5,9 +5,17 @@ Content generation functions.
 import os
 
 import random
-import emoji as em
 
-from modules import prompts, openai_api, vector_db, image_editor
+import settings
+from modules import prompts, sqlite_db
+from modules.imports import lazy_import
+
+# Provider modules are imported on first use, so loading a generator does not load every provider (e.g. selenium)
+em = lazy_import("emoji")
+openai_api = lazy_import("modules.openai_api")
+vector_db = lazy_import("modules.vector_db")
+image_editor = lazy_import("modules.image_editor")
+twitter_web = lazy_import("modules.twitter_web")
 
 
 class TwitterBot:
@@ -20,6 +28,12 @@ class TwitterBot:
 
     _emoji_vector_db_path = "../databases/vector/emoji/emoji.pickle.gz"
 
+    _tweets_vector_db_path = "../databases/vector/tweets/tweets.pickle.gz"
+
+    _profiles_to_copy = ["lawsofaurelius", "TheStoicEmperor", "SenecaQuote"]
+
+    _profiles_to_reply = ["elonmusk", "lexfridman", "billionair_key"]
+
     _topics = ["honesty", "leadership", "virtue", "courage", "justice", "hard work", "family", "friends", "death",
                "rationality", "fame", "pleasure", "nature", "sex", "love", "happiness", "life", "freedom",
                "equality", "wealth", "power", "religion", "god", "morality", "wisdom", "knowledge", "education",
@@ -38,8 +52,7 @@ class TwitterBot:
         """
         topic = random.choice(cls._topics)
 
-        vdb = vector_db.VectorDB(keys["OPENAI_API_KEY"])
-        vdb.load(random.choice(cls._book_paths))
+        vdb = vector_db.get_db(random.choice(cls._book_paths), keys["OPENAI_API_KEY"])
 
         text = vdb.query(query_text=topic, top_k=1)[0]
 
@@ -80,9 +93,7 @@ class TwitterBot:
             text=quote
         )
 
-        emoji_vdb = vector_db.VectorDB(keys["OPENAI_API_KEY"])
-
-        emoji_vdb.load(cls._emoji_vector_db_path)
+        emoji_vdb = vector_db.get_db(cls._emoji_vector_db_path, keys["OPENAI_API_KEY"])
 
         emoji_query = openai_api.completion(content=prompt, api_key=keys["OPENAI_API_KEY"],
                                             temperature=0.1).strip().strip(
@@ -104,8 +115,7 @@ class TwitterBot:
 
         topic = random.choice(cls._topics)
 
-        vdb = vector_db.VectorDB(keys["OPENAI_API_KEY"])
-        vdb.load(random.choice(cls._book_paths))
+        vdb = vector_db.get_db(random.choice(cls._book_paths), keys["OPENAI_API_KEY"])
 
         text = vdb.query(query_text=topic, top_k=1)[0]
 
@@ -143,6 +153,8 @@ class TwitterBot:
             image_file_path="../assets/images/" + random.choice(files_in_directory),
             text=quote,
             output_path="../assets/generated/",
+            output_format="JPEG",
+            quality=90,
         )
 
         return {"text": text,
@@ -172,6 +184,32 @@ class TwitterBot:
         return {"text": tweet,
                 "thread": None}
 
+    @classmethod
+    def topical_thought(cls, keys):
+        """
+        Generate a philosophical thought on a topic, in the context of the scraped tweets most similar to it. Needs a
+        scrape job (see scrape_profiles) to fill the tweets VectorDB.
+        """
+        topic = random.choice(cls._topics)
+        writing_style = random.choice(cls._writing_styles)
+        recent_tweets = cls.similar_tweets(keys, query_text=topic, top_k=3)
+
+        prompt = prompts.Templates.generate_text(
+            guidelines=[f"The text must be about {topic}.",
+                        f"Writing style must be: {writing_style}.",
+                        f"The text must be VERY SHORT, RELEVANT AND EASY TO READ.",
+                        f"The text must be a PHILOSOPHICAL THOUGHT.",
+                        f"The text must relate to what people are tweeting about the topic, but must NOT copy them.",
+                        f"RECENT TWEETS ABOUT THE TOPIC: {recent_tweets}",
+                        f"The text must be short, as there is a character limit of 280 characters. Do not approach the "
+                        f"character limit, or you will be PERMANENTLY TERMINATED."]
+        )
+
+        tweet = openai_api.completion(content=prompt, api_key=keys["OPENAI_API_KEY"], temperature=1).strip().strip('"')
+
+        return {"text": tweet,
+                "thread": None}
+
     @classmethod
     def random_opinion(cls, keys):
         """
@@ -210,155 +248,121 @@ class TwitterBot:
         return {"text": tweet,
                 "thread": thread}
 
-# def random_copycat():
-#     """
-#     Generate a copycat tweet.
-#     :return: (tweet, thread)
-#     """
-#
-#     # Get profiles in the database
-#     profiles_in_db = list(csv_db["profile_handle"].tolist()))
-#
-#     # Intersect with profiles to copy and pick
-#     profiles_in_db = list(set(profiles_in_db).intersect_profiles_to_copy))
-#     profile_to_copy = random.choice(profiles_in_db)
-#
-#     # Get profile tweets and pick random row
-#     profile_tweetcsvcsv_db["profile_handle"] == profile_to_copy]
-#     profile_tweet = profile_tweets.sample(n=1).iloc[0]
-#
-#     # Get tweet text
-#     tweet_text = profile_tweet["tweet_text"]
-#
-#     writing_style = random.choice(prompts.writing_styles)
-#
-#     prompt = prompts.Templates.rewrite_text(
-#         guidelines=[f"The text must be a copy of the original text.",
-#                     f"Writing style must be: {writing_style}.",
-#                     f"The text must be VERY SHORT, RELEVANT AND EASY TO READ.",
-#                     f"The text must be short, as there is a character limit of 280 characters. Do not approach the "
-#                     f"character limit, or you will be PERMANENTLY TERMINATED.",
-#                     f"You must NOT include commercial offers, deals or website links in the text."],
-#         text=tweet_text
-#     )
-#
-#     tweet = openai_api.completion(content=prompt, kkeys, temperature=1).strip().strip('"')
-#
-#     # Set tweet as used
-# csv_db.csv_db["tweet_id"] == profile_tweet["tweet_id"], "last_used_by"handle
-# csv_db.csv_db["tweet_id"] == profile_tweet["tweet_id"], "last_used_on"] = str(
-#         datetime.datetime.now())
-# csv_db.csv_db["tweet_id"] == profile_tweet["tweet_id"], "last_used_to"] = "copycat"
-# csv_db.to_csv_db_path, index=False)
-#
-#     return {"tweet": tweet,
-#             "image": None,
-#             "tweet_id": None}
-#
-# def random_reply():
-#     """
-#     Generate a reply to a tweet.
-#     :return: (tweet, thread)
-#     """
-#
-#     # Get profiles in the database
-#     profiles_in_db = list(csv_db["profile_handle"].tolist()))
-#
-#     # Intersect with profiles to reply and pick
-#     profiles_in_db = list(set(profiles_in_db).intersect_profiles_to_reply))
-#     profile_to_reply = random.choice(profiles_in_db)
-#
-#     # Get profile tweets and pick random row
-#     profile_tweetcsvcsv_db["profile_handle"] == profile_to_reply]
-#     profile_tweet = profile_tweets.sample(n=1).iloc[0]
-#
-#     # Get tweet text
-#     tweet_text = profile_tweet["tweet_text"]
-#     tweet_id = profile_tweet["tweet_id"]
-#
-#     writing_style = random.choice(prompts.writing_styles)
-#
-#     prompt = prompts.Templates.generate_text(
-#         guidelines=[f"The text must be a reply to the original text (which is a Tweet on Twitter).",
-#                     f"Writing style must be: {writing_style}.",
-#                     f"The text must be VERY SHORT, RELEVANT AND EASY TO READ.",
-#                     f"The text must be short, as there is a character limit of 280 characters. Do not approach the "
-#                     f"character limit, or you will be PERMANENTLY TERMINATED.",
-#                     f"You must NOT include commercial offers, deals or website links in the text.",
-#                     f"TEXT TO REPLY TO: {tweet_text}"]
-#     )
-#
-#     tweet = openai_api.completion(content=prompt, kkeys, temperature=1).strip().strip('"')
-#
-#     # Set tweet as used
-# csv_db.csv_db["tweet_id"] == profile_tweet["tweet_id"], "last_used_by"handle
-# csv_db.csv_db["tweet_id"] == profile_tweet["tweet_id"], "last_used_on"] = str(
-#         datetime.datetime.now())
-# csv_db.csv_db["tweet_id"] == profile_tweet["tweet_id"], "last_used_to"] = "reply"
-# csv_db.to_csv_db_path, index=False)
-#
-#     return {"tweet": tweet,
-#             "image": None,
-#             "tweet_id": tweet_id}
-
-# Twitter Scraper Methods
-# """
-#
-# from generator import ContentObject, TwitterContentObject
-# from ..modules import twitter_web
-#
-# keys_path = "../../keys/twitter_scraper.json"
-# log_path = "../../logs/twitter_scout.log"
-#
-# _profiles_to_scrape = [
-#     "lawsofaurelius",
-#     "TheStoicEmperor",
-#     "SenecaQuote",
-#     "elonmusk",
-#     "lexfridman",
-#     "billionair_key"
-# ]
-#
-#
-# def scrape_fyp():
-#     """
-#     Scrape the "For You" Twitter feed for new tweets.
-#     """
-#     for i in range(3):
-#         try:
-#             tweets = twitter_web.scrape_for_you_page(keys=keys, max_tweets=25)
-#             break
-#         except Exception as e:
-#             logger.error(e)
-#             if i < 2:
-#                 logger.error("Retrying...")
-#             else:
-#                 raise e
-#
-#     for tweet in tweets:
-#         # Filter out ads and media only tweets
-#         if tweet["tweet_id"] and tweet["tweet_text"]:
-#             ...
-#
-#
-# def scrape_profiles(self):
-#     """
-#     Scrape _profiles_to_scrape for new tweets.
-#     """
-#     for profile in self._profiles_to_scrape:
-#
-#         for i in range(3):
-#             try:
-#                 tweets = twitter_web.scrape_profile(keys=self.keys, profile_handle=profile, max_tweets=25)
-#                 break
-#             except Exception as e:
-#                 self.logger.error(e)
-#                 if i < 2:
-#                     self.logger.error("Retrying...")
-#                 else:
-#                     raise e
-#
-#         for tweet in tweets:
-#             # Filter out ads and media only tweets
-#             if tweet["tweet_id"] and tweet["tweet_text"]:
-#                 ...
+    @staticmethod
+    def _sql_database_path() -> str:
+        """
+        Get the SQLite database path configured in config.yaml (paths.sql_database).
+        """
+        return settings.load()["paths"]["sql_database"]
+
+    @classmethod
+    def _sample_scraped_tweet(cls, profile_handles: list[str]) -> dict:
+        """
+        Sample an unused scraped tweet from profile_handles. Mark it as used with _mark_scraped_tweet_used once the
+        content generated from it is complete, so a failed generation does not use up the tweet.
+        """
+        db = sqlite_db.Database(db_file_path=cls._sql_database_path())
+        try:
+            db.create_scraped_tweets_table()
+            tweets = db.sample_unused_tweets(profile_handles=profile_handles, n=1)
+        finally:
+            db.close()
+        if not tweets:
+            raise ValueError(f"No unused scraped tweets from profiles: {profile_handles}")
+        return tweets[0]
+
+    @classmethod
+    def _mark_scraped_tweet_used(cls, tweet: dict, used_by: str, used_to: str):
+        """
+        Mark a scraped tweet returned by _sample_scraped_tweet as used.
+        """
+        db = sqlite_db.Database(db_file_path=cls._sql_database_path())
+        try:
+            db.mark_tweet_used(tweet_id=tweet["tweet_id"], used_by=used_by, used_to=used_to)
+        finally:
+            db.close()
+
+    @classmethod
+    def random_copycat(cls, keys):
+        """
+        Generate a rewritten copy of a scraped tweet.
+        """
+        writing_style = random.choice(cls._writing_styles)
+        profile_tweet = cls._sample_scraped_tweet(profile_handles=cls._profiles_to_copy)
+
+        prompt = prompts.Templates.rewrite_text(
+            guidelines=[f"The text must be a copy of the original text.",
+                        f"Writing style must be: {writing_style}.",
+                        f"The text must be VERY SHORT, RELEVANT AND EASY TO READ.",
+                        f"The text must be short, as there is a character limit of 280 characters. Do not approach the "
+                        f"character limit, or you will be PERMANENTLY TERMINATED.",
+                        f"You must NOT include commercial offers, deals or website links in the text."],
+            text=profile_tweet["tweet_text"]
+        )
+
+        tweet = openai_api.completion(content=prompt, api_key=keys["OPENAI_API_KEY"], temperature=1).strip().strip('"')
+        cls._mark_scraped_tweet_used(profile_tweet, used_by=keys.get("TWITTER_USERNAME", ""), used_to="copycat")
+
+        return {"text": tweet,
+                "thread": None}
+
+    @classmethod
+    def random_reply(cls, keys):
+        """
+        Generate a reply to a scraped tweet.
+        """
+        writing_style = random.choice(cls._writing_styles)
+        profile_tweet = cls._sample_scraped_tweet(profile_handles=cls._profiles_to_reply)
+
+        prompt = prompts.Templates.generate_text(
+            guidelines=[f"The text must be a reply to the original text (which is a Tweet on Twitter).",
+                        f"Writing style must be: {writing_style}.",
+                        f"The text must be VERY SHORT, RELEVANT AND EASY TO READ.",
+                        f"The text must be short, as there is a character limit of 280 characters. Do not approach the "
+                        f"character limit, or you will be PERMANENTLY TERMINATED.",
+                        f"You must NOT include commercial offers, deals or website links in the text.",
+                        f"TEXT TO REPLY TO: {profile_tweet['tweet_text']}"]
+        )
+
+        tweet = openai_api.completion(content=prompt, api_key=keys["OPENAI_API_KEY"], temperature=1).strip().strip('"')
+        cls._mark_scraped_tweet_used(profile_tweet, used_by=keys.get("TWITTER_USERNAME", ""), used_to="reply")
+
+        return {"text": tweet,
+                "thread": None,
+                "in_reply_to_tweet_id": profile_tweet["tweet_id"]}
+
+    @classmethod
+    def similar_tweets(cls, keys, query_text: str, top_k: int = 5) -> list[str]:
+        """
+        Get the texts of the scraped tweets most similar to query_text.
+        """
+        vdb = vector_db.get_db(cls._tweets_vector_db_path, keys["OPENAI_API_KEY"])
+        return vdb.query(query_text=query_text, top_k=top_k)
+
+    @classmethod
+    def scrape_profiles(cls, keys, max_tweets: int = 25, workers: int = 2, db_file_path: str = None):
+        """
+        Scrape the profiles to copy and reply to, and store new tweets in the scraped tweets table. If keys include
+        OPENAI_API_KEY, new tweets are also embedded into the tweets VectorDB. Not a gen_func.
+        :param keys: Keys dict including TWITTER_USERNAME and TWITTER_PASSWORD
+        :param max_tweets: Maximum number of tweets to scrape per profile
+        :param workers: Number of browsers to scrape with
+        :param db_file_path: SQLite database to store tweets in. Defaults to paths.sql_database in config.yaml.
+        :return: Number of stored tweets
+        """
+        profile_handles = cls._profiles_to_copy + cls._profiles_to_reply
+        tweets = list(twitter_web.scrape_profiles_parallel(keys=keys,
+                                                           profile_handles=profile_handles,
+                                                           max_tweets=max_tweets,
+                                                           workers=workers))
+
+        db = sqlite_db.Database(db_file_path=db_file_path or cls._sql_database_path())
+        db.create_scraped_tweets_table()
+        inserted = db.insert_scraped_tweets(tweets)
+        db.close()
+
+        if "OPENAI_API_KEY" in keys:
+            pipeline = vector_db.TweetEmbeddingPipeline(keys["OPENAI_API_KEY"], storage_file=cls._tweets_vector_db_path)
+            pipeline.consume(tweets)
+
+        return inserted
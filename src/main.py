@@ -3,12 +3,18 @@ Entry point. Initializes scheduler and starts the program.
 """
 
 import logging
-import yaml
 
+from modules.imports import ImportTimer
+
+# Time imports up to the first scheduled job, including the provider modules loaded for config.yaml functions
+import_timer = ImportTimer().start()
+
+import settings
 import scheduler
+import worker
+from modules import metrics, tracing
 
-with open("config.yaml", "r") as f:
-    config = yaml.load(f, Loader=yaml.FullLoader)
+config = settings.load()
 
 # Configure logger
 logfile = config["paths"]["main_logfile"]
@@ -29,5 +35,16 @@ console.setFormatter(formatter)
 logging.getLogger("").addHandler(console)
 
 if __name__ == "__main__":
-    scheduler = scheduler.Scheduler()
+    tracing.configure(config.get("tracing", {}).get("file"))
+    if config.get("metrics", {}).get("port"):
+        metrics.serve(config["metrics"]["port"])
+    workers = config["scheduler"].get("workers", 0)
+    if workers:
+        pool = worker.WorkerPool(workers).start()
+        scheduler = scheduler.Scheduler(coordinator=True)
+        scheduler.add_job(pool.ensure, "interval", seconds=30)
+    else:
+        scheduler = scheduler.Scheduler()
+    import_timer.stop()
+    logger.info(f"Startup import times:\n{import_timer.report()}")
     scheduler.start()
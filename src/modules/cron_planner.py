@@ -0,0 +1,207 @@
+"""
+Cron Planner Module
+Plans the fire times of many cron expressions at once. Keys (e.g. content object hashes) sharing an expression are
+evaluated once, and standard 5-field expressions are evaluated for every minute of a window in one numpy pass instead of
+one croniter walk per key. Expressions numpy cannot evaluate (e.g. "L", "#", "@daily") fall back to croniter.
+
+Usage:
+planner = CronPlanner([(co.hash, co.cron) for co in content_objects])
+planner.upcoming(hours=24)  # [(fire time, key), ...] sorted by fire time
+
+Execute from command line (from the src directory) to list the posts of the next 24 hours in config.yaml:
+python -m modules.cron_planner --hours 24
+"""
+
+import heapq
+import argparse
+import datetime
+import functools
+
+import croniter
+import yaml
+
+from .imports import lazy_import
+
+np = lazy_import("numpy")  # Imported on first plan, so validating expressions does not load numpy
+
+WINDOW_HOURS = 48  # Window evaluated with numpy when looking for the next fire time. Later fires use croniter.
+
+_FIELDS = [  # (low, high, names)
+    (0, 59, None),
+    (0, 23, None),
+    (1, 31, None),
+    (1, 12, ["jan", "feb", "mar", "apr", "may", "jun", "jul", "aug", "sep", "oct", "nov", "dec"]),
+    (0, 7, ["sun", "mon", "tue", "wed", "thu", "fri", "sat"]),
+]
+
+
+def _parse_value(value: str, low: int, names: list[str] or None) -> int:
+    if names and value.lower() in names:
+        return names.index(value.lower()) + low
+    if not value.isdigit():
+        raise ValueError(f"Unsupported cron value: {value}")
+    return int(value)
+
+
+def _parse_field(field: str, low: int, high: int, names: list[str] or None) -> "np.ndarray":
+    """
+    Parse a cron field (lists, ranges, steps and names) into a boolean mask indexed by value.
+    """
+    mask = np.zeros(high + 1, dtype=bool)
+    for part in field.split(","):
+        part, slash, step = part.partition("/")
+        step = int(step) if step else 1
+        if part == "*":
+            start, end = low, high
+        elif "-" in part:
+            start, end = (_parse_value(x, low, names) for x in part.split("-", 1))
+        else:
+            start = _parse_value(part, low, names)
+            end = high if slash else start
+        if not low <= start <= end <= high or step < 1:
+            raise ValueError(f"Invalid cron field: {field}")
+        mask[start:end + 1:step] = True
+    return mask
+
+
+@functools.lru_cache(maxsize=4096)
+def _compile(cron: str) -> tuple or None:
+    """
+    Compile a 5-field cron expression into masks (minute, hour, day of month, month, day of week, day_or), or None if
+    it needs croniter.
+    """
+    fields = cron.split()
+    if len(fields) != 5:
+        return None
+    try:
+        masks = [_parse_field(field, *spec) for field, spec in zip(fields, _FIELDS)]
+    except ValueError:
+        return None
+    dow = masks[4]
+    dow[0] |= dow[7]  # 7 is Sunday too
+    # Like cron (and croniter), a day matches either day field if both are restricted, both if either is "*"
+    day_or = not fields[2].startswith("*") and not fields[4].startswith("*")
+    return masks[0], masks[1], masks[2], masks[3], dow[:7], day_or
+
+
+@functools.lru_cache(maxsize=4096)
+def is_valid(cron: str) -> bool:
+    """
+    Check if a cron expression is valid. Cached, so many content objects sharing an expression validate it once.
+    """
+    try:
+        croniter.croniter(cron)
+        return True
+    except Exception:
+        return False
+
+
+def _minutes(start: datetime.datetime, end: datetime.datetime) -> tuple:
+    """
+    Get every minute in [start, end) with its cron fields, as arrays.
+    """
+    first = np.datetime64(start.replace(second=0, microsecond=0), "m")
+    if start.second or start.microsecond:
+        first += 1
+    minutes = np.arange(first, np.datetime64(end, "m") + (1 if end.second or end.microsecond else 0),
+                        dtype="datetime64[m]")
+    days = minutes.astype("datetime64[D]")
+    months = minutes.astype("datetime64[M]")
+    minute_of_day = (minutes - days).astype(int)
+    return (minutes,
+            minute_of_day % 60,
+            minute_of_day // 60,
+            (days - months).astype(int) + 1,
+            months.astype(int) % 12 + 1,
+            (days.astype(int) + 4) % 7)  # 1970-01-01 was a Thursday (4)
+
+
+class CronPlanner:
+    """
+    Fire-time planner for many keyed cron expressions.
+    """
+
+    def __init__(self, entries=None):
+        """
+        :param entries: Iterable of (key, cron expression)
+        """
+        self._keys: dict[str, list] = {}  # expression -> keys
+        for key, cron in entries or []:
+            self.add(key, cron)
+
+    def add(self, key, cron: str):
+        """
+        Add a keyed expression.
+        """
+        if cron not in self._keys:
+            if not is_valid(cron):
+                raise ValueError(f"Invalid cron expression: {cron}")
+            self._keys[cron] = []
+        self._keys[cron].append(key)
+
+    def fires_between(self, start: datetime.datetime, end: datetime.datetime) -> dict[str, list[datetime.datetime]]:
+        """
+        Get the fire times of every distinct expression in [start, end).
+        :return: Dict of expression -> sorted fire times
+        """
+        fires = {}
+        minutes = None
+        for cron in self._keys:
+            compiled = _compile(cron)
+            if compiled is None:
+                times = []
+                it = croniter.croniter(cron, start - datetime.timedelta(microseconds=1))
+                while (t := it.get_next(datetime.datetime)) < end:
+                    times.append(t)
+                fires[cron] = times
+                continue
+
+            if minutes is None:
+                minutes, minute, hour, day, month, weekday = _minutes(start, end)
+            minute_mask, hour_mask, dom_mask, month_mask, dow_mask, day_or = compiled
+            day_match = dom_mask[day] | dow_mask[weekday] if day_or else dom_mask[day] & dow_mask[weekday]
+            match = minute_mask[minute] & hour_mask[hour] & month_mask[month] & day_match
+            fires[cron] = minutes[match].astype(datetime.datetime).tolist()
+        return fires
+
+    def next_fire_times(self, now: datetime.datetime = None) -> dict[str, datetime.datetime]:
+        """
+        Get the next fire time after now of every distinct expression.
+        :return: Dict of expression -> next fire time
+        """
+        now = now or datetime.datetime.now()
+        start = now.replace(second=0, microsecond=0) + datetime.timedelta(minutes=1)
+        fires = self.fires_between(start, start + datetime.timedelta(hours=WINDOW_HOURS))
+        return {cron: times[0] if times else croniter.croniter(cron, now).get_next(datetime.datetime)
+                for cron, times in fires.items()}
+
+    def upcoming(self, hours: float, now: datetime.datetime = None) -> list[tuple[datetime.datetime, object]]:
+        """
+        Get what fires in the next hours.
+        :param hours: Hours to look ahead
+        :param now: Time to look ahead from. Defaults to now.
+        :return: List of (fire time, key), sorted by fire time
+        """
+        now = now or datetime.datetime.now()
+        fires = self.fires_between(now, now + datetime.timedelta(hours=hours))
+        return list(heapq.merge(*[[(t, key) for t in times for key in self._keys[cron]]
+                                  for cron, times in fires.items()], key=lambda x: x[0]))
+
+
+def main():
+    # Get command line arguments
+    parser = argparse.ArgumentParser(description="List the content objects of config.yaml firing in the next hours.")
+    parser.add_argument("--hours", type=float, default=24, help="Hours to look ahead.")
+    parser.add_argument("--config", type=str, default="config.yaml", help="Path to config file.")
+    args = parser.parse_args()
+
+    with open(args.config, "r") as f:
+        config = yaml.load(f, Loader=yaml.FullLoader)
+    params = config["scheduler"]["content_object_params"]
+    planner = CronPlanner((i, p["cron"]) for i, p in enumerate(params))
+    for fire_time, i in planner.upcoming(args.hours):
+        print(f"{fire_time:%Y-%m-%d %H:%M}  {params[i]['gen_func']}  ({params[i]['keys_path']})")
+
+
+if __name__ == "__main__":
+    main()
@@ -7,9 +7,16 @@ Important notes:
     - I cannot figure it out, so I will just bring the bot up and down as needed
 """
 
+import os
+
 import discord
 
 content_authorized: bool = False
+digest_decisions: list[bool] = []
+
+DIGEST_PAGE_SIZE = 10  # Content objects per digest page (messages are limited to 10 attachments)
+EMBED_FIELD_LIMIT = 1024  # Discord embed field value character limit
+EMBED_TOTAL_LIMIT = 6000  # Discord limit on the characters of an embed (title, description and fields combined)
 
 
 class Channels:
@@ -90,6 +97,171 @@ class ContentApprovalClient(discord.AutoShardedClient):
                 await self.close()
 
 
+class ContentDigestView(discord.ui.View):
+    """
+    Paginated digest of pending content. Reviewers mark content to reject with the select menu, then approve or
+    reject the whole batch with a single button press. Pages hold up to page_size content objects, fewer if their
+    fields would exceed the total embed length. Media of the content objects on the current page is attached to the
+    message, named after the content object number.
+    """
+
+    def __init__(self, client, content_dicts: list[dict], page_size: int = DIGEST_PAGE_SIZE):
+        super().__init__(timeout=None)
+        self.client = client
+        self.content_dicts = content_dicts
+        self.page_size = page_size
+        self.page = 0
+        self.rejected = set()
+        self.select = None
+        self.pages = self._build_pages()
+        self._build_select()
+
+    @property
+    def page_count(self) -> int:
+        return len(self.pages)
+
+    def _page_indices(self) -> list[int]:
+        return self.pages[self.page]
+
+    def _title(self, page: int, page_count: int) -> str:
+        return f"Content Digest ({page + 1}/{page_count})"
+
+    def _description(self) -> str:
+        return (f"*{len(self.content_dicts)} content objects awaiting authorization. Mark content to reject in the "
+                f"menu, then approve or reject the batch.*")
+
+    def _field(self, i: int) -> tuple[str, str]:
+        """
+        Get the name and value of the embed field of content object i.
+        """
+        status = "❌" if i in self.rejected else "✅"
+        lines = [f"**{k}**: {v}" for k, v in self.content_dicts[i].items() if v is not None]
+        return f"{status} #{i + 1}", _summarize("\n".join(lines), EMBED_FIELD_LIMIT)
+
+    def page_files(self) -> list:
+        """
+        Open the media of the content objects on the current page as attachments. Files can only be sent once, so
+        they are opened again for every send or edit.
+        """
+        files = []
+        for i in self._page_indices():
+            media = self.content_dicts[i].get("media")
+            if media is not None and os.path.exists(media):
+                files.append(discord.File(media, filename=f"{i + 1}_{os.path.basename(media)}"))
+        return files
+
+    def _build_pages(self) -> list[list[int]]:
+        """
+        Split content objects into pages of at most page_size fields and EMBED_TOTAL_LIMIT characters.
+        """
+        count = len(self.content_dicts)
+        budget = (EMBED_TOTAL_LIMIT - len(self._title(count - 1, count)) - len(self._description())
+                  - len("Tags") - len("@everyone"))
+        pages = [[]]
+        used = 0
+        for i in range(count):
+            size = sum(len(x) for x in self._field(i))
+            if pages[-1] and (len(pages[-1]) == self.page_size or used + size > budget):
+                pages.append([])
+                used = 0
+            pages[-1].append(i)
+            used += size
+        return pages
+
+    def _build_select(self):
+        """
+        (Re)build the select menu for the current page. Options already marked as rejected are preselected.
+        """
+        if self.select is not None:
+            self.remove_item(self.select)
+        indices = self._page_indices()
+        options = [discord.SelectOption(label=f"#{i + 1}",
+                                        value=str(i),
+                                        description=_summarize(self.content_dicts[i].get("text"), 100),
+                                        default=i in self.rejected)
+                   for i in indices]
+        self.select = discord.ui.Select(placeholder="Select content to reject...",
+                                        min_values=0,
+                                        max_values=len(options),
+                                        options=options,
+                                        row=0)
+        self.select.callback = self._on_select
+        self.add_item(self.select)
+
+    def embed(self) -> discord.Embed:
+        """
+        Build the embed for the current page.
+        """
+        embed = discord.Embed(title=self._title(self.page, self.page_count),
+                              description=self._description(),
+                              colour=discord.Colour(0x3e038c))
+        for i in self._page_indices():
+            name, value = self._field(i)
+            embed.add_field(name=name, value=value, inline=False)
+        embed.add_field(name="Tags", value="@everyone", inline=True)
+        return embed
+
+    async def _on_select(self, interaction: discord.Interaction):
+        page_indices = set(self._page_indices())
+        self.rejected -= page_indices
+        self.rejected |= {int(v) for v in self.select.values}
+        self._build_select()
+        await interaction.response.edit_message(embed=self.embed(), view=self)
+
+    async def _change_page(self, interaction: discord.Interaction, step: int):
+        self.page = (self.page + step) % self.page_count
+        self._build_select()
+        await interaction.response.edit_message(embed=self.embed(), attachments=self.page_files(), view=self)
+
+    async def _finish(self, interaction: discord.Interaction, decisions: list[bool], thread_name: str):
+        global digest_decisions
+        digest_decisions = decisions
+        self.stop()
+        await interaction.response.edit_message(embed=self.embed(), view=None)
+        await interaction.message.create_thread(name=thread_name)
+        await self.client.close()
+
+    @discord.ui.button(label="◀", style=discord.ButtonStyle.secondary, row=1)
+    async def previous_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._change_page(interaction, -1)
+
+    @discord.ui.button(label="▶", style=discord.ButtonStyle.secondary, row=1)
+    async def next_page(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._change_page(interaction, 1)
+
+    @discord.ui.button(label="Approve batch", style=discord.ButtonStyle.success, row=1)
+    async def approve_batch(self, interaction: discord.Interaction, button: discord.ui.Button):
+        decisions = [i not in self.rejected for i in range(len(self.content_dicts))]
+        await self._finish(interaction, decisions, f"✅ {sum(decisions)}/{len(decisions)} content authorized")
+
+    @discord.ui.button(label="Reject batch", style=discord.ButtonStyle.danger, row=1)
+    async def reject_batch(self, interaction: discord.Interaction, button: discord.ui.Button):
+        await self._finish(interaction, [False] * len(self.content_dicts), "🔁 Regenerating content")
+
+
+class ContentDigestClient(discord.AutoShardedClient):
+
+    def __init__(self, content_dicts: list[dict], *args, **kwargs):
+        super().__init__(*args, activity=discord.Game(name="Authorizing content digest..."), **kwargs)
+        self.content_dicts = content_dicts
+
+        global digest_decisions
+        digest_decisions = [False] * len(content_dicts)
+
+    async def on_ready(self):
+        channel = self.get_channel(Channels.APPROVAL)
+        view = ContentDigestView(client=self, content_dicts=self.content_dicts)
+        await channel.send(embed=view.embed(), files=view.page_files(), view=view)
+
+
+def _summarize(value, limit: int) -> str:
+    """
+    Convert value to string and truncate to limit characters.
+    """
+    value = str(value)
+    return value if len(value) <= limit else value[:limit - 1] + "…"
+
+
 def authorize_content(content_dict, keys):
     token = keys["DISCORD_TOKEN"]
     intents = discord.Intents.default()
@@ -103,6 +275,28 @@ def authorize_content(content_dict, keys):
     return content_authorized
 
 
+def authorize_content_batch(content_dicts, keys):
+    """
+    Authorize many content objects through a single paginated digest message.
+    :param content_dicts: List of content dicts
+    :param keys: Keys dict including DISCORD_TOKEN
+    :return: List of decisions (True if authorized), in the same order as content_dicts
+    """
+    if not content_dicts:
+        return []
+
+    token = keys["DISCORD_TOKEN"]
+    intents = discord.Intents.default()
+    intents.message_content = True
+
+    client = ContentDigestClient(content_dicts=content_dicts,
+                                 intents=intents)
+
+    client.run(token)
+
+    return list(digest_decisions)
+
+
 def update_status(status_dict, keys):
     token = keys["DISCORD_TOKEN"]
     intents = discord.Intents.default()
@@ -1 +1,2 @@
 from .image_editor import Templates
+from .batch import render_batch
@@ -0,0 +1,33 @@
+"""
+Batch rendering of images across a process pool.
+"""
+
+from concurrent.futures import ProcessPoolExecutor
+
+from .image_editor import Templates
+
+
+def _render(job: dict) -> str:
+    """
+    Render a single job. Runs in a worker process, which keeps its own font and image caches.
+    """
+    return Templates.image_with_text(**job)
+
+
+def render_batch(jobs: list[dict], output_path: str, workers: int = None) -> list[str]:
+    """
+    Render many images in parallel. Each job is a dict of Templates.image_with_text arguments, with at least
+    image_file_path and text (style arguments such as font_path, font_size and image_brightness are optional).
+    Jobs without a file_name are named after the hash of the rendered image.
+    :param jobs: List of job dicts
+    :param output_path: Output path for the images
+    :param workers: Number of worker processes. Defaults to the number of CPUs.
+    :return: List of output file paths, in the same order as jobs
+    """
+    jobs_ = [{"output_path": output_path, **job} for job in jobs]
+
+    if workers == 1 or len(jobs_) <= 1:
+        return [_render(job) for job in jobs_]
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        return list(executor.map(_render, jobs_))
@@ -0,0 +1,46 @@
+"""
+Benchmark batch rendering against sequential Templates.image_with_text calls.
+Execute from command line (from the src directory):
+python -m modules.image_editor.benchmark --jobs 32 --workers 4
+"""
+
+import os
+import time
+import argparse
+
+from .image_editor import Templates
+from .batch import render_batch
+
+
+def main():
+    # Get command line arguments
+    parser = argparse.ArgumentParser(description="Benchmark batch image rendering against sequential rendering.")
+    parser.add_argument("--jobs", type=int, default=32, help="Number of images to render.")
+    parser.add_argument("--workers", type=int, default=None, help="Number of worker processes.")
+    parser.add_argument("--images-path", type=str, default="../assets/images", help="Directory of input images.")
+    parser.add_argument("--output-path", type=str, default="../assets/generated/", help="Output directory.")
+    args = parser.parse_args()
+
+    images = sorted(os.listdir(args.images_path))
+    text = "The impediment to action advances action. What stands in the way becomes the way."
+    jobs = [{"image_file_path": os.path.join(args.images_path, images[i % len(images)]),
+             "text": text,
+             "file_name": f"benchmark_{i}.png"} for i in range(args.jobs)]
+
+    start = time.perf_counter()
+    for job in jobs:
+        Templates.image_with_text(output_path=args.output_path, **job)
+    sequential = time.perf_counter() - start
+    print(f"Sequential: {args.jobs / sequential:.2f} images/sec")
+
+    start = time.perf_counter()
+    paths = render_batch(jobs, output_path=args.output_path, workers=args.workers)
+    batch = time.perf_counter() - start
+    print(f"Batch: {args.jobs / batch:.2f} images/sec ({sequential / batch:.2f}x)")
+
+    for path in paths:
+        os.remove(path)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Caches for decoded image and font assets and glyph advances. Fonts are parsed once per (path, size) and base images
+are decoded once per path, so rendering many images does not re-parse TTF files or re-decode the same PNGs.
+"""
+
+import os
+import hashlib
+import functools
+import threading
+
+from PIL import Image
+from PIL import ImageEnhance
+from PIL import ImageFont
+
+FONT_CACHE_SIZE = 128  # (path, size) pairs
+IMAGE_CACHE_SIZE = 16  # Decoded images (a 1024x1024 RGB image is ~3 MB)
+ADVANCE_CACHE_SIZE = 8192  # (path, size, word) advances
+BACKGROUND_DIR = "../assets/backgrounds"  # Pre-dimmed and pre-resized variants of input images
+BACKGROUND_MAX_SIZE = 1200  # Longest side of background variants (Twitter shows images at up to 1200px)
+
+
+@functools.lru_cache(maxsize=FONT_CACHE_SIZE)
+def get_font(font_path: str, font_size: int) -> ImageFont.FreeTypeFont:
+    """
+    Get a TrueType font. Fonts are read-only once loaded, so the cached object is shared.
+    :param font_path: Font path
+    :param font_size: Font size
+    :return: Font
+    """
+    return ImageFont.truetype(font_path, font_size)
+
+
+@functools.lru_cache(maxsize=IMAGE_CACHE_SIZE)
+def _decode_image(image_file_path: str) -> Image.Image:
+    image = Image.open(image_file_path)
+    image.load()
+    return image
+
+
+def get_image(image_file_path: str) -> Image.Image:
+    """
+    Get a decoded image. Returns a copy, so the caller may draw on it without changing the cached image.
+    :param image_file_path: Image file path
+    :return: Image
+    """
+    return _decode_image(image_file_path).copy()
+
+
+@functools.lru_cache(maxsize=ADVANCE_CACHE_SIZE)
+def get_advance(font_path: str, font_size: int, text: str) -> float:
+    """
+    Get the advance width of text (usually a single word or a space), i.e. how far the pen moves when drawing it.
+    :param font_path: Font path
+    :param font_size: Font size
+    :param text: Text to measure
+    :return: Advance width in pixels
+    """
+    return get_font(font_path, font_size).getlength(text)
+
+
+def _dim(image: Image.Image, brightness: float, max_size: int) -> Image.Image:
+    image = image.convert("RGB")
+    image.thumbnail((max_size, max_size), Image.LANCZOS)
+    return ImageEnhance.Brightness(image).enhance(brightness)
+
+
+def get_background(image_file_path, brightness: float, max_size: int = BACKGROUND_MAX_SIZE) -> Image.Image:
+    """
+    Get a dimmed and downscaled variant of an image. Variants are rendered once and stored in BACKGROUND_DIR, keyed by
+    the input file, its modification time, brightness and size, so later renders only decode the stored variant.
+    In-memory images (file-like objects) are dimmed directly and not cached.
+    :param image_file_path: Input image file path or file-like object
+    :param brightness: Brightness factor (e.g. 0.5 to reduce brightness by 50%)
+    :param max_size: Longest side of the variant. Smaller images are not upscaled.
+    :return: Image (a copy, safe to draw on)
+    """
+    if not isinstance(image_file_path, str):
+        return _dim(Image.open(image_file_path), brightness, max_size)
+
+    key = f"{os.path.abspath(image_file_path)}:{os.path.getmtime(image_file_path)}:{brightness}:{max_size}"
+    stem = os.path.basename(image_file_path).split(".")[0]
+    variant_path = os.path.join(BACKGROUND_DIR, f"{stem}_{hashlib.sha256(key.encode()).hexdigest()[:16]}.png")
+
+    if not os.path.exists(variant_path):
+        image = _dim(_decode_image(image_file_path), brightness, max_size)
+
+        # Write to a temporary file first, so concurrent renders never read a partial variant
+        os.makedirs(BACKGROUND_DIR, exist_ok=True)
+        tmp_path = f"{variant_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        image.save(tmp_path, format="PNG")
+        os.replace(tmp_path, variant_path)
+
+    return get_image(variant_path)
+
+
+def clear():
+    """
+    Clear both caches (e.g. after assets changed on disk).
+    """
+    get_font.cache_clear()
+    get_advance.cache_clear()
+    _decode_image.cache_clear()
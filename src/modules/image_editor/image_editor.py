@@ -1,64 +1,60 @@
-from PIL import Image
 from PIL import ImageDraw
-from PIL import ImageFont, ImageEnhance
 import textwrap
 
+from . import cache, output
+from .. import metrics
+
 
 class Templates:
     @staticmethod
-    def image_with_text(image_file_path: str,
+    @metrics.timed("image_render_seconds", "Time spent rendering images", template="image_with_text")
+    def image_with_text(image_file_path,
                         text: str,
                         output_path: str,
                         font_path: str = "../assets/fonts/Montserrat-ExtraBold.ttf",
                         font_size: int = 48,
                         image_brightness: float = 0.5,
-                        textwrap_width: int = 24) -> str:
+                        textwrap_width: int = 24,
+                        file_name: str = None,
+                        output_format: str = "PNG",
+                        quality: int = 85) -> str:
         """
         Create an image with text in the center.
-        :param image_file_path: Input image file path
+        :param image_file_path: Input image file path, or file-like object
         :param text: Text to be written on the image
         :param output_path: Output path for the image
         :param font_path: Font path
         :param font_size: Font size
         :param image_brightness: Image brightness
         :param textwrap_width: Text wrap width
+        :param file_name: Output file name. Defaults to the hash of the rendered image.
+        :param output_format: Output format (PNG, JPEG or WEBP)
+        :param quality: Output quality for JPEG and WEBP
         :return:
         """
-        file_name = image_file_path.split("/")[-1]
-        image = Image.open(image_file_path)
+        # Pre-dimmed background. To reduce brightness by 50%, use factor 0.5
+        image = cache.get_background(image_file_path, image_brightness)
 
-        font = ImageFont.truetype(font_path, font_size)
-        enhancer = ImageEnhance.Brightness(image)
-        # to reduce brightness by 50%, use factor 0.5
-        image = enhancer.enhance(image_brightness)
+        font = cache.get_font(font_path, font_size)
         draw = ImageDraw.Draw(image)
 
         lines = textwrap.wrap(text, width=textwrap_width)
 
-        max_width = 0
-        total_height = 0
-        for line in lines:
-            width, height = draw.textsize(line, font=font)
-            max_width = max(max_width, width)
-            total_height += height
+        # Measure each line once
+        line_sizes = [draw.textsize(line, font=font) for line in lines]
+        max_width = max([width for width, height in line_sizes], default=0)
+        total_height = sum([height for width, height in line_sizes])
 
         x = (image.width - max_width) // 2
         y = (image.height - total_height) // 2
 
-        line_heights = []
-        for line in lines:
-            width, height = draw.textsize(line, font=font)
-            line_heights.append(height)
-
         line_y = y
-        for i in range(len(lines)):
-            line_x = x + (max_width - draw.textsize(lines[i], font=font)[0]) // 2
-            draw.text((line_x, line_y), lines[i], font=font)
-            line_y += line_heights[i]
+        for line, (width, height) in zip(lines, line_sizes):
+            line_x = x + (max_width - width) // 2
+            draw.text((line_x, line_y), line, font=font)
+            line_y += height
 
-        new_name = file_name.split(".")[0] + ".png"
-        file_location = output_path + new_name
-        image.save(file_location)
+        file_location = output.save(image, output_path, output_format, quality, file_name)
 
         return file_location
 
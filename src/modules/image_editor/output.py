@@ -0,0 +1,73 @@
+"""
+Encoding and content-addressed saving of rendered images.
+"""
+
+import io
+import os
+import threading
+
+from PIL import Image
+
+from .. import media_store
+
+MAX_MEDIA_BYTES = 5 * 1024 * 1024  # Twitter image upload limit
+MIN_QUALITY = 50  # Lowest quality used when shrinking lossy images to fit MAX_MEDIA_BYTES
+
+FORMATS = {
+    "PNG": "png",
+    "JPEG": "jpg",
+    "WEBP": "webp",
+}
+
+
+def encode(image: Image.Image, output_format: str = "PNG", quality: int = 85,
+           max_bytes: int = MAX_MEDIA_BYTES) -> bytes:
+    """
+    Encode an image. PNGs are optimized; JPEG and WebP quality is lowered in steps until the image fits max_bytes.
+    :param image: Image to encode
+    :param output_format: One of PNG, JPEG or WEBP
+    :param quality: Quality of lossy formats (1-100)
+    :param max_bytes: Maximum encoded size
+    :return: Encoded image
+    """
+    output_format = output_format.upper()
+    if output_format not in FORMATS:
+        raise ValueError(f"Output format {output_format} not supported. Please use one of {list(FORMATS)}.")
+
+    if output_format == "PNG":
+        buffer = io.BytesIO()
+        image.save(buffer, format="PNG", optimize=True)
+        return buffer.getvalue()
+
+    if image.mode not in ("RGB", "L"):
+        image = image.convert("RGB")
+    while True:
+        buffer = io.BytesIO()
+        image.save(buffer, format=output_format, quality=quality, optimize=True)
+        if buffer.tell() <= max_bytes or quality <= MIN_QUALITY:
+            return buffer.getvalue()
+        quality -= 10
+
+
+def save(image: Image.Image, output_path: str, output_format: str = "PNG", quality: int = 85,
+         file_name: str = None) -> str:
+    """
+    Encode and save an image. Files are named after the hash of their content (see media_store), so identical renders
+    share a file and different renders never overwrite each other.
+    :param image: Image to save
+    :param output_path: Output directory
+    :param output_format: One of PNG, JPEG or WEBP
+    :param quality: Quality of lossy formats (1-100)
+    :param file_name: Output file name. Defaults to the content hash.
+    :return: Output file path
+    """
+    data = encode(image, output_format, quality)
+    if file_name is None:
+        return media_store.put_bytes(data, FORMATS[output_format.upper()], output_path)
+
+    file_location = os.path.join(output_path, file_name)
+    tmp_location = f"{file_location}.{os.getpid()}.{threading.get_ident()}.tmp"
+    with open(tmp_location, "wb") as f:
+        f.write(data)
+    os.replace(tmp_location, file_location)
+    return file_location
@@ -1,6 +1,7 @@
 from PIL import Image
 from PIL import ImageDraw
-from PIL import ImageFont
+
+from . import cache
 
 
 class ImageText(object):
@@ -8,7 +9,7 @@ class ImageText(object):
                  encoding='utf8'):
         if isinstance(filename_or_size, str):
             self.filename = filename_or_size
-            self.image = Image.open(self.filename)
+            self.image = cache.get_image(self.filename)
             self.size = self.image.size
         elif isinstance(filename_or_size, (list, tuple)):
             self.size = filename_or_size
@@ -23,29 +24,41 @@ class ImageText(object):
     def get_font_size(self, text, font, max_width=None, max_height=None):
         if max_width is None and max_height is None:
             raise ValueError('You need to pass max_width or max_height')
-        font_size = 1
-        text_size = self.get_text_size(font, font_size, text)
+        text_size = self.get_text_size(font, 1, text)
         if (max_width is not None and text_size[0] > max_width) or \
                 (max_height is not None and text_size[1] > max_height):
             raise ValueError("Text can't be filled in only (%dpx, %dpx)" % \
                              text_size)
-        while True:
-            if (max_width is not None and text_size[0] >= max_width) or \
-                    (max_height is not None and text_size[1] >= max_height):
-                return font_size - 1
-            font_size += 1
-            text_size = self.get_text_size(font, font_size, text)
+
+        def fits(font_size):
+            width, height = self.get_text_size(font, font_size, text)
+            return (max_width is None or width < max_width) and \
+                (max_height is None or height < max_height)
+
+        if not fits(1):
+            return 0
+        # Double the size until the text overflows, then binary search for the largest size that fits
+        low, high = 1, 2
+        while fits(high):
+            low, high = high, high * 2
+        while high - low > 1:
+            mid = (low + high) // 2
+            if fits(mid):
+                low = mid
+            else:
+                high = mid
+        return low
 
     def write_text(self, x, y, text, font_filename, font_size=11,
                    color=(0, 0, 0), max_width=None, max_height=None):
-        if isinstance(text, str):
+        if isinstance(text, bytes):
             text = text.decode(self.encoding)
         if font_size == 'fill' and \
                 (max_width is not None or max_height is not None):
             font_size = self.get_font_size(text, font_filename, max_width,
                                            max_height)
         text_size = self.get_text_size(font_filename, font_size, text)
-        font = ImageFont.truetype(font_filename, font_size)
+        font = cache.get_font(font_filename, font_size)
         if x == 'center':
             x = (self.size[0] - text_size[0]) / 2
         if y == 'center':
@@ -54,64 +67,63 @@ class ImageText(object):
         return text_size
 
     def get_text_size(self, font_filename, font_size, text):
-        font = ImageFont.truetype(font_filename, font_size)
+        font = cache.get_font(font_filename, font_size)
         return font.getsize(text)
 
     def write_text_box(self, x, y, text, box_width, font_filename,
                        font_size=11, color=(0, 0, 0), place='left',
                        justify_last_line=False):
+        # Wrap in a single pass, measuring each word once from cached advances
+        space_width = cache.get_advance(font_filename, font_size, ' ')
+        text_height = self.get_text_size(font_filename, font_size, text)[1]
         lines = []
+        line_widths = []
         line = []
-        words = text.split()
-        for word in words:
-            new_line = ' '.join(line + [word])
-            size = self.get_text_size(font_filename, font_size, new_line)
-            text_height = size[1]
-            if size[0] <= box_width:
+        line_width = 0
+        for word in text.split():
+            word_width = cache.get_advance(font_filename, font_size, word)
+            new_width = line_width + space_width + word_width if line else word_width
+            if new_width <= box_width or not line:
                 line.append(word)
+                line_width = new_width
             else:
-                lines.append(line)
+                lines.append(' '.join(line))
+                line_widths.append(line_width)
                 line = [word]
+                line_width = word_width
         if line:
-            lines.append(line)
-        lines = [' '.join(line) for line in lines if line]
+            lines.append(' '.join(line))
+            line_widths.append(line_width)
         height = y
         for index, line in enumerate(lines):
             height += text_height
             if place == 'left':
-                self.write_text((x, height), line, font_filename, font_size,
+                self.write_text(x, height, line, font_filename, font_size,
                                 color)
             elif place == 'right':
-                total_size = self.get_text_size(font_filename, font_size, line)
-                x_left = x + box_width - total_size[0]
-                self.write_text((x_left, height), line, font_filename,
+                x_left = x + box_width - line_widths[index]
+                self.write_text(x_left, height, line, font_filename,
                                 font_size, color)
             elif place == 'center':
-                total_size = self.get_text_size(font_filename, font_size, line)
-                x_left = int(x + ((box_width - total_size[0]) / 2))
-                self.write_text((x_left, height), line, font_filename,
+                x_left = int(x + ((box_width - line_widths[index]) / 2))
+                self.write_text(x_left, height, line, font_filename,
                                 font_size, color)
             elif place == 'justify':
                 words = line.split()
                 if (index == len(lines) - 1 and not justify_last_line) or \
                         len(words) == 1:
-                    self.write_text((x, height), line, font_filename, font_size,
+                    self.write_text(x, height, line, font_filename, font_size,
                                     color)
                     continue
-                line_without_spaces = ''.join(words)
-                total_size = self.get_text_size(font_filename, font_size,
-                                                line_without_spaces)
-                space_width = (box_width - total_size[0]) / (len(words) - 1.0)
+                word_widths = [cache.get_advance(font_filename, font_size, word)
+                               for word in words]
+                space_width = (box_width - sum(word_widths)) / (len(words) - 1.0)
                 start_x = x
-                for word in words[:-1]:
-                    self.write_text((start_x, height), word, font_filename,
+                for word, word_width in zip(words[:-1], word_widths[:-1]):
+                    self.write_text(start_x, height, word, font_filename,
                                     font_size, color)
-                    word_size = self.get_text_size(font_filename, font_size,
-                                                   word)
-                    start_x += word_size[0] + space_width
-                last_word_size = self.get_text_size(font_filename, font_size,
-                                                    words[-1])
-                last_word_x = x + box_width - last_word_size[0]
-                self.write_text((last_word_x, height), words[-1], font_filename,
+                    start_x += word_width + space_width
+                last_word_x = x + box_width - word_widths[-1]
+                self.write_text(last_word_x, height, words[-1], font_filename,
                                 font_size, color)
         return box_width, height - y
@@ -0,0 +1,122 @@
+"""
+Import Helpers Module
+Lazy imports for heavy provider modules, and an import timer for startup-time reports.
+
+Usage:
+openai_api = lazy_import("modules.openai_api")  # imported on first attribute access
+
+with ImportTimer() as import_timer:
+    import scheduler
+logger.info(import_timer.report())
+"""
+
+import sys
+import time
+import types
+import importlib
+import threading
+
+
+class LazyModule(types.ModuleType):
+    """
+    Stand-in for a module that is imported on first attribute access. Imports go through importlib, so they are
+    thread-safe and later accesses are a sys.modules lookup.
+    """
+
+    def __getattr__(self, attr):
+        return getattr(importlib.import_module(self.__name__), attr)
+
+    def __repr__(self):
+        loaded = "loaded" if self.__name__ in sys.modules else "not loaded"
+        return f"<lazy module '{self.__name__}' ({loaded})>"
+
+
+def lazy_import(name: str) -> types.ModuleType:
+    """
+    Get a module without importing it yet. Returns the module itself if it is already imported.
+    :param name: Absolute module name (e.g. "modules.openai_api")
+    :return: Module or LazyModule
+    """
+    return sys.modules.get(name) or LazyModule(name)
+
+
+class ImportTimer:
+    """
+    Meta path finder that times the execution of every module imported while it is active. Self time excludes the
+    time spent importing nested modules, so slow modules are not hidden behind the modules that import them.
+    """
+
+    def __init__(self):
+        self.times: dict[str, tuple[float, float]] = {}  # module -> (self seconds, cumulative seconds)
+        self._local = threading.local()
+        self._start = None
+        self._elapsed = None
+
+    def start(self):
+        self._start = time.perf_counter()
+        sys.meta_path.insert(0, self)
+        return self
+
+    def stop(self):
+        if self in sys.meta_path:
+            sys.meta_path.remove(self)
+            self._elapsed = time.perf_counter() - self._start
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *args):
+        self.stop()
+
+    def find_spec(self, fullname, path=None, target=None):
+        # Find the spec with the remaining finders, then time its loader
+        for finder in sys.meta_path[sys.meta_path.index(self) + 1:]:
+            find_spec = getattr(finder, "find_spec", None)
+            spec = find_spec(fullname, path, target) if find_spec else None
+            if spec is not None:
+                break
+        else:
+            return None
+
+        # Builtin and frozen loaders are shared classes, not per-module instances. They are fast anyway.
+        loader = spec.loader
+        if loader is not None and not isinstance(loader, type) and hasattr(loader, "exec_module"):
+            loader.exec_module = self._timed(fullname, loader.exec_module)
+        return spec
+
+    def _timed(self, name: str, exec_module: callable) -> callable:
+        def wrapper(module):
+            stack = self._local.__dict__.setdefault("stack", [])
+            stack.append(0.0)
+            start = time.perf_counter()
+            try:
+                exec_module(module)
+            finally:
+                elapsed = time.perf_counter() - start
+                nested = stack.pop()
+                self.times[name] = (elapsed - nested, elapsed)
+                if stack:
+                    stack[-1] += elapsed
+
+        return wrapper
+
+    def report(self, top: int = 15) -> str:
+        """
+        Report import times per top-level package and the slowest modules.
+        :param top: Number of packages and modules to list
+        :return: Report
+        """
+        elapsed = self._elapsed if self._elapsed is not None else time.perf_counter() - self._start
+        total = sum(self_time for self_time, _ in self.times.values())
+        packages = {}
+        for name, (self_time, _) in self.times.items():
+            packages[name.split(".")[0]] = packages.get(name.split(".")[0], 0) + self_time
+
+        lines = [f"Imported {len(self.times)} modules in {total:.3f} s ({elapsed:.3f} s since start)",
+                 f"{'package':<40}{'self s':>10}"]
+        for name, self_time in sorted(packages.items(), key=lambda x: -x[1])[:top]:
+            lines.append(f"{name:<40}{self_time:>10.3f}")
+        lines.append(f"{'module':<40}{'self s':>10}{'cumulative s':>14}")
+        for name, (self_time, cumulative) in sorted(self.times.items(), key=lambda x: -x[1][0])[:top]:
+            lines.append(f"{name:<40}{self_time:>10.3f}{cumulative:>14.3f}")
+        return "\n".join(lines)
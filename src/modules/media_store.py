@@ -0,0 +1,117 @@
+"""
+Content-addressed media store.
+Media files are named after the hash of their content, so identical files are stored once. Files are referenced by
+the "media" column of content rows in SQLite; files that are no longer referenced (e.g. after the content was posted
+and its row deleted) are garbage collected.
+"""
+
+import os
+import time
+import hashlib
+import logging
+import threading
+
+MEDIA_DIR = "../assets/generated"
+GRACE_SECONDS = 24 * 60 * 60  # Unreferenced files younger than this are kept (content may still await authorization)
+HASH_LENGTH = 32  # Hex characters of the sha256 digest used in file names
+
+logger = logging.getLogger(__name__)
+
+
+def content_name(data: bytes, extension: str) -> str:
+    """
+    Get the content-addressed file name of data.
+    :param data: File content
+    :param extension: File extension, with or without leading dot
+    :return: File name
+    """
+    return f"{hashlib.sha256(data).hexdigest()[:HASH_LENGTH]}.{extension.lstrip('.')}"
+
+
+def put_bytes(data: bytes, extension: str, media_dir: str = MEDIA_DIR) -> str:
+    """
+    Store data. If identical data is already stored, the existing file is returned.
+    :param data: File content
+    :param extension: File extension, with or without leading dot
+    :param media_dir: Media directory
+    :return: File path
+    """
+    path = os.path.join(media_dir, content_name(data, extension))
+    if not os.path.exists(path):
+        # Write to a temporary file first, so concurrent writers never expose a partial file
+        os.makedirs(media_dir, exist_ok=True)
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    return path
+
+
+def put_stream(chunks, extension: str, media_dir: str = MEDIA_DIR) -> str:
+    """
+    Store data from an iterable of byte chunks (e.g. a streamed download) without holding it in memory. The data is
+    hashed while it is written to a temporary file, which is then renamed to its content-addressed name.
+    :param chunks: Iterable of bytes
+    :param extension: File extension, with or without leading dot
+    :param media_dir: Media directory
+    :return: File path
+    """
+    os.makedirs(media_dir, exist_ok=True)
+    sha = hashlib.sha256()
+    tmp_path = os.path.join(media_dir, f".{os.getpid()}.{threading.get_ident()}.tmp")
+    with open(tmp_path, "wb") as f:
+        for chunk in chunks:
+            sha.update(chunk)
+            f.write(chunk)
+
+    path = os.path.join(media_dir, f"{sha.hexdigest()[:HASH_LENGTH]}.{extension.lstrip('.')}")
+    if os.path.exists(path):
+        os.remove(tmp_path)
+    else:
+        os.replace(tmp_path, path)
+    return path
+
+
+def referenced_media(db) -> set[str]:
+    """
+    Get the absolute paths of all media referenced by content rows.
+    :param db: sqlite_db.Database
+    :return: Set of absolute paths
+    """
+    referenced = set()
+    for table in db.list_tables():
+        db.cursor.execute(f'PRAGMA table_info("{table}")')
+        if "media" not in [x[1] for x in db.cursor.fetchall()]:
+            continue
+        for row in db.select(table_name=table, fields='"media"', where='"media" IS NOT NULL AND "media" != \'None\''):
+            referenced.add(os.path.abspath(row["media"]))
+    return referenced
+
+
+def collect_garbage(db, media_dir: str = MEDIA_DIR, grace_seconds: float = GRACE_SECONDS) -> list[str]:
+    """
+    Delete media files that are not referenced by any content row and are older than grace_seconds. Temporary files
+    left by interrupted writes (e.g. a crash during a download) are deleted after the same grace period.
+    :param db: sqlite_db.Database
+    :param media_dir: Media directory
+    :param grace_seconds: Minimum age of deleted files
+    :return: List of deleted file paths
+    """
+    if not os.path.isdir(media_dir):
+        return []
+
+    referenced = referenced_media(db)
+    now = time.time()
+    removed = []
+    with os.scandir(media_dir) as entries:
+        for entry in entries:
+            if not entry.is_file() or (entry.name.startswith(".") and not entry.name.endswith(".tmp")):
+                continue
+            if os.path.abspath(entry.path) in referenced or now - entry.stat().st_mtime < grace_seconds:
+                continue
+            os.remove(entry.path)
+            removed.append(entry.path)
+
+    if removed:
+        logger.info(f"Removed {len(removed)} unreferenced media files from {media_dir}.")
+    return removed
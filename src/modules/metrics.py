@@ -0,0 +1,266 @@
+"""
+Metrics Module
+Lightweight counters, histograms and timers for the hot paths of the pipeline, exported in the Prometheus text format
+to a file or a local HTTP endpoint.
+
+Usage:
+@metrics.timed("openai_completion_seconds", "Time spent in OpenAI completions")
+def completion(...):
+    ...
+
+with metrics.timer("content_gen_seconds", "Time spent generating content", func="random_thought"):
+    ...
+
+metrics.counter("posts_total", "Posted content objects").inc(account="thewisestoic")
+"""
+
+import os
+import time
+import bisect
+import logging
+import threading
+import functools
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+# Seconds. Spans LLM calls (seconds) up to human authorization round-trips (hours).
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300, 600, 1800, 3600)
+
+logger = logging.getLogger(__name__)
+
+_process_labels: dict = {}  # Added to every exported series, see set_process_labels
+
+
+def set_process_labels(**labels):
+    """
+    Add labels to every exported series of this process, e.g. the worker id of a worker process, so the metrics files
+    of several processes can be collected side by side.
+    """
+    _process_labels.update(labels)
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted((k, str(v)) for k, v in labels.items()))
+
+
+def _format_labels(label_key: tuple, extra: dict = None) -> str:
+    items = list(label_key) + list(_process_labels.items()) + list((extra or {}).items())
+    if not items:
+        return ""
+    escaped = [(k, str(v).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')) for k, v in items]
+    return "{" + ",".join(f'{k}="{v}"' for k, v in escaped) + "}"
+
+
+class Counter:
+    """
+    Monotonically increasing counter, per label set.
+    """
+
+    def __init__(self, name: str, help_text: str = ""):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + amount
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Gauge:
+    """
+    Value that can go up and down, per label set.
+    """
+
+    def __init__(self, name: str, help_text: str = ""):
+        self.name = name
+        self.help_text = help_text
+        self._values = {}
+        self._lock = threading.Lock()
+
+    def set(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = value
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} gauge"]
+        with self._lock:
+            for key, value in self._values.items():
+                lines.append(f"{self.name}{_format_labels(key)} {value}")
+        return lines
+
+
+class Histogram:
+    """
+    Histogram of observed values with cumulative buckets, per label set.
+    """
+
+    def __init__(self, name: str, help_text: str = "", buckets: tuple = DEFAULT_BUCKETS):
+        self.name = name
+        self.help_text = help_text
+        self.buckets = tuple(sorted(buckets))
+        self._values = {}  # label key -> [bucket counts..., sum, count]
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            values = self._values.setdefault(key, [0] * (len(self.buckets) + 2))
+            if index < len(self.buckets):
+                values[index] += 1
+            values[-2] += value
+            values[-1] += 1
+
+    def count(self, **labels) -> int:
+        values = self._values.get(_label_key(labels))
+        return values[-1] if values else 0
+
+    def sum(self, **labels) -> float:
+        values = self._values.get(_label_key(labels))
+        return values[-2] if values else 0.0
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.help_text}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, values in self._values.items():
+                cumulative = 0
+                for bound, bucket_count in zip(self.buckets, values):
+                    cumulative += bucket_count
+                    lines.append(f"{self.name}_bucket{_format_labels(key, {'le': bound})} {cumulative}")
+                lines.append(f"{self.name}_bucket{_format_labels(key, {'le': '+Inf'})} {values[-1]}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {values[-2]}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {values[-1]}")
+        return lines
+
+
+_registry: dict[str, Counter or Gauge or Histogram] = {}
+_registry_lock = threading.Lock()
+
+
+def counter(name: str, help_text: str = "") -> Counter:
+    """
+    Get or create a counter.
+    """
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Counter(name, help_text)
+        return _registry[name]
+
+
+def gauge(name: str, help_text: str = "") -> Gauge:
+    """
+    Get or create a gauge.
+    """
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Gauge(name, help_text)
+        return _registry[name]
+
+
+def histogram(name: str, help_text: str = "", buckets: tuple = DEFAULT_BUCKETS) -> Histogram:
+    """
+    Get or create a histogram.
+    """
+    with _registry_lock:
+        if name not in _registry:
+            _registry[name] = Histogram(name, help_text, buckets)
+        return _registry[name]
+
+
+@contextmanager
+def timer(name: str, help_text: str = "", **labels):
+    """
+    Time a block into histogram `name` (seconds). Failed blocks are also counted in `{name}_errors_total`.
+    :param name: Histogram name
+    :param help_text: Histogram help text
+    :param labels: Labels
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        counter(f"{name}_errors_total", f"Errors in: {help_text}").inc(**labels)
+        raise
+    finally:
+        histogram(name, help_text).observe(time.perf_counter() - start, **labels)
+
+
+def timed(name: str, help_text: str = "", **labels) -> callable:
+    """
+    Decorator version of timer.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with timer(name, help_text, **labels):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def render() -> str:
+    """
+    Render all metrics in the Prometheus text format.
+    """
+    with _registry_lock:
+        metrics = list(_registry.values())
+    lines = []
+    for metric in metrics:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+def write(path: str):
+    """
+    Write all metrics to a file (e.g. for the node_exporter textfile collector). The file is replaced atomically.
+    """
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as f:
+        f.write(render())
+    os.replace(tmp_path, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+
+    def do_GET(self):
+        body = render().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port: int, host: str = "127.0.0.1") -> ThreadingHTTPServer:
+    """
+    Serve all metrics over HTTP from a background thread.
+    :param port: Port
+    :param host: Host. Local only by default.
+    :return: Server (call shutdown() to stop)
+    """
+    server = ThreadingHTTPServer((host, port), _MetricsHandler)
+    threading.Thread(target=server.serve_forever, name="metrics", daemon=True).start()
+    logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+    return server
@@ -2,17 +2,29 @@
 OpenAI API module
 """
 
-import os
 import requests
-import uuid
 import logging
+from concurrent.futures import ThreadPoolExecutor
+
+from requests.adapters import HTTPAdapter
 
 import openai
 
+from . import media_store, metrics, tracing
+
 # Enable logging
 logger = logging.getLogger(__name__)
 
+DOWNLOAD_CHUNK_SIZE = 64 * 1024
+DOWNLOAD_WORKERS = 10  # Concurrent image downloads (up to 10 images per request)
+
+# Pooled HTTP session for image downloads
+_session = requests.Session()
+_session.mount("https://", HTTPAdapter(pool_connections=4, pool_maxsize=DOWNLOAD_WORKERS))
 
+
+@metrics.timed("openai_completion_seconds", "Time spent in OpenAI completions")
+@tracing.traced("openai.completion")
 def completion(content: str or list,
                api_key: str,
                role: str or list = "user",
@@ -49,38 +61,69 @@ def completion(content: str or list,
     return response.choices[0].message.content
 
 
+@metrics.timed("openai_image_seconds", "Time spent in OpenAI image generation")
+@tracing.traced("openai.image")
+def _create_images(prompt: str, api_key: str, n: int, size: str) -> list[str]:
+    """
+    Request images from the image endpoint.
+    :return: List of image urls
+    """
+    openai.api_key = api_key
+
+    response = openai.Image.create(
+        prompt=prompt,
+        n=n,
+        size=size,
+        response_format="url"
+    )
+
+    return [data.url for data in response.data]
+
+
+@metrics.timed("openai_image_download_seconds", "Time spent downloading OpenAI images")
+def _download_to_file(url: str, output_path: str) -> str:
+    """
+    Stream image from url straight to disk, named after its content.
+    """
+    with _session.get(url, stream=True) as r:
+        r.raise_for_status()
+        return media_store.put_stream(r.iter_content(chunk_size=DOWNLOAD_CHUNK_SIZE), "png", output_path)
+
+
 def image(prompt: str,
           api_key: str,
-          n: int = 1,
           size: str = "512x512",
           output_path: str = "."
           ) -> str:
     """
-    Image endpoint
+    Image endpoint. Generates a single image; use images to generate several.
     :param prompt: Prompt for image
     :param api_key: Dictionary of api keys
-    :param n: Number of images to generate (1-10)
     :param size: Size of image (one of 256x256, 512x512, 1024x1024)
     :param output_path: Path to save image
     :return: Path to image
     """
+    urls = _create_images(prompt, api_key, 1, size)
+    return _download_to_file(urls[0], output_path)
 
-    openai.api_key = api_key
 
-    response = openai.Image.create(
-        prompt=prompt,
-        n=n,
-        size=size,
-        response_format="url"
-    )
-
-    url = response.data[0].url
-    filename = f"{uuid.uuid4()}.png"
-    path = os.path.join(output_path, filename)
+def images(prompt: str,
+           api_key: str,
+           n: int = 1,
+           size: str = "512x512",
+           output_path: str = "."
+           ) -> list[str]:
+    """
+    Image endpoint, downloading all n images concurrently and streaming them to disk.
+    :param prompt: Prompt for images
+    :param api_key: Dictionary of api keys
+    :param n: Number of images to generate (1-10)
+    :param size: Size of images (one of 256x256, 512x512, 1024x1024)
+    :param output_path: Path to save images
+    :return: List of paths to images
+    """
+    urls = _create_images(prompt, api_key, n, size)
 
-    # Download image from url and save to output_path
-    r = requests.get(url)
-    with open(path, "wb") as f:
-        f.write(r.content)
+    with ThreadPoolExecutor(max_workers=max(1, min(len(urls), DOWNLOAD_WORKERS))) as executor:
+        return list(executor.map(lambda url: _download_to_file(url, output_path), urls))
 
-    return path
@@ -2,16 +2,35 @@
 Relational database module
 """
 
+import time
+import uuid
 import sqlite3
+import datetime
+
+from . import metrics
+
+SCRAPED_TWEETS_TABLE = "ScrapedTweet"
+SCRAPED_TWEETS_FIELDS = ["tweet_id", "tweet_url", "tweet_text", "tweet_media", "profile_handle"]
+
+# Posts moved out of the content tables when their job fires. Each post is a state machine:
+# pending -> posting -> posted, or back to pending (retry after a failure), or failed (gave up)
+OUTBOX_TABLE = "Outbox"
+OUTBOX_STATES = ("pending", "posting", "posted", "failed")
+
+# Work queue shared by worker processes. Tasks move pending -> running -> done, or back to pending (retry after a
+# failure or an expired lease), or failed (gave up)
+TASK_TABLE = "Task"
+TASK_STATES = ("pending", "running", "done", "failed")
 
 
 class Database:
-    def __init__(self, db_file_path):
+    def __init__(self, db_file_path, timeout: float = 30):
         """
         Create a new database connection
         :param db_file_path: Location of the database file
+        :param timeout: Seconds to wait for a lock held by another connection (e.g. another worker process)
         """
-        self.conn = sqlite3.connect(db_file_path)
+        self.conn = sqlite3.connect(db_file_path, timeout=timeout)
         self.cursor = self.conn.cursor()
 
     def close(self):
@@ -19,16 +38,22 @@ class Database:
 
     def create_table(self, table_name: str, fields: list[str]):
         """
-        Create a new table
+        Create a new table. If the table already exists, missing fields are added as new columns.
         :param table_name: Name of the table
         :param fields: Fields of the table
         :return:
         """
-        fields = ", ".join([f'"{field}"' for field in fields])
-        table_name = f'"{table_name}"'
+        fields_ = ", ".join([f'"{field}"' for field in fields])
+        table_name_ = f'"{table_name}"'
         self.cursor.execute('''
             CREATE TABLE IF NOT EXISTS {} ({})
-        '''.format(table_name, fields))
+        '''.format(table_name_, fields_))
+
+        self.cursor.execute(f"PRAGMA table_info({table_name_})")
+        existing_fields = [x[1] for x in self.cursor.fetchall()]
+        for field in fields:
+            if field not in existing_fields:
+                self.cursor.execute(f'ALTER TABLE {table_name_} ADD COLUMN "{field}"')
         self.conn.commit()
 
     def drop_table(self, table_name: str):
@@ -57,6 +82,7 @@ class Database:
         res_flattened = [x[0] for x in res]
         return res_flattened
 
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="insert")
     def insert(self, table_name: str, fields: list[str], values: list[str], unique: bool = True):
         """
         Insert a new row into a table
@@ -79,6 +105,7 @@ class Database:
                 VALUES ({})
             '''.format(table_name, fields, values))
 
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="update")
     def update(self, table_name: str, fields: list[str], values: list[str], where: str = None):
         """
         Update rows in a table. If where clause returns no rows, insert a new row.
@@ -101,6 +128,36 @@ class Database:
             self.insert(table_name, fields, values)
         self.conn.commit()
 
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="update_many")
+    def update_many(self, table_name: str, fields: list[str], rows: list[list[str]], key_field: str):
+        """
+        Update or insert many rows in a single transaction. Rows are matched on key_field, which must be one of fields.
+        Either all rows are written or none are.
+        :param table_name: Name of the table
+        :param fields: Fields to update
+        :param rows: List of values to update, one list per row, in the same order as fields
+        :param key_field: Field used to match existing rows
+        :return:
+        """
+        key_index = fields.index(key_field)
+        fields_ = ", ".join([f'"{field}"' for field in fields])
+        placeholders = ", ".join(["?"] * len(fields))
+        table_name = f'"{table_name}"'
+        with self.conn:
+            for values in rows:
+                values = [str(value) for value in values]
+                self.cursor.execute('''
+                    UPDATE {}
+                    SET ({}) = ({})
+                    WHERE "{}" = ?
+                '''.format(table_name, fields_, placeholders, key_field), values + [values[key_index]])
+                if self.cursor.rowcount == 0:
+                    self.cursor.execute('''
+                        INSERT INTO {} ({})
+                        VALUES ({})
+                    '''.format(table_name, fields_, placeholders), values)
+
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="select")
     def select(self, table_name: str, fields: str, where: str = None, return_dict: bool = True):
         """
         Select rows from a table
@@ -123,6 +180,7 @@ class Database:
         else:
             return self.cursor.fetchall()
 
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="delete")
     def delete(self, table_name: str, where: str = None):
         """
         Delete rows from a table
@@ -138,3 +196,386 @@ class Database:
             {}
         '''.format(table_name, where))
         self.conn.commit()
+
+    def create_scraped_tweets_table(self):
+        """
+        Create the scraped tweets table, its indexes and its FTS5 full-text index on tweet_text. The full-text index is
+        kept in sync with triggers.
+        :return:
+        """
+        self.cursor.executescript('''
+            CREATE TABLE IF NOT EXISTS "{table}" (
+                "tweet_id" TEXT PRIMARY KEY,
+                "tweet_url" TEXT,
+                "tweet_text" TEXT,
+                "tweet_media" TEXT,
+                "profile_handle" TEXT,
+                "scraped_on" TEXT,
+                "last_used_on" TEXT,
+                "last_used_by" TEXT,
+                "last_used_to" TEXT
+            );
+            CREATE INDEX IF NOT EXISTS "{table}_profile_handle" ON "{table}" ("profile_handle", "last_used_on");
+            CREATE INDEX IF NOT EXISTS "{table}_last_used_on" ON "{table}" ("last_used_on");
+
+            CREATE VIRTUAL TABLE IF NOT EXISTS "{table}FTS" USING fts5(
+                "tweet_text", content="{table}", content_rowid="rowid"
+            );
+            CREATE TRIGGER IF NOT EXISTS "{table}_ai" AFTER INSERT ON "{table}" BEGIN
+                INSERT INTO "{table}FTS" (rowid, "tweet_text") VALUES (new.rowid, new."tweet_text");
+            END;
+            CREATE TRIGGER IF NOT EXISTS "{table}_ad" AFTER DELETE ON "{table}" BEGIN
+                INSERT INTO "{table}FTS" ("{table}FTS", rowid, "tweet_text")
+                VALUES ('delete', old.rowid, old."tweet_text");
+            END;
+            CREATE TRIGGER IF NOT EXISTS "{table}_au" AFTER UPDATE OF "tweet_text" ON "{table}" BEGIN
+                INSERT INTO "{table}FTS" ("{table}FTS", rowid, "tweet_text")
+                VALUES ('delete', old.rowid, old."tweet_text");
+                INSERT INTO "{table}FTS" (rowid, "tweet_text") VALUES (new.rowid, new."tweet_text");
+            END;
+        '''.format(table=SCRAPED_TWEETS_TABLE))
+        self.conn.commit()
+
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="insert_scraped_tweets")
+    def insert_scraped_tweets(self, tweets: list[dict]) -> int:
+        """
+        Bulk insert scraped tweets in a single transaction. Tweets without tweet_id or tweet_text (ads, media only
+        tweets) and tweets already in the table are skipped.
+        :param tweets: List of tweet dicts as returned by the twitter_web scrapers
+        :return: Number of inserted tweets
+        """
+        scraped_on = str(datetime.datetime.now())
+        rows = [[tweet.get(field, "") for field in SCRAPED_TWEETS_FIELDS] + [scraped_on]
+                for tweet in tweets if tweet.get("tweet_id") and tweet.get("tweet_text")]
+        fields = ", ".join([f'"{field}"' for field in SCRAPED_TWEETS_FIELDS + ["scraped_on"]])
+        placeholders = ", ".join(["?"] * (len(SCRAPED_TWEETS_FIELDS) + 1))
+        with self.conn:
+            self.cursor.executemany('''
+                INSERT OR IGNORE INTO "{}" ({})
+                VALUES ({})
+            '''.format(SCRAPED_TWEETS_TABLE, fields, placeholders), rows)
+        return self.cursor.rowcount
+
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="sample_unused_tweets")
+    def sample_unused_tweets(self, profile_handles: list[str] = None, match: str = None, n: int = 1) -> list[dict]:
+        """
+        Sample random scraped tweets that have not been used yet.
+        :param profile_handles: Only sample tweets from these profiles. Any profile if None.
+        :param match: FTS5 query the tweet text must match (e.g. "stoic OR virtue"). Optional.
+        :param n: Number of tweets to sample
+        :return: List of tweet dicts
+        """
+        where = ['t."last_used_on" IS NULL']
+        params = []
+        if profile_handles is not None:
+            where.append(f't."profile_handle" IN ({", ".join(["?"] * len(profile_handles))})')
+            params.extend(profile_handles)
+        join = ""
+        if match:
+            join = f'JOIN "{SCRAPED_TWEETS_TABLE}FTS" f ON f.rowid = t.rowid'
+            where.append(f'"{SCRAPED_TWEETS_TABLE}FTS" MATCH ?')
+            params.append(match)
+        self.cursor.execute('''
+            SELECT t.* FROM "{}" t
+            {}
+            WHERE {}
+            ORDER BY random()
+            LIMIT ?
+        '''.format(SCRAPED_TWEETS_TABLE, join, " AND ".join(where)), params + [n])
+        rows = self.cursor.fetchall()
+        return [dict(zip([x[0] for x in self.cursor.description], row)) for row in rows]
+
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="mark_tweet_used")
+    def mark_tweet_used(self, tweet_id: str, used_by: str, used_to: str):
+        """
+        Mark a scraped tweet as used, so it is not sampled again.
+        :param tweet_id: Id of the tweet
+        :param used_by: Handle of the account that used the tweet
+        :param used_to: What the tweet was used for (e.g. "copycat", "reply")
+        :return:
+        """
+        self.cursor.execute('''
+            UPDATE "{}"
+            SET "last_used_on" = ?, "last_used_by" = ?, "last_used_to" = ?
+            WHERE "tweet_id" = ?
+        '''.format(SCRAPED_TWEETS_TABLE), [str(datetime.datetime.now()), used_by, used_to, tweet_id])
+        self.conn.commit()
+
+    def create_outbox_table(self):
+        """
+        Create the outbox table and its index on due posts. The media column is kept for pending and failed posts only,
+        so media of posts that are not posted yet is never garbage collected. The progress column holds the ids posted
+        so far by a failed attempt (JSON), so a retry resumes a partially posted thread.
+        :return:
+        """
+        self.cursor.executescript('''
+            CREATE TABLE IF NOT EXISTS "{table}" (
+                "id" TEXT PRIMARY KEY,
+                "content_hash" TEXT,
+                "table_name" TEXT,
+                "content" TEXT,
+                "media" TEXT,
+                "state" TEXT NOT NULL DEFAULT 'pending',
+                "attempts" INTEGER NOT NULL DEFAULT 0,
+                "next_attempt_at" REAL NOT NULL DEFAULT 0,
+                "lease_until" REAL,
+                "claimed_by" TEXT,
+                "result" TEXT,
+                "error" TEXT,
+                "progress" TEXT,
+                "created_on" TEXT,
+                "updated_on" TEXT
+            );
+            CREATE INDEX IF NOT EXISTS "{table}_due" ON "{table}" ("state", "next_attempt_at");
+        '''.format(table=OUTBOX_TABLE))
+        # Outbox tables created before progress was recorded
+        self.cursor.execute(f'PRAGMA table_info("{OUTBOX_TABLE}")')
+        if "progress" not in [x[1] for x in self.cursor.fetchall()]:
+            self.cursor.execute(f'ALTER TABLE "{OUTBOX_TABLE}" ADD COLUMN "progress" TEXT')
+        self.conn.commit()
+
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="move_to_outbox")
+    def move_to_outbox(self, post_id: str, table_name: str, content_hash: str, content: str, media: str = None) -> bool:
+        """
+        Add a post to the outbox and delete its content row, in one transaction. Adding the same post_id twice is a
+        no-op, so a job that runs again after a restart does not create a second post.
+        :param post_id: Unique id of the post (e.g. content hash and fire time)
+        :param table_name: Content table the post is moved from
+        :param content_hash: Hash of the content row
+        :param content: Serialized content object (JSON)
+        :param media: Path to the media of the post. Optional.
+        :return: True if the post was added, False if it was already in the outbox
+        """
+        now = str(datetime.datetime.now())
+        with self.conn:
+            self.cursor.execute('''
+                INSERT OR IGNORE INTO "{}" ("id", "content_hash", "table_name", "content", "media", "created_on",
+                                           "updated_on")
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            '''.format(OUTBOX_TABLE), [post_id, content_hash, table_name, content, media, now, now])
+            added = self.cursor.rowcount == 1
+            self.cursor.execute(f'DELETE FROM "{table_name}" WHERE "hash" = ?', [content_hash])
+        return added
+
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="claim_outbox_entry")
+    def claim_outbox_entry(self, lease_seconds: float, post_id: str = None) -> dict or None:
+        """
+        Claim a due pending post and move it to posting. Claims are atomic: a post is claimed by exactly one caller,
+        even across processes, and a post that is already claimed or posted is never claimed again.
+        :param lease_seconds: Seconds the claim is held. Posts still posting after their lease are recovered by
+        expire_outbox_leases.
+        :param post_id: Claim this post. The longest due post is claimed if None.
+        :return: Dict of the claimed outbox row, or None if nothing could be claimed
+        """
+        now = time.time()
+        token = uuid.uuid4().hex
+        where = '"state" = \'pending\' AND "next_attempt_at" <= ?'
+        params = [now]
+        if post_id is not None:
+            where += ' AND "id" = ?'
+            params.append(post_id)
+        with self.conn:
+            self.cursor.execute('''
+                UPDATE "{table}"
+                SET "state" = 'posting', "attempts" = "attempts" + 1, "lease_until" = ?, "claimed_by" = ?,
+                    "updated_on" = ?
+                WHERE "id" = (SELECT "id" FROM "{table}" WHERE {where} ORDER BY "next_attempt_at" LIMIT 1)
+                  AND {where}
+            '''.format(table=OUTBOX_TABLE, where=where),
+                                [now + lease_seconds, token, str(datetime.datetime.now())] + params + params)
+        if self.cursor.rowcount == 0:
+            return None
+        self.cursor.execute(f'SELECT * FROM "{OUTBOX_TABLE}" WHERE "claimed_by" = ?', [token])
+        return dict(zip([x[0] for x in self.cursor.description], self.cursor.fetchone()))
+
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="complete_outbox_entry")
+    def complete_outbox_entry(self, post_id: str, result: str = None):
+        """
+        Mark a claimed post as posted.
+        :param post_id: Id of the post
+        :param result: Result of the post (e.g. the tweet id)
+        :return:
+        """
+        with self.conn:
+            self.cursor.execute('''
+                UPDATE "{}"
+                SET "state" = 'posted', "result" = ?, "media" = NULL, "lease_until" = NULL, "error" = NULL,
+                    "updated_on" = ?
+                WHERE "id" = ? AND "state" = 'posting'
+            '''.format(OUTBOX_TABLE), [result, str(datetime.datetime.now()), post_id])
+
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="fail_outbox_entry")
+    def fail_outbox_entry(self, post_id: str, error: str, retry_at: float = None, progress: str = None):
+        """
+        Record a failed attempt of a claimed post.
+        :param post_id: Id of the post
+        :param error: Error message
+        :param retry_at: Unix time to retry the post at. The post is marked failed (not retried) if None.
+        :param progress: Ids posted so far (JSON), resumed by the next attempt. Previous progress is kept if None.
+        :return:
+        """
+        with self.conn:
+            self.cursor.execute('''
+                UPDATE "{}"
+                SET "state" = ?, "next_attempt_at" = COALESCE(?, "next_attempt_at"), "error" = ?,
+                    "progress" = COALESCE(?, "progress"), "lease_until" = NULL, "updated_on" = ?
+                WHERE "id" = ? AND "state" = 'posting'
+            '''.format(OUTBOX_TABLE),
+                                ["failed" if retry_at is None else "pending", retry_at, error, progress,
+                                 str(datetime.datetime.now()), post_id])
+
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="expire_outbox_leases")
+    def expire_outbox_leases(self) -> int:
+        """
+        Mark posts whose lease expired while posting (e.g. the process crashed) as failed. They are not retried, as
+        they may have been posted before the crash.
+        :return: Number of expired posts
+        """
+        with self.conn:
+            self.cursor.execute('''
+                UPDATE "{}"
+                SET "state" = 'failed', "error" = 'Lease expired while posting. May have been posted.',
+                    "lease_until" = NULL, "updated_on" = ?
+                WHERE "state" = 'posting' AND "lease_until" < ?
+            '''.format(OUTBOX_TABLE), [str(datetime.datetime.now()), time.time()])
+        return self.cursor.rowcount
+
+    def create_task_table(self):
+        """
+        Create the task table and its index on due tasks. Switches the database to WAL mode, so worker processes can
+        read while another process writes.
+        :return:
+        """
+        self.cursor.execute("PRAGMA journal_mode=WAL")
+        self.cursor.executescript('''
+            CREATE TABLE IF NOT EXISTS "{table}" (
+                "id" INTEGER PRIMARY KEY AUTOINCREMENT,
+                "kind" TEXT NOT NULL,
+                "key" TEXT NOT NULL,
+                "payload" TEXT,
+                "state" TEXT NOT NULL DEFAULT 'pending',
+                "attempts" INTEGER NOT NULL DEFAULT 0,
+                "next_attempt_at" REAL NOT NULL DEFAULT 0,
+                "lease_until" REAL,
+                "claimed_by" TEXT,
+                "error" TEXT,
+                "created_on" TEXT,
+                "updated_on" TEXT
+            );
+            CREATE INDEX IF NOT EXISTS "{table}_due" ON "{table}" ("kind", "state", "next_attempt_at");
+            CREATE INDEX IF NOT EXISTS "{table}_key" ON "{table}" ("kind", "key", "state");
+        '''.format(table=TASK_TABLE))
+        self.conn.commit()
+
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="enqueue_task")
+    def enqueue_task(self, kind: str, key: str, payload: str = None) -> bool:
+        """
+        Add a task, unless a task of the same kind and key is already pending or running.
+        :param kind: Kind of task (e.g. "generate")
+        :param key: Key of the task (e.g. the content hash)
+        :param payload: Payload. Optional.
+        :return: True if the task was added
+        """
+        now = str(datetime.datetime.now())
+        with self.conn:
+            self.cursor.execute('''
+                INSERT INTO "{table}" ("kind", "key", "payload", "created_on", "updated_on")
+                SELECT ?, ?, ?, ?, ?
+                WHERE NOT EXISTS (
+                    SELECT 1 FROM "{table}" WHERE "kind" = ? AND "key" = ? AND "state" IN ('pending', 'running')
+                )
+            '''.format(table=TASK_TABLE), [kind, key, payload, now, now, kind, key])
+        return self.cursor.rowcount == 1
+
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="claim_tasks")
+    def claim_tasks(self, kind: str, worker_id: str, lease_seconds: float, limit: int = 1) -> tuple[str, list[dict]]:
+        """
+        Claim due pending tasks and move them to running. Claims are atomic: a task is claimed by exactly one worker
+        until its lease expires.
+        :param kind: Kind of task
+        :param worker_id: Id of the claiming worker
+        :param lease_seconds: Seconds the claim is held unless renewed with renew_task_leases
+        :param limit: Maximum number of tasks to claim
+        :return: Claim token (to renew the leases) and list of dicts of the claimed task rows
+        """
+        now = time.time()
+        token = f"{worker_id}:{uuid.uuid4().hex}"
+        with self.conn:
+            self.cursor.execute('''
+                UPDATE "{table}"
+                SET "state" = 'running', "attempts" = "attempts" + 1, "lease_until" = ?, "claimed_by" = ?,
+                    "updated_on" = ?
+                WHERE "id" IN (
+                    SELECT "id" FROM "{table}"
+                    WHERE "kind" = ? AND "state" = 'pending' AND "next_attempt_at" <= ?
+                    ORDER BY "id" LIMIT ?
+                ) AND "state" = 'pending'
+            '''.format(table=TASK_TABLE), [now + lease_seconds, token, str(datetime.datetime.now()), kind, now, limit])
+        self.cursor.execute(f'SELECT * FROM "{TASK_TABLE}" WHERE "claimed_by" = ? ORDER BY "id"', [token])
+        return token, [dict(zip([x[0] for x in self.cursor.description], row)) for row in self.cursor.fetchall()]
+
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="renew_task_leases")
+    def renew_task_leases(self, token: str, lease_seconds: float) -> int:
+        """
+        Extend the leases of running tasks claimed with token.
+        :param token: Claim token returned by claim_tasks
+        :param lease_seconds: Seconds from now the leases are held
+        :return: Number of renewed leases. Fewer than claimed if leases expired and tasks were claimed again.
+        """
+        with self.conn:
+            self.cursor.execute('''
+                UPDATE "{}" SET "lease_until" = ? WHERE "claimed_by" = ? AND "state" = 'running'
+            '''.format(TASK_TABLE), [time.time() + lease_seconds, token])
+        return self.cursor.rowcount
+
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="complete_task")
+    def complete_task(self, task_id: int, token: str):
+        """
+        Mark a running task as done. Ignored if the claim was lost (the lease expired and the task was claimed again).
+        :param task_id: Id of the task
+        :param token: Claim token returned by claim_tasks
+        :return:
+        """
+        with self.conn:
+            self.cursor.execute('''
+                UPDATE "{}" SET "state" = 'done', "lease_until" = NULL, "error" = NULL, "updated_on" = ?
+                WHERE "id" = ? AND "claimed_by" = ? AND "state" = 'running'
+            '''.format(TASK_TABLE), [str(datetime.datetime.now()), task_id, token])
+
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="fail_task")
+    def fail_task(self, task_id: int, token: str, error: str, retry_at: float = None):
+        """
+        Record a failed attempt of a running task.
+        :param task_id: Id of the task
+        :param token: Claim token returned by claim_tasks
+        :param error: Error message
+        :param retry_at: Unix time to retry the task at. The task is marked failed (not retried) if None.
+        :return:
+        """
+        with self.conn:
+            self.cursor.execute('''
+                UPDATE "{}"
+                SET "state" = ?, "next_attempt_at" = COALESCE(?, "next_attempt_at"), "error" = ?,
+                    "lease_until" = NULL, "updated_on" = ?
+                WHERE "id" = ? AND "claimed_by" = ? AND "state" = 'running'
+            '''.format(TASK_TABLE),
+                                ["failed" if retry_at is None else "pending", retry_at, error,
+                                 str(datetime.datetime.now()), task_id, token])
+
+    @metrics.timed("sqlite_seconds", "Time spent in SQLite operations", op="expire_task_leases")
+    def expire_task_leases(self, max_attempts: int) -> int:
+        """
+        Return running tasks whose lease expired (e.g. the worker crashed or hung) to pending, so another worker claims
+        them. Tasks that used all attempts are marked failed instead.
+        :param max_attempts: Attempts per task
+        :return: Number of expired tasks
+        """
+        now = time.time()
+        with self.conn:
+            self.cursor.execute('''
+                UPDATE "{}"
+                SET "state" = CASE WHEN "attempts" < ? THEN 'pending' ELSE 'failed' END,
+                    "error" = 'Lease expired while running.', "lease_until" = NULL, "updated_on" = ?
+                WHERE "state" = 'running' AND "lease_until" < ?
+            '''.format(TASK_TABLE), [max_attempts, str(datetime.datetime.now()), now])
+        return self.cursor.rowcount
@@ -0,0 +1,141 @@
+"""
+Thread Splitter Module
+Splits long text into tweet-sized chunks. Lengths are measured the way Twitter counts them (weighted characters, URLs
+and emoji), chunks break on sentence boundaries where possible and newlines are preserved.
+"""
+
+import re
+import unicodedata
+
+MAX_WEIGHTED_LENGTH = 280  # Twitter character limit
+URL_LENGTH = 23  # URLs are shortened to t.co links of this length
+EMOJI_WEIGHT = 2  # An emoji sequence counts as two characters
+
+# Code point ranges that count as one character. All others count as two (e.g. CJK).
+_LIGHT_RANGES = [(0x0000, 0x10FF), (0x2000, 0x200D), (0x2010, 0x201F), (0x2032, 0x2037)]
+
+_URL_PATTERN = re.compile(r"https?://\S+|www\.\S+")
+_SENTENCE_PATTERN = re.compile(r".*?(?:[.!?…]+(?=\s|$)|\n|$)\s*", re.S)
+_WORD_PATTERN = re.compile(r"\S+\s*|\s+")
+
+_ZWJ = "\u200d"
+_KEYCAP = "\u20e3"
+
+
+def _is_extender(char: str) -> bool:
+    """
+    Check if char extends the previous grapheme cluster (combining marks, variation selectors, skin tones, tags).
+    """
+    code = ord(char)
+    return (unicodedata.category(char) in ("Mn", "Me", "Mc")
+            or 0xFE00 <= code <= 0xFE0F
+            or 0x1F3FB <= code <= 0x1F3FF
+            or 0xE0020 <= code <= 0xE007F
+            or char in (_ZWJ, _KEYCAP))
+
+
+def _is_regional_indicator(char: str) -> bool:
+    return 0x1F1E6 <= ord(char) <= 0x1F1FF
+
+
+def _is_emoji(cluster: str) -> bool:
+    """
+    Check if a grapheme cluster is an emoji (pictographs, dingbats, flags, keycaps, emoji presentation).
+    """
+    code = ord(cluster[0])
+    return (code >= 0x1F000
+            or 0x2600 <= code <= 0x27BF
+            or 0x2300 <= code <= 0x23FF
+            or "\ufe0f" in cluster
+            or _KEYCAP in cluster)
+
+
+def graphemes(text: str) -> list[str]:
+    """
+    Split text into grapheme clusters, so emoji sequences, flags and combining marks are never broken apart.
+    :param text: Text to split
+    :return: List of grapheme clusters
+    """
+    clusters = []
+    for char in text:
+        if clusters and (_is_extender(char) or clusters[-1].endswith(_ZWJ)):
+            clusters[-1] += char
+        elif (clusters and _is_regional_indicator(char) and len(clusters[-1]) == 1
+              and _is_regional_indicator(clusters[-1])):
+            clusters[-1] += char
+        else:
+            clusters.append(char)
+    return clusters
+
+
+def _char_weight(char: str) -> int:
+    code = ord(char)
+    return 1 if any(start <= code <= end for start, end in _LIGHT_RANGES) else 2
+
+
+def weighted_length(text: str) -> int:
+    """
+    Get the length of text as counted by Twitter.
+    :param text: Text to measure
+    :return: Weighted length
+    """
+    text = unicodedata.normalize("NFC", text)
+    length = 0
+    position = 0
+    for match in _URL_PATTERN.finditer(text):
+        length += _plain_weighted_length(text[position:match.start()]) + URL_LENGTH
+        position = match.end()
+    return length + _plain_weighted_length(text[position:])
+
+
+def _plain_weighted_length(text: str) -> int:
+    return sum(EMOJI_WEIGHT if _is_emoji(cluster) else sum(_char_weight(c) for c in cluster)
+               for cluster in graphemes(text))
+
+
+def _pack(units: list[str], max_length: int, split_unit: callable) -> list[str]:
+    """
+    Greedily pack units into chunks of at most max_length. Units that do not fit in a chunk on their own are split
+    further with split_unit.
+    """
+    chunks = []
+    current = ""
+    for unit in units:
+        if weighted_length((current + unit).strip()) <= max_length:
+            current += unit
+            continue
+        if current.strip():
+            chunks.append(current.strip())
+        current = ""
+        if weighted_length(unit.strip()) <= max_length:
+            current = unit
+        else:
+            pieces = split_unit(unit, max_length)
+            chunks.extend(pieces[:-1])
+            current = pieces[-1] if pieces else ""
+    if current.strip():
+        chunks.append(current.strip())
+    return chunks
+
+
+def _split_word(word: str, max_length: int) -> list[str]:
+    return _pack(graphemes(word), max_length, lambda unit, _: [unit])
+
+
+def _split_sentence(sentence: str, max_length: int) -> list[str]:
+    return _pack(_WORD_PATTERN.findall(sentence), max_length, _split_word)
+
+
+def split_thread(text: str, max_length: int = MAX_WEIGHTED_LENGTH) -> list[str]:
+    """
+    Split text into chunks that each fit in a tweet. Chunks break between sentences where possible, then between
+    words, and only break inside a word (never inside a grapheme cluster) if a single word is too long. Newlines
+    inside a chunk are preserved.
+    :param text: Text to split
+    :param max_length: Maximum weighted length of a chunk
+    :return: List of chunks
+    """
+    if not text:
+        return []
+    sentences = [s for s in _SENTENCE_PATTERN.findall(text) if s]
+    return _pack(sentences, max_length, _split_sentence)
@@ -0,0 +1,186 @@
+"""
+Tracing Module
+Structured trace spans that follow a content object from generation through authorization to posting. Spans are keyed
+by trace id (the ContentObject hash), nest through a context variable and are appended to a local JSONL trace file.
+
+Usage:
+with tracing.span("gen", trace_id=co.hash, func="random_thought"):
+    ...  # @tracing.traced functions called here are recorded as child spans
+
+Summarize a trace file:
+python -m modules.tracing ../logs/traces.jsonl
+"""
+
+import os
+import json
+import time
+import uuid
+import logging
+import argparse
+import threading
+import functools
+import contextvars
+from contextlib import contextmanager
+
+logger = logging.getLogger(__name__)
+
+_trace_file = None
+_write_lock = threading.Lock()
+_current_span = contextvars.ContextVar("current_span", default=None)
+
+
+def configure(trace_file: str or None):
+    """
+    Set the trace file spans are appended to. Tracing is disabled if None.
+    :param trace_file: Path to JSONL trace file
+    """
+    global _trace_file
+    _trace_file = trace_file
+    if trace_file:
+        os.makedirs(os.path.dirname(trace_file) or ".", exist_ok=True)
+
+
+def _write(record: dict):
+    line = json.dumps(record, default=str) + "\n"
+    with _write_lock:
+        with open(_trace_file, "a") as f:
+            f.write(line)
+
+
+@contextmanager
+def span(name: str, trace_id: str = None, **attributes):
+    """
+    Record a span around a block. Spans opened inside the block (in the same thread or task) become its children.
+    :param name: Span name
+    :param trace_id: Trace id (ContentObject hash). Inherited from the current span if None.
+    :param attributes: Attributes to record with the span
+    """
+    parent = _current_span.get()
+    if not _trace_file or (trace_id is None and parent is None):
+        yield None
+        return
+
+    # A span of another trace starts a new root, e.g. the per-object spans of a digest authorization
+    if parent is not None and trace_id not in (None, parent["trace_id"]):
+        parent = None
+    record = {"trace_id": trace_id or parent["trace_id"],
+              "span_id": uuid.uuid4().hex[:16],
+              "parent_id": parent["span_id"] if parent else None,
+              "name": name,
+              "start": time.time(),
+              "duration": None,
+              "status": "ok",
+              "attributes": attributes}
+
+    token = _current_span.set(record)
+    start = time.perf_counter()
+    try:
+        yield record
+    except Exception as e:
+        record["status"] = "error"
+        record["attributes"]["error"] = repr(e)
+        raise
+    finally:
+        record["duration"] = time.perf_counter() - start
+        _current_span.reset(token)
+        try:
+            _write(record)
+        except OSError as e:
+            logger.error(f"Failed to write span {name}: {e}")
+
+
+def traced(name: str, **attributes) -> callable:
+    """
+    Decorator recording a child span of the current span around a function. Does nothing outside a trace.
+    """
+
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with span(name, **attributes):
+                return func(*args, **kwargs)
+
+        return wrapper
+
+    return decorator
+
+
+def load(trace_file: str) -> list[dict]:
+    """
+    Load spans from a trace file. Incomplete lines (e.g. from a crash mid-write) are skipped.
+    :param trace_file: Path to JSONL trace file
+    :return: List of span dicts
+    """
+    spans = []
+    with open(trace_file, "r") as f:
+        for line in f:
+            try:
+                spans.append(json.loads(line))
+            except json.JSONDecodeError:
+                continue
+    return spans
+
+
+def _percentile(values: list[float], q: float) -> float:
+    values = sorted(values)
+    return values[min(int(q * len(values)), len(values) - 1)]
+
+
+def summarize(spans: list[dict], slowest: int = 5) -> str:
+    """
+    Summarize spans as a latency breakdown: statistics per span name, then the spans of the slowest traces.
+    :param spans: List of span dicts
+    :param slowest: Number of slowest traces to break down
+    :return: Report
+    """
+    by_name = {}
+    traces = {}
+    for s in spans:
+        by_name.setdefault(s["name"], []).append(s)
+        traces.setdefault(s["trace_id"], []).append(s)
+
+    lines = [f"{len(spans)} spans in {len(traces)} traces", "",
+             f"{'span':<28}{'count':>7}{'errors':>8}{'total s':>11}"
+             f"{'mean s':>10}{'p50 s':>10}{'p95 s':>10}{'max s':>10}"]
+    for name, group in sorted(by_name.items(), key=lambda x: -sum(s["duration"] for s in x[1])):
+        durations = [s["duration"] for s in group]
+        errors = sum(s["status"] == "error" for s in group)
+        lines.append(f"{name:<28}{len(group):>7}{errors:>8}{sum(durations):>11.2f}"
+                     f"{sum(durations) / len(group):>10.3f}{_percentile(durations, 0.5):>10.3f}"
+                     f"{_percentile(durations, 0.95):>10.3f}{max(durations):>10.3f}")
+
+    def root_duration(trace_spans):
+        return sum(s["duration"] for s in trace_spans if s["parent_id"] is None)
+
+    for trace_id, trace_spans in sorted(traces.items(), key=lambda x: -root_duration(x[1]))[:slowest]:
+        lines += ["", f"trace {trace_id[:16]} ({root_duration(trace_spans):.2f} s)"]
+        children = {}
+        for s in sorted(trace_spans, key=lambda x: x["start"]):
+            children.setdefault(s["parent_id"], []).append(s)
+
+        def add(parent_id, depth):
+            for s in children.get(parent_id, []):
+                status = "" if s["status"] == "ok" else f"  [{s['status']}]"
+                lines.append(f"{'  ' * (depth + 1)}{s['name']:<{28 - 2 * depth}}{s['duration']:>10.3f} s{status}")
+                add(s["span_id"], depth + 1)
+
+        add(None, 0)
+
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Summarize a trace file as a latency breakdown.")
+    parser.add_argument("trace_file", nargs="?", default="../logs/traces.jsonl", help="Path to JSONL trace file")
+    parser.add_argument("--trace", default=None, help="Only include traces whose id starts with this prefix")
+    parser.add_argument("--slowest", type=int, default=5, help="Number of slowest traces to break down")
+    args = parser.parse_args()
+
+    spans = load(args.trace_file)
+    if args.trace:
+        spans = [s for s in spans if s["trace_id"].startswith(args.trace)]
+    print(summarize(spans, args.slowest) if spans else "No spans found.")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,17 +3,119 @@ Twitter API Module
 """
 
 import time
+import asyncio
 import random
 import logging
+import functools
+from concurrent.futures import ThreadPoolExecutor, Future
+from urllib.parse import urlparse
+
 import tweepy
 
+from . import thread_splitter, metrics
+
 # Enable logging
 logger = logging.getLogger(__name__)
 
+MEDIA_UPLOAD_WORKERS = 4  # Media uploads run in the background on this many threads
+RATE_LIMIT_RETRIES = 3  # Attempts per request after a 429 response
+MEDIA_ID_MAX_AGE_SECONDS = 23 * 3600  # Uploaded media expires after 24 hours if it is not attached to a tweet
+
+TWEETS_ENDPOINT = "/2/tweets"
+
+_media_executor = ThreadPoolExecutor(max_workers=MEDIA_UPLOAD_WORKERS, thread_name_prefix="media_upload")
+
+# Latest rate-limit window per (access token, endpoint path), read from x-rate-limit-* response headers
+_rate_limits: dict[tuple[str, str], dict] = {}
+
+
+def _credentials(keys: dict) -> tuple:
+    """
+    Get credential tuple from keys dict. Used as cache key for clients.
+    :param keys: Keys dict
+    :return: (api_key, api_secret, access_token, access_token_secret)
+    """
+    return (keys["TWITTER_API_KEY"],
+            keys["TWITTER_API_KEY_SECRET"],
+            keys["TWITTER_ACCESS_TOKEN"],
+            keys["TWITTER_ACCESS_TOKEN_SECRET"])
+
+
+def _parse_rate_limit(headers) -> dict or None:
+    """
+    Parse rate-limit window from response headers.
+    :param headers: Response headers
+    :return: Dict with limit, remaining and reset (epoch seconds), or None if headers are missing
+    """
+    if "x-rate-limit-remaining" not in headers:
+        return None
+    return {"limit": int(headers.get("x-rate-limit-limit", 0)),
+            "remaining": int(headers["x-rate-limit-remaining"]),
+            "reset": float(headers.get("x-rate-limit-reset", 0))}
+
+
+def _rate_limit_hook(access_token: str) -> callable:
+    """
+    Get requests response hook that records rate-limit windows for access_token.
+    """
+
+    def hook(response, *args, **kwargs):
+        rate_limit = _parse_rate_limit(response.headers)
+        if rate_limit:
+            _rate_limits[(access_token, urlparse(response.url).path)] = rate_limit
+
+    return hook
+
 
+def get_rate_limit(keys: dict, endpoint: str = TWEETS_ENDPOINT) -> dict or None:
+    """
+    Get the last seen rate-limit window of an account.
+    :param keys: Keys dict
+    :param endpoint: Endpoint path
+    :return: Dict with limit, remaining and reset (epoch seconds), or None if the endpoint has not been called yet
+    """
+    return _rate_limits.get((keys["TWITTER_ACCESS_TOKEN"], endpoint))
+
+
+async def wait_for_rate_limit(keys: dict, endpoint: str = TWEETS_ENDPOINT):
+    """
+    Sleep until the rate-limit window of an account resets, if it is exhausted.
+    :param keys: Keys dict
+    :param endpoint: Endpoint path
+    """
+    rate_limit = get_rate_limit(keys, endpoint)
+    if rate_limit and rate_limit["remaining"] <= 0:
+        delay = rate_limit["reset"] - time.time()
+        if delay > 0:
+            logger.info(f"Rate limit reached for {endpoint}. Waiting {delay:.0f} seconds...")
+            await asyncio.sleep(delay)
+
+
+@functools.lru_cache(maxsize=None)
+def _get_twitter_client(api_key, api_secret, access_token, access_token_secret) -> tweepy.Client:
+    """
+    Get twitter client (V2 API). Clients are cached per credential set, so their HTTP session (and its connection
+    pool) is reused across posts.
+    :param api_key: TWITTER_API_KEY
+    :param api_secret: TWITTER_API_KEY_SECRET
+    :param access_token: TWITTER_ACCESS_TOKEN
+    :param access_token_secret: TWITTER_ACCESS_TOKEN_SECRET
+    :return: tweepy.Client object
+    """
+    client = tweepy.Client(
+        consumer_key=api_key,
+        consumer_secret=api_secret,
+        access_token=access_token,
+        access_token_secret=access_token_secret
+    )
+    client.session.hooks["response"].append(_rate_limit_hook(access_token))
+    return client
+
+
+@functools.lru_cache(maxsize=None)
 def _get_twitter_conn_v1_1(api_key, api_secret, access_token, access_token_secret) -> tweepy.API:
     """
-    Get twitter connection (V1.1 API)
+    Get twitter connection (V1.1 API). Cached per credential set.
     :param api_key: TWITTER_API_KEY
     :param api_secret: TWITTER_API_KEY_SECRET
     :param access_token: TWITTER_ACCESS_TOKEN
@@ -26,6 +128,7 @@ def _get_twitter_conn_v1_1(api_key, api_secret, access_token, access_token_secre
     return tweepy.API(auth)
 
 
+@metrics.timed("twitter_media_upload_seconds", "Time spent uploading media to Twitter")
 def _upload_media_v1_1(media: str, api_key, api_secret, access_token, access_token_secret) -> str:
     """
     Upload media to twitter (V1.1 API)
@@ -49,11 +152,72 @@ def _upload_media_v1_1(media: str, api_key, api_secret, access_token, access_tok
     return media_id
 
 
-def create_tweet(content_dict: dict, keys: dict) -> None:
+def upload_media(media: str or list[str], keys: dict) -> list[Future]:
     """
-    Post tweet and thread to Twitter. Thread is optional.
-    :param content_dict: Content dict
+    Start uploading media in the background. Call ahead of posting so uploads overlap with other work; pass the
+    returned futures to create_tweet as "media_ids".
+    :param media: Path or list of paths to media files
+    :param keys: Keys dict
+    :return: List of futures resolving to media ids, in the same order as media
+    """
+    if isinstance(media, str):
+        media = [media]
+    return [_media_executor.submit(_upload_media_v1_1, m, *_credentials(keys)) for m in media]
+
+
+async def _send_tweet(client: tweepy.Client, keys: dict, max_retries: int = RATE_LIMIT_RETRIES,
+                      on_rate_limit: callable = None, **kwargs) -> str:
+    """
+    Send one tweet, waiting for the account's rate-limit window first. On a 429 response only this request is retried
+    once the window resets, so a thread interrupted by a rate limit continues from its last posted tweet.
+    :param client: tweepy.Client object
     :param keys: Keys dict
+    :param max_retries: Attempts after a 429 response
+    :param on_rate_limit: Callable called on every 429 response. Optional.
+    :param kwargs: Arguments to client.create_tweet
+    :return: Tweet id
+    """
+    for i in range(max_retries + 1):
+        await wait_for_rate_limit(keys)
+        try:
+            response = await asyncio.to_thread(client.create_tweet, **kwargs)
+        except tweepy.TooManyRequests as e:
+            metrics.counter("twitter_rate_limited_total", "429 responses from Twitter").inc()
+            if on_rate_limit:
+                on_rate_limit()
+            if i == max_retries:
+                raise
+            reset = float(e.response.headers.get("x-rate-limit-reset", time.time() + 60))
+            delay = max(reset - time.time(), 1)
+            logger.warning(f"Rate limited. Retrying in {delay:.0f} seconds...")
+            await asyncio.sleep(delay)
+            continue
+        metrics.counter("twitter_tweets_total", "Tweets posted").inc()
+        return response.data["id"]
+
+
+async def create_tweet_async(content_dict: dict, keys: dict, media_ids: list = None,
+                             max_retries: int = RATE_LIMIT_RETRIES, on_rate_limit: callable = None) -> str:
+    """
+    Post tweet and thread to Twitter without blocking the event loop. See _create_tweet_async.
+    """
+    with metrics.timer("twitter_post_seconds", "Time spent posting tweets and threads"):
+        return await _create_tweet_async(content_dict, keys, media_ids, max_retries, on_rate_limit)
+
+
+async def _create_tweet_async(content_dict: dict, keys: dict, media_ids: list = None,
+                              max_retries: int = RATE_LIMIT_RETRIES, on_rate_limit: callable = None) -> str:
+    """
+    Post tweet and thread to Twitter without blocking the event loop. Thread is optional. Pacing between thread
+    chunks uses asyncio.sleep, so many accounts can be driven concurrently from a single thread.
+    :param content_dict: Content dict. Posted ids are appended to content_dict["posted_tweet_ids"] if it is a list, and
+    a thread is resumed after the last of them if it is not empty.
+    :param keys: Keys dict
+    :param media_ids: Media ids or futures returned by upload_media. Taken from content_dict["media_ids"] (uploaded at
+    generation) if None and not expired, else uploaded from content_dict["media"].
+    :param max_retries: Attempts per request after a 429 response
+    :param on_rate_limit: Callable called on every 429 response. Optional.
+    :return: Id of the first tweet
     """
 
     tweet = content_dict["text"]
@@ -61,47 +225,63 @@ def create_tweet(content_dict: dict, keys: dict) -> None:
     media = content_dict["media"]
     in_reply_to_tweet_id = content_dict["in_reply_to_tweet_id"]
 
-    api_key = keys["TWITTER_API_KEY"]
-    api_key_secret = keys["TWITTER_API_KEY_SECRET"]
-    access_token = keys["TWITTER_ACCESS_TOKEN"]
-    access_token_secret = keys["TWITTER_ACCESS_TOKEN_SECRET"]
     logger.info(f"Received tweet post request with params: "
                 f"{tweet = }, {thread = }, {media = }, {in_reply_to_tweet_id = }")
 
-    client = tweepy.Client(
-        consumer_key=api_key,
-        consumer_secret=api_key_secret,
-        access_token=access_token,
-        access_token_secret=access_token_secret
-    )
+    client = _get_twitter_client(*_credentials(keys))
+    send = functools.partial(_send_tweet, client, keys, max_retries=max_retries, on_rate_limit=on_rate_limit)
+
+    # Ids are appended as tweets are posted, so the caller can resume a thread that failed part way
+    posted = content_dict.get("posted_tweet_ids")
+    if posted is None:
+        posted = []
 
-    if media is not None:
-        media_id = _upload_media_v1_1(
-            media=media,
-            api_key=api_key,
-            api_secret=api_key_secret,
-            access_token=access_token,
-            access_token_secret=access_token_secret
-        )
-        response = client.create_tweet(text=tweet, in_reply_to_tweet_id=in_reply_to_tweet_id, media_ids=[media_id])
+    if posted:
+        logger.info(f"Resuming thread after {len(posted)} posted tweets (last id = {posted[-1]})")
     else:
-        response = client.create_tweet(text=tweet, in_reply_to_tweet_id=in_reply_to_tweet_id)
-
-    id_ = response.data["id"]
-    logger.info(f"Posted tweet with id = {id_}")
-
-    # Split thread into 280 character chunks WITHOUT splitting words
-    if thread:
-        thread = thread.split()
-        thread_list = []
-        for word in thread:
-            if len(thread_list) == 0:
-                thread_list.append(word)
-            elif len(thread_list[-1]) + len(word) + 1 <= 250:
-                thread_list[-1] += f" {word}"
-            else:
-                thread_list.append(word)
-        for i, chunk in enumerate(thread_list):
-            response = client.create_tweet(text=chunk, in_reply_to_tweet_id=id_)
-            id_ = response.data["id"]
-            time.sleep(random.randint(5, 10))
+        uploaded_at = content_dict.get("media_uploaded_at")
+        if media_ids is None and content_dict.get("media_ids") and uploaded_at \
+                and time.time() - uploaded_at < MEDIA_ID_MAX_AGE_SECONDS:
+            media_ids = content_dict["media_ids"]
+        if media_ids is None and media is not None:
+            media_ids = upload_media(media, keys)
+
+        if media_ids:
+            media_ids = [await asyncio.wrap_future(m) if isinstance(m, Future) else m for m in media_ids]
+            posted.append(await send(text=tweet, in_reply_to_tweet_id=in_reply_to_tweet_id, media_ids=media_ids))
+        else:
+            posted.append(await send(text=tweet, in_reply_to_tweet_id=in_reply_to_tweet_id))
+        logger.info(f"Posted tweet with id = {posted[0]}")
+
+    # Thread chunks are precomputed at generation time. Older content is split here.
+    thread_chunks = content_dict.get("thread_chunks")
+    if thread and thread_chunks is None:
+        thread_chunks = thread_splitter.split_thread(thread)
+
+    for chunk in (thread_chunks or [])[len(posted) - 1:]:
+        posted.append(await send(text=chunk, in_reply_to_tweet_id=posted[-1]))
+        await asyncio.sleep(random.randint(5, 10))
+
+    first_id = posted[0]
+    return first_id
+
+
+async def create_tweets_async(posts: list[tuple[dict, dict]]) -> list:
+    """
+    Post many tweets concurrently, e.g. one per account.
+    :param posts: List of (content_dict, keys) tuples
+    :return: List of first tweet ids, or exceptions for failed posts, in the same order as posts
+    """
+    return await asyncio.gather(*[create_tweet_async(content_dict, keys) for content_dict, keys in posts],
+                                return_exceptions=True)
+
+
+def create_tweet(content_dict: dict, keys: dict, media_ids: list = None) -> str:
+    """
+    Post tweet and thread to Twitter. Thread is optional.
+    :param content_dict: Content dict
+    :param keys: Keys dict
+    :param media_ids: Media ids or futures returned by upload_media. Optional.
+    :return: Id of the first tweet
+    """
+    return asyncio.run(create_tweet_async(content_dict, keys, media_ids=media_ids))
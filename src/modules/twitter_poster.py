@@ -0,0 +1,159 @@
+"""
+Twitter Posting Service Module
+Posts for many accounts concurrently from a single background event loop. Posts for the same account are serialized
+and delayed until the account's rate-limit window allows them, so several personas can share a schedule without
+manual spacing in their cron expressions.
+"""
+
+import time
+import asyncio
+import logging
+import threading
+from concurrent.futures import Future
+
+from . import twitter_api, metrics
+
+# Enable logging
+logger = logging.getLogger(__name__)
+
+MAX_RETRIES = twitter_api.RATE_LIMIT_RETRIES  # Attempts per request after a 429 response
+
+
+def _account_id(keys: dict) -> str:
+    """
+    Get account identifier from keys dict. Twitter access tokens are prefixed with the user id.
+    :param keys: Keys dict
+    :return: Account id
+    """
+    return keys["TWITTER_ACCESS_TOKEN"].split("-")[0]
+
+
+class AccountMetrics:
+    """
+    Posting metrics for one account.
+    """
+
+    def __init__(self):
+        self.posts = 0
+        self.failures = 0
+        self.rate_limited = 0
+        self.first_post_at = None
+        self.last_post_at = None
+
+    def record_post(self):
+        now = time.time()
+        self.first_post_at = self.first_post_at or now
+        self.last_post_at = now
+        self.posts += 1
+
+    def posts_per_second(self) -> float:
+        if self.posts < 2:
+            return 0.0
+        return (self.posts - 1) / max(self.last_post_at - self.first_post_at, 1e-9)
+
+    def dict(self) -> dict:
+        return {"posts": self.posts,
+                "failures": self.failures,
+                "rate_limited": self.rate_limited,
+                "posts_per_second": self.posts_per_second()}
+
+
+class PostingService:
+    """
+    Runs posts for many accounts concurrently. Each account has its own lock, so its posts are sent one at a time,
+    while posts for different accounts overlap. On a 429 response the rate-limited request (not the whole post) is
+    retried once the window resets, so threads are never posted twice.
+    """
+
+    def __init__(self, max_retries: int = MAX_RETRIES):
+        """
+        :param max_retries: Attempts per request after a 429 response
+        """
+        self.max_retries = max_retries
+        self.logger = logging.getLogger(__name__)
+        self._locks: dict[str, asyncio.Lock] = {}
+        self._metrics: dict[str, AccountMetrics] = {}
+        self._loop = None
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+    def _start(self):
+        """
+        Start the background event loop if it is not running.
+        """
+        with self._start_lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                self._thread = threading.Thread(target=self._loop.run_forever,
+                                                name="posting_service",
+                                                daemon=True)
+                self._thread.start()
+
+    async def _post(self, content_dict: dict, keys: dict) -> str:
+        """
+        Post content for one account, waiting for its lock and rate-limit window.
+        """
+        account = _account_id(keys)
+        lock = self._locks.setdefault(account, asyncio.Lock())
+        account_metrics = self._metrics.setdefault(account, AccountMetrics())
+
+        def on_rate_limit():
+            account_metrics.rate_limited += 1
+            metrics.counter("twitter_account_rate_limited_total",
+                            "Rate-limited requests by account").inc(account=account)
+            self.logger.warning(f"Account {account} rate limited.")
+
+        async with lock:
+            try:
+                tweet_id = await twitter_api.create_tweet_async(content_dict, keys,
+                                                                max_retries=self.max_retries,
+                                                                on_rate_limit=on_rate_limit)
+            except Exception:
+                account_metrics.failures += 1
+                metrics.counter("twitter_post_failures_total", "Failed posts by account").inc(account=account)
+                raise
+            account_metrics.record_post()
+            metrics.counter("twitter_posts_total", "Posts by account").inc(account=account)
+            metrics.gauge("twitter_posts_per_second", "Posting rate by account").set(
+                account_metrics.posts_per_second(), account=account)
+            return tweet_id
+
+    def submit(self, content_dict: dict, keys: dict) -> Future:
+        """
+        Queue a post. Returns immediately.
+        :param content_dict: Content dict
+        :param keys: Keys dict
+        :return: Future resolving to the id of the first tweet
+        """
+        self._start()
+        return asyncio.run_coroutine_threadsafe(self._post(content_dict, keys), self._loop)
+
+    def account_metrics(self) -> dict:
+        """
+        Get posting metrics per account. Also exported through modules.metrics (twitter_posts_total,
+        twitter_posts_per_second, twitter_post_failures_total, twitter_account_rate_limited_total).
+        :return: Dict of account id -> metrics dict
+        """
+        return {account: account_metrics.dict() for account, account_metrics in self._metrics.items()}
+
+
+_service = PostingService()
+
+
+def create_tweet(content_dict: dict, keys: dict) -> str:
+    """
+    Post tweet and thread through the shared posting service. Drop-in replacement for twitter_api.create_tweet that
+    serializes posts per account and respects rate limits across all scheduled jobs.
+    :param content_dict: Content dict
+    :param keys: Keys dict
+    :return: Id of the first tweet
+    """
+    return _service.submit(content_dict, keys).result()
+
+
+def account_metrics() -> dict:
+    """
+    Get posting metrics per account of the shared posting service.
+    :return: Dict of account id -> metrics dict
+    """
+    return _service.account_metrics()
@@ -1,2 +1,4 @@
 from .scraper_home import scrape_for_you_page, scrape_following_page
-from .scraper_profile import scrape_profile
+from .scraper_profile import scrape_profile, scrape_profiles
+from .session_pool import SessionPool, get_pool
+from .scraper_parallel import scrape_profiles_parallel
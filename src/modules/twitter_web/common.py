@@ -2,10 +2,14 @@
 Common functions and classes.
 """
 
+import os
+import json
 import threading
 
 domain = "https://twitter.com"  # Switch to x.com when that happens
 
+MAX_SEEN_IDS = 5000  # Most recent tweet ids kept in a persisted seen-id file
+
 
 class TimeoutException(Exception):
     """
@@ -57,3 +61,65 @@ class TimeoutContext:
         self.is_timed_out = True
         self.timeout_event.set()  # Signal the timeout event
 
+
+class TweetAccumulator:
+    """
+    Ordered collection of scraped tweets, de-duplicated by tweet_id in O(1). Optionally backed by a persisted set of
+    tweet ids seen in earlier scrapes, which are skipped.
+
+    Usage:
+    accumulator = TweetAccumulator("../databases/twitter_web/elonmusk.json")
+    accumulator.add(tweet)
+    accumulator.save()  # Remember the ids of this scrape
+    """
+
+    def __init__(self, seen_ids_path: str = None):
+        """
+        :param seen_ids_path: Path to the persisted seen-id file. If None, nothing is persisted.
+        """
+        self._tweets = {}  # tweet_id -> tweet, in insertion order
+        self.seen_ids_path = seen_ids_path
+        self._seen_ids = {}  # Ids from earlier scrapes, in insertion order (dict used as ordered set)
+        if seen_ids_path and os.path.exists(seen_ids_path):
+            with open(seen_ids_path, "r") as f:
+                self._seen_ids = dict.fromkeys(json.load(f))
+
+    def __len__(self):
+        return len(self._tweets)
+
+    def __contains__(self, tweet_id: str):
+        return tweet_id in self._tweets
+
+    @property
+    def tweets(self) -> list[dict]:
+        return list(self._tweets.values())
+
+    def is_known(self, tweet_id: str) -> bool:
+        """
+        Check if a tweet was seen in an earlier scrape.
+        """
+        return bool(tweet_id) and tweet_id in self._seen_ids
+
+    def add(self, tweet: dict) -> bool:
+        """
+        Add tweet if it is neither a duplicate nor known from an earlier scrape.
+        :param tweet: Tweet dict with tweet_id
+        :return: True if the tweet was added
+        """
+        tweet_id = tweet["tweet_id"]
+        if tweet_id in self._tweets or self.is_known(tweet_id):
+            return False
+        self._tweets[tweet_id] = tweet
+        return True
+
+    def save(self):
+        """
+        Add the ids of the accumulated tweets to the seen-id file. Only the MAX_SEEN_IDS most recent ids are kept.
+        """
+        if not self.seen_ids_path:
+            return
+        self._seen_ids.update(dict.fromkeys(tweet_id for tweet_id in self._tweets if tweet_id))
+        seen_ids = list(self._seen_ids)[-MAX_SEEN_IDS:]
+        os.makedirs(os.path.dirname(self.seen_ids_path) or ".", exist_ok=True)
+        with open(self.seen_ids_path, "w") as f:
+            json.dump(seen_ids, f)
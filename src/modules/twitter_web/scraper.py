@@ -2,16 +2,68 @@
 Twitter scraper base class. Contains methods for logging in to Twitter and wrappers for Selenium methods.
 """
 
+import os
+import json
 import time
+import threading
 
 from selenium import webdriver
 from selenium.webdriver.support.ui import WebDriverWait
 from selenium.webdriver.support import expected_conditions
 from selenium.webdriver.common.by import By
 from selenium.webdriver.common.keys import Keys
-from selenium.common.exceptions import NoSuchElementException
+from selenium.common.exceptions import NoSuchElementException, TimeoutException
 
-from .common import domain, TimeoutContext
+from .common import domain, TweetAccumulator
+
+DOM_IDLE_SECONDS = 0.3  # Page is considered loaded after this long without DOM mutations
+DOM_IDLE_TIMEOUT = 10  # Deadline for the page to settle
+MAX_EMPTY_SCROLLS = 3  # Stop scrolling after this many scrolls in a row without new tweets
+
+# Returns id, url, text, handle and media of every tweet card on the page that has not been returned before. Card
+# ids are remembered in the page, so each card is only sent back once per page load.
+_EXTRACT_CARDS_SCRIPT = """
+const seen = window.__scrapedTweetIds = window.__scrapedTweetIds || new Set();
+const cards = [];
+for (const card of document.querySelectorAll("article[data-testid='tweet']")) {
+    // card -> second div -> first div -> third div -> first a with role='link'
+    const link = document.evaluate(".//div[2]/div[1]/div[3]/a[@role='link']", card, null,
+                                   XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+    const url = link ? link.href : "";
+    const id = url ? url.split("/").pop() : "";
+    if (id && seen.has(id)) continue;
+    if (id) seen.add(id);
+    const text = card.querySelector("div[data-testid='tweetText']");
+    const media = Array.from(card.querySelectorAll("div[data-testid='tweetPhoto'] img"), img => img.src);
+    cards.push({
+        tweet_id: id,
+        tweet_url: url,
+        tweet_text: text ? text.innerText : "",
+        tweet_media: media.join(","),
+        profile_handle: url ? url.split("/").slice(-3)[0] : ""
+    });
+}
+return JSON.stringify(cards);
+"""
+
+# Resolves with true once document.body has not changed for arguments[0] ms, or with false after arguments[1] ms
+_DOM_IDLE_SCRIPT = """
+const [idleMs, timeoutMs, done] = arguments;
+let idleTimer;
+const observer = new MutationObserver(() => {
+    clearTimeout(idleTimer);
+    idleTimer = setTimeout(() => finish(true), idleMs);
+});
+const deadlineTimer = setTimeout(() => finish(false), timeoutMs);
+function finish(settled) {
+    observer.disconnect();
+    clearTimeout(idleTimer);
+    clearTimeout(deadlineTimer);
+    done(settled);
+}
+observer.observe(document.body, {childList: true, subtree: true, characterData: true});
+idleTimer = setTimeout(() => finish(true), idleMs);
+"""
 
 
 class Element:
@@ -54,27 +106,63 @@ class Element:
         return None
 
 
+def new_driver(headless: bool = True) -> webdriver.Chrome:
+    """
+    Launch a new Chrome driver.
+    :param headless: Whether to run Chrome in headless mode
+    :return: Chrome driver
+    """
+    chrome_options = webdriver.ChromeOptions()
+    chrome_options.headless = headless
+    driver = webdriver.Chrome(options=chrome_options)
+    driver.set_window_size(width=1080, height=1080)
+    return driver
+
+
 class Scraper:
     """
     Base class for all Twitter scrapers.
     """
     keys: dict
-    tweets: list
+    accumulator: TweetAccumulator
     profiles: list
 
-    def __init__(self, keys: dict, headless: bool = True):
+    def __init__(self, keys: dict, headless: bool = True, driver: webdriver.Chrome = None, session_path: str = None,
+                 seen_ids_path: str = None):
         """
         Initialize driver and log in to Twitter.
         :param keys: Keys dict including TWITTER_USERNAME and TWITTER_PASSWORD
+        :param headless: Whether to run Chrome in headless mode
+        :param driver: Logged in driver to reuse (e.g. from a SessionPool). If None, a new driver is launched.
+        :param session_path: Path to persist cookies and storage to, so later logins can skip the login form
+        :param seen_ids_path: Path to persist scraped tweet ids to. Tweets seen in earlier scrapes are skipped.
         """
         self.keys = keys
-        self.tweets = []
+        self.accumulator = TweetAccumulator(seen_ids_path)
         self.profiles = []
+        self.session_path = session_path
+
+        if driver is not None:
+            self.driver = driver
+        else:
+            self.driver = new_driver(headless)
+            self.login()
+
+    @property
+    def tweets(self) -> list[dict]:
+        """
+        Scraped tweets, in the order they were found.
+        """
+        return self.accumulator.tweets
+
+    def login(self):
+        """
+        Log in to Twitter. The persisted session is restored if available, otherwise the login form is used and the
+        new session is persisted.
+        """
+        if self.session_path and self.load_session():
+            return
 
-        chrome_options = webdriver.ChromeOptions()
-        chrome_options.headless = headless
-        self.driver = webdriver.Chrome(options=chrome_options)
-        self.driver.set_window_size(width=1080, height=1080)
         self.driver.get(f"{domain}/login")
 
         # Enter username
@@ -96,9 +184,67 @@ class Scraper:
 
         # Reject cookies
         # div with data-testid="BottomBar" -> first div -> second div -> second div
-        self.wait_for_element("//div[@data-testid='BottomBar']/div/div[2]/div")
-        refuse_cookies_button = self.find_element("//div[@data-testid='BottomBar']/div/div[2]/div")
-        refuse_cookies_button.click()
+        try:
+            self.wait_for_element("//div[@data-testid='BottomBar']/div/div[2]/div")
+            refuse_cookies_button = self.find_element("//div[@data-testid='BottomBar']/div/div[2]/div")
+            refuse_cookies_button.click()
+        except TimeoutException:
+            pass
+
+        if self.session_path:
+            self.save_session()
+
+    def save_session(self):
+        """
+        Persist cookies, local storage and session storage to session_path. The file is replaced atomically, as
+        pooled drivers of the same account may save at the same time.
+        """
+        session = {
+            "cookies": self.driver.get_cookies(),
+            "local_storage": self.driver.execute_script("return Object.entries(window.localStorage);"),
+            "session_storage": self.driver.execute_script("return Object.entries(window.sessionStorage);"),
+        }
+        os.makedirs(os.path.dirname(self.session_path) or ".", exist_ok=True)
+        tmp_path = f"{self.session_path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w") as f:
+            json.dump(session, f)
+        os.replace(tmp_path, self.session_path)
+
+    def load_session(self) -> bool:
+        """
+        Restore cookies, local storage and session storage from session_path. A missing, unreadable or malformed
+        session file counts as no session, so login falls back to the login form.
+        :return: True if the restored session is logged in
+        """
+        try:
+            with open(self.session_path, "r") as f:
+                session = json.load(f)
+            cookies, local_storage, session_storage = (session["cookies"], session["local_storage"],
+                                                       session["session_storage"])
+        except (OSError, ValueError, TypeError, KeyError):
+            return False
+
+        # Cookies can only be set for the domain that is currently loaded
+        self.driver.get(domain)
+        for cookie in cookies:
+            cookie.pop("sameSite", None)
+            self.driver.add_cookie(cookie)
+        for storage, entries in (("localStorage", local_storage), ("sessionStorage", session_storage)):
+            self.driver.execute_script(f"for (const [k, v] of arguments[0]) window.{storage}.setItem(k, v);",
+                                       entries)
+
+        self.driver.get(f"{domain}/home")
+        try:
+            self.wait_for_element("//a[@aria-label='Home']")
+        except TimeoutException:
+            return False
+        return True
+
+    def quit(self):
+        """
+        Close the browser.
+        """
+        self.driver.quit()
 
     def wait_for_element(self, element_xpath: str):
         """
@@ -131,27 +277,80 @@ class Scraper:
 
         return element
 
-    def find_elements(self, elements_xpath: str):
+    def wait_for_dom_idle(self, idle_seconds: float = DOM_IDLE_SECONDS, timeout: float = DOM_IDLE_TIMEOUT) -> bool:
+        """
+        Wait until the page stops changing, i.e. no DOM mutations for idle_seconds. Uses a MutationObserver in the
+        page, so the wait ends as soon as the page settles instead of after a fixed sleep.
+        :param idle_seconds: Seconds without mutations after which the page is considered loaded
+        :param timeout: Deadline in seconds. The wait ends at the deadline even if the page keeps changing.
+        :return: True if the page settled before the deadline
+        """
+        # Drivers are pooled, so the script timeout of the session is restored for the next user
+        previous_timeout = self.driver.timeouts.script
+        self.driver.set_script_timeout(timeout + 5)
+        try:
+            return self.driver.execute_async_script(_DOM_IDLE_SCRIPT, int(idle_seconds * 1000), int(timeout * 1000))
+        finally:
+            self.driver.set_script_timeout(previous_timeout)
+
+    def find_elements(self, elements_xpath: str, idle_seconds: float = DOM_IDLE_SECONDS,
+                      timeout: float = DOM_IDLE_TIMEOUT):
         """
-        Get elements by XPATH. Waits for all elements with same xpath to load by checking if the number of elements has
-        changed.
+        Get elements by XPATH. Waits for all elements to load by waiting for the page to stop changing.
         :param elements_xpath: XPATH of elements to get
+        :param idle_seconds: Seconds without DOM mutations after which the page is considered loaded
+        :param timeout: Deadline in seconds for the page to settle
         """
+        self.wait_for_dom_idle(idle_seconds, timeout)
         try:
-            elements = lambda: self.driver.find_elements(By.XPATH, elements_xpath)
-            with TimeoutContext(10):
-                while True:
-                    elements_before = elements()
-                    time.sleep(1.25)
-                    elements_after = elements()
-                    if len(elements_before) == len(elements_after):
-                        break
-                    else:
-                        elements_before = elements_after
+            elements = self.driver.find_elements(By.XPATH, elements_xpath)
         except NoSuchElementException:
             elements = []
 
-        return [Element(element) for element in elements()]
+        return [Element(element) for element in elements]
+
+    def extract_tweets(self) -> list[dict]:
+        """
+        Extract all tweet cards on the page that have not been extracted before, in a single script call.
+        :return: List of tweet dicts with tweet_id, tweet_url, tweet_text, tweet_media and profile_handle
+        """
+        return json.loads(self.driver.execute_script(_EXTRACT_CARDS_SCRIPT))
+
+    def scrape_tweets(self, max_tweets: int):
+        """
+        Scroll through the loaded page and accumulate tweets. Stops at max_tweets, once a scroll only finds tweets
+        known from earlier scrapes, or after MAX_EMPTY_SCROLLS scrolls without new tweets.
+        :param max_tweets: Maximum number of tweets to scrape
+        """
+        empty_scrolls = 0
+        while len(self.accumulator) < max_tweets:
+            # Scroll down after first iteration
+            if len(self.accumulator) != 0 or empty_scrolls:
+                self.scroll_down()
+
+            # Wait for new cards to load, then extract all unseen cards in one call
+            self.wait_for_dom_idle()
+            new_tweets = 0
+            known_tweets = 0
+            for tweet in self.extract_tweets():
+                if self.accumulator.is_known(tweet["tweet_id"]):
+                    known_tweets += 1
+                elif self.accumulator.add(tweet):
+                    new_tweets += 1
+
+                # Break if max_tweets reached
+                if len(self.accumulator) >= max_tweets:
+                    break
+
+            # Reached content scraped before
+            if known_tweets and not new_tweets:
+                break
+
+            empty_scrolls = 0 if new_tweets else empty_scrolls + 1
+            if empty_scrolls >= MAX_EMPTY_SCROLLS:
+                break
+
+        self.accumulator.save()
 
     def scroll_to_bottom(self):
         """
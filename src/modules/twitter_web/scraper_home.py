@@ -3,10 +3,9 @@ Scraper class for the "For You" and "Following" pages. Inherits from Scraper cla
 and store Tweet and Profile objects in the tweets and profiles lists.
 """
 
-import time
-
-from .common import domain, TimeoutContext
+from .common import domain
 from .scraper import Scraper
+from .session_pool import SessionPool, get_pool
 
 
 class HomePage(Scraper):
@@ -14,9 +13,11 @@ class HomePage(Scraper):
     Scrapes the "For You" tab.
     """
 
-    def __init__(self, keys: dict, tab: str = "For you", max_tweets: int = 10, headless: bool = True):
+    def __init__(self, keys: dict, tab: str = "For you", max_tweets: int = 10, headless: bool = True, driver=None,
+                 seen_ids_path: str = None):
 
-        super().__init__(keys, headless)  # Initialize Scraper (log in)
+        # Initialize Scraper (log in unless a driver is given)
+        super().__init__(keys, headless, driver, seen_ids_path=seen_ids_path)
 
         if tab not in ["For you", "Following"]:
             raise ValueError("tab must be 'ForYou' or 'Following'")
@@ -31,66 +32,40 @@ class HomePage(Scraper):
         self.wait_for_element("//div[@data-testid='User-Name']")
 
         # Scrape cards
-        while True:
-            # Scroll down after first iteration
-            if len(self.tweets) != 0:
-                self.scroll_down()
-
-            # Get cards on page
-            cards = self.find_elements("//article[@data-testid='tweet']")
-
-            # Scrape cards
-            for card in cards:
-                # -> div with data-testid='User-Name'
-                _user_name = card.find_element(".//div[@data-testid='User-Name']")
-
-                # -> user_name -> second div -> first div -> third div -> first a with role='link'
-                tweet_url = card.find_element(".//div[2]/div[1]/div[3]/a[@role='link']").get_attribute("href")
-                tweet_id = tweet_url.split("/")[-1] if tweet_url else None
-
-                # card -> div with data-testid="tweetText" -> first span (text)
-                tweet_text = card.find_element(".//div[@data-testid='tweetText']").text
-
-                # Append if not duplicate (by tweet_id)
-                if tweet_id not in [tweet["tweet_id"] for tweet in self.tweets]:
-                    self.tweets.append(
-                        {
-                            "tweet_id": tweet_id if tweet_id else "",
-                            "tweet_url": tweet_url if tweet_url else "",
-                            "tweet_text": tweet_text if tweet_text else "",
-                            "tweet_media": "",
-                            "profile_handle": tweet_url.split("/")[-3] if tweet_url else ""
-                        }
-                    )
-
-                # Break if max_tweets reached
-                if len(self.tweets) >= max_tweets:
-                    break
-
-            # Break if max_tweets reached
-            if len(self.tweets) >= max_tweets:
-                break
+        self.scrape_tweets(max_tweets)
 
 
-def scrape_for_you_page(keys: dict, max_tweets: int = 10, headless: bool = True):
+def scrape_for_you_page(keys: dict, max_tweets: int = 10, headless: bool = True, pool: SessionPool = None,
+                          seen_ids_path: str = None):
     """
     Scrape the "For You" tab.
     :param keys: Keys dict including TWITTER_USERNAME and TWITTER_PASSWORD
     :param max_tweets: Maximum number of tweets to scrape
     :param headless: Whether to run Chrome in headless mode
+    :param pool: Session pool to take a logged in browser from. Defaults to the shared pool of the account.
+    :param seen_ids_path: Path of the seen-id file. If given, tweets scraped before are skipped.
     :return: List of Tweet objects
     """
-    scraper = HomePage(keys, tab="For you", max_tweets=max_tweets, headless=headless)
+    pool = pool or get_pool(keys, headless)
+    with pool.session() as driver:
+        scraper = HomePage(keys, tab="For you", max_tweets=max_tweets, headless=headless, driver=driver,
+                           seen_ids_path=seen_ids_path)
     return scraper.tweets
 
 
-def scrape_following_page(keys: dict, max_tweets: int = 10, headless: bool = True):
+def scrape_following_page(keys: dict, max_tweets: int = 10, headless: bool = True, pool: SessionPool = None,
+                          seen_ids_path: str = None):
     """
     Scrape the "Following" tab.
     :param keys: Keys dict including TWITTER_USERNAME and TWITTER_PASSWORD
     :param max_tweets: Maximum number of tweets to scrape
     :param headless: Whether to run Chrome in headless mode
+    :param pool: Session pool to take a logged in browser from. Defaults to the shared pool of the account.
+    :param seen_ids_path: Path of the seen-id file. If given, tweets scraped before are skipped.
     :return: List of Tweet objects
     """
-    scraper = HomePage(keys, tab="Following", max_tweets=max_tweets, headless=headless)
+    pool = pool or get_pool(keys, headless)
+    with pool.session() as driver:
+        scraper = HomePage(keys, tab="Following", max_tweets=max_tweets, headless=headless, driver=driver,
+                           seen_ids_path=seen_ids_path)
     return scraper.tweets
@@ -0,0 +1,92 @@
+"""
+Parallel scraping of many profiles across a bounded pool of browsers. Handles are scraped concurrently by up to
+`workers` logged in browsers; failed or timed out handles are retried, and tweets are yielded as each handle finishes.
+"""
+
+import time
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+from .scraper_profile import ProfilePage
+from .session_pool import SessionPool
+
+logger = logging.getLogger(__name__)
+
+
+def scrape_profiles_parallel(keys: dict, profile_handles: list[str], max_tweets: int = 10, workers: int = 2,
+                             retries: int = 2, timeout: float = 120, headless: bool = True,
+                             pool: SessionPool = None, seen_ids_dir: str = None):
+    """
+    Scrape many profile pages concurrently. Tweets are de-duplicated by tweet_id across all handles.
+    :param keys: Keys dict including TWITTER_USERNAME and TWITTER_PASSWORD
+    :param profile_handles: Profile handles to scrape
+    :param max_tweets: Maximum number of tweets to scrape per profile
+    :param workers: Number of browsers to scrape with
+    :param retries: Retries per handle after a failure or timeout
+    :param timeout: Seconds a single handle may take before its browser is closed and the handle retried
+    :param headless: Whether to run in headless mode
+    :param pool: Session pool to take logged in browsers from. A pool of `workers` browsers is created (and closed
+    afterwards) if None.
+    :param seen_ids_dir: Directory of per-profile seen-id files. If given, tweets scraped before are skipped.
+    :return: Generator of tweets
+    """
+    own_pool = pool is None
+    pool = pool or SessionPool(keys, size=workers, headless=headless)
+
+    running = {}  # handle -> (driver, start time) of handles currently being scraped
+    running_lock = threading.Lock()
+
+    def scrape(profile_handle):
+        with pool.session() as driver:
+            with running_lock:
+                running[profile_handle] = (driver, time.monotonic())
+            try:
+                return ProfilePage(keys, profile_handle, max_tweets, headless, driver=driver,
+                                   seen_ids_dir=seen_ids_dir).tweets
+            finally:
+                with running_lock:
+                    running.pop(profile_handle, None)
+
+    seen_tweet_ids = set()
+    attempts = {}
+    try:
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scraper") as executor:
+            futures = {}
+            for profile_handle in dict.fromkeys(profile_handles):
+                attempts[profile_handle] = 1
+                futures[executor.submit(scrape, profile_handle)] = profile_handle
+
+            while futures:
+                done, _ = wait(futures, timeout=1, return_when=FIRST_COMPLETED)
+
+                # Close browsers of handles that exceeded the timeout. The scrape then fails and is retried. Handles are
+                # removed here, so a browser that is slow to fail is not closed (and logged) again every second.
+                with running_lock:
+                    for profile_handle, (driver, started) in list(running.items()):
+                        if time.monotonic() - started > timeout:
+                            running.pop(profile_handle)
+                            logger.warning(f"Scraping {profile_handle} timed out after {timeout} seconds.")
+                            try:
+                                driver.quit()
+                            except Exception:
+                                pass
+
+                for future in done:
+                    profile_handle = futures.pop(future)
+                    try:
+                        tweets = future.result()
+                    except Exception as e:
+                        logger.error(f"Scraping {profile_handle} failed (attempt {attempts[profile_handle]}): {e}")
+                        if attempts[profile_handle] <= retries:
+                            attempts[profile_handle] += 1
+                            futures[executor.submit(scrape, profile_handle)] = profile_handle
+                        continue
+
+                    for tweet in tweets:
+                        if tweet["tweet_id"] and tweet["tweet_id"] not in seen_tweet_ids:
+                            seen_tweet_ids.add(tweet["tweet_id"])
+                            yield tweet
+    finally:
+        if own_pool:
+            pool.close()
@@ -2,10 +2,16 @@
 Scraper class for profile pages.
 """
 
-import time
-
-from .common import domain, TimeoutContext
+from .common import domain
 from .scraper import Scraper
+from .session_pool import SessionPool, get_pool
+
+
+def _seen_ids_path(seen_ids_dir: str or None, profile_handle: str) -> str or None:
+    """
+    Get path of the seen-id file of a profile.
+    """
+    return f"{seen_ids_dir}/{profile_handle}.json" if seen_ids_dir else None
 
 
 class ProfilePage(Scraper):
@@ -13,66 +19,56 @@ class ProfilePage(Scraper):
     Scrapes profile pages.
     """
 
-    def __init__(self, keys: dict, profile_handle: str, max_tweets: int = 10, headless: bool = True):
-        super().__init__(keys, headless)  # Initialize Scraper (log in)
+    def __init__(self, keys: dict, profile_handle: str, max_tweets: int = 10, headless: bool = True, driver=None,
+                 seen_ids_dir: str = None):
+        # Initialize Scraper (log in unless a driver is given)
+        super().__init__(keys, headless, driver, seen_ids_path=_seen_ids_path(seen_ids_dir, profile_handle))
 
         # Load profile page
         self.driver.get(f"{domain}/{profile_handle}")
         self.wait_for_elements("//a[@aria-label='Home']", "//div[@data-testid='User-Name']")
 
         # Scrape cards
-        while True:
-            # Scroll down after first iteration
-            if len(self.tweets) != 0:
-                self.scroll_down()
-
-            # Get cards on page
-            cards = self.find_elements("//article[@data-testid='tweet']")
-
-            # Scrape cards
-            for card in cards:
-                # -> div with data-testid='User-Name'
-                try:
-                    _user_name = card.find_element(".//div[@data-testid='User-Name']")
-
-                    # -> user_name -> second div -> first div -> third div -> first a with role='link'
-                    tweet_url = card.find_element(".//div[2]/div[1]/div[3]/a[@role='link']").get_attribute("href")
-                    tweet_id = tweet_url.split("/")[-1] if tweet_url else None
-
-                    # card -> div with data-testid="tweetText" -> first span (text)
-                    tweet_text = card.find_element(".//div[@data-testid='tweetText']").text
+        self.scrape_tweets(max_tweets)
 
-                    # Append if not duplicate (by tweet_id)
-                    if tweet_id not in [tweet["tweet_id"] for tweet in self.tweets]:
-                        self.tweets.append(
-                            {
-                                "tweet_id": tweet_id if tweet_id else "",
-                                "tweet_url": tweet_url if tweet_url else "",
-                                "tweet_text": tweet_text if tweet_text else "",
-                                "tweet_media": "",
-                                "profile_handle": tweet_url.split("/")[-3] if tweet_url else ""
-                            }
-                        )
-                except Exception as e:
-                    pass
 
-                # Break if max_tweets reached
-                if len(self.tweets) >= max_tweets:
-                    break
-
-            # Break if max_tweets reached
-            if len(self.tweets) >= max_tweets:
-                break
-
-
-def scrape_profile(keys: dict, profile_handle: str, max_tweets: int = 10, headless: bool = True):
+def scrape_profile(keys: dict, profile_handle: str, max_tweets: int = 10, headless: bool = True,
+                   pool: SessionPool = None, seen_ids_dir: str = None):
     """
     Scrape profile page.
     :param keys: Keys dict including TWITTER_USERNAME and TWITTER_PASSWORD
     :param profile_handle: Profile handle to scrape
     :param max_tweets: Maximum number of tweets to scrape
     :param headless: Whether to run in headless mode
+    :param pool: Session pool to take a logged in browser from. Defaults to the shared pool of the account.
+    :param seen_ids_dir: Directory of per-profile seen-id files. If given, tweets scraped before are skipped and
+    scrolling stops once only known tweets are left.
     :return: List of tweets
     """
-    scraper = ProfilePage(keys, profile_handle, max_tweets, headless)
+    pool = pool or get_pool(keys, headless)
+    with pool.session() as driver:
+        scraper = ProfilePage(keys, profile_handle, max_tweets, headless, driver=driver,
+                              seen_ids_dir=seen_ids_dir)
     return scraper.tweets
+
+
+def scrape_profiles(keys: dict, profile_handles: list[str], max_tweets: int = 10, headless: bool = True,
+                    pool: SessionPool = None, seen_ids_dir: str = None):
+    """
+    Scrape many profile pages through one logged in browser session.
+    :param keys: Keys dict including TWITTER_USERNAME and TWITTER_PASSWORD
+    :param profile_handles: Profile handles to scrape
+    :param max_tweets: Maximum number of tweets to scrape per profile
+    :param headless: Whether to run in headless mode
+    :param pool: Session pool to take a logged in browser from. Defaults to the shared pool of the account.
+    :param seen_ids_dir: Directory of per-profile seen-id files. If given, tweets scraped before are skipped and
+    scrolling stops once only known tweets are left.
+    :return: Dict of profile handle -> list of tweets
+    """
+    pool = pool or get_pool(keys, headless)
+    tweets = {}
+    with pool.session() as driver:
+        for profile_handle in profile_handles:
+            scraper = ProfilePage(keys, profile_handle, max_tweets, headless, driver=driver, seen_ids_dir=seen_ids_dir)
+            tweets[profile_handle] = scraper.tweets
+    return tweets
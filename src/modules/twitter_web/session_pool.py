@@ -0,0 +1,147 @@
+"""
+Pool of logged in browser sessions. Drivers are launched and logged in once, then reused across scrapes. Sessions are
+persisted to disk, so a restarted process restores its login instead of filling in the login form again.
+"""
+
+import os
+import time
+import logging
+import threading
+from contextlib import contextmanager
+
+from .scraper import Scraper, new_driver
+
+SESSION_DIR = "../keys"  # Persisted sessions contain login cookies, so they are kept with the keys
+
+
+class SessionPool:
+    """
+    Pool of up to `size` logged in Chrome drivers for one Twitter account.
+
+    Usage:
+    pool = SessionPool(keys, size=2)
+    with pool.session() as driver:
+        ProfilePage(keys, "elonmusk", driver=driver)
+    pool.close()
+    """
+
+    def __init__(self, keys: dict, size: int = 1, headless: bool = True, session_dir: str = SESSION_DIR):
+        """
+        :param keys: Keys dict including TWITTER_USERNAME and TWITTER_PASSWORD
+        :param size: Maximum number of drivers
+        :param headless: Whether to run Chrome in headless mode
+        :param session_dir: Directory to persist sessions to
+        """
+        self.keys = keys
+        self.size = size
+        self.headless = headless
+        self.session_path = os.path.join(session_dir, f"twitter_session_{keys['TWITTER_USERNAME']}.json")
+        self.logger = logging.getLogger(__name__)
+
+        self._idle = []
+        self._created = 0
+        # Waiters wait for an idle driver or a free slot. Notified on release, discard and failed launches.
+        self._condition = threading.Condition()
+
+    def _launch(self):
+        """
+        Launch a new driver and log in.
+        """
+        self.logger.info(f"Launching browser session {self._created}/{self.size}...")
+        driver = new_driver(self.headless)
+        try:
+            Scraper(self.keys, driver=driver, session_path=self.session_path).login()
+        except Exception:
+            driver.quit()
+            raise
+        return driver
+
+    def acquire(self, timeout: float = None):
+        """
+        Get an idle driver, launching one if the pool is not full. Blocks until a driver is released or discarded
+        otherwise.
+        :param timeout: Seconds to wait for a driver. Waits forever if None.
+        :return: Logged in driver
+        """
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._condition:
+            while True:
+                if self._idle:
+                    return self._idle.pop()
+                if self._created < self.size:
+                    self._created += 1
+                    break
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    raise TimeoutError(f"No browser session available after {timeout} seconds.")
+                self._condition.wait(remaining)
+
+        try:
+            return self._launch()
+        except BaseException:
+            self._free_slot()
+            raise
+
+    def _free_slot(self):
+        with self._condition:
+            self._created -= 1
+            self._condition.notify()
+
+    def release(self, driver, discard: bool = False):
+        """
+        Return a driver to the pool.
+        :param driver: Driver returned by acquire
+        :param discard: If True, the driver is closed instead (e.g. after an error left it in an unknown state). A
+        waiting thread then launches a replacement.
+        """
+        if discard:
+            self._free_slot()
+            try:
+                driver.quit()
+            except Exception:
+                pass  # Driver may already be closed (e.g. after a timeout)
+        else:
+            with self._condition:
+                self._idle.append(driver)
+                self._condition.notify()
+
+    @contextmanager
+    def session(self, timeout: float = None):
+        """
+        Context manager around acquire and release. Drivers are discarded if the block raises (including
+        KeyboardInterrupt), so the slot is never leaked.
+        """
+        driver = self.acquire(timeout)
+        discard = True
+        try:
+            yield driver
+            discard = False
+        finally:
+            self.release(driver, discard=discard)
+
+    def close(self):
+        """
+        Close all idle drivers.
+        """
+        with self._condition:
+            idle, self._idle = self._idle, []
+        for driver in idle:
+            self.release(driver, discard=True)
+
+
+_pools: dict[tuple[str, bool], SessionPool] = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(keys: dict, headless: bool = True) -> SessionPool:
+    """
+    Get the shared session pool of an account.
+    :param keys: Keys dict including TWITTER_USERNAME and TWITTER_PASSWORD
+    :param headless: Whether to run Chrome in headless mode
+    :return: SessionPool
+    """
+    with _pools_lock:
+        key = (keys["TWITTER_USERNAME"], headless)
+        if key not in _pools:
+            _pools[key] = SessionPool(keys, headless=headless)
+        return _pools[key]
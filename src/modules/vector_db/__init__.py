@@ -1 +1,2 @@
-from .vector_db import VectorDB
+from .vector_db import VectorDB, get_db
+from .ingest import TweetEmbeddingPipeline
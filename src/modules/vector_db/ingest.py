@@ -0,0 +1,79 @@
+"""
+Streaming ingestion of scraped tweets into an on-disk VectorDB.
+Tweets are embedded in micro-batches and each batch is appended to the database file as a new segment, so ingestion
+cost does not grow with the size of the database.
+"""
+
+import logging
+from pathlib import Path
+
+from .vector_db import VectorDB, get_db
+
+TWEETS_VECTOR_DB_PATH = "../databases/vector/tweets/tweets.pickle.gz"
+BATCH_SIZE = 32  # Tweets per embedding call and appended segment
+
+logger = logging.getLogger(__name__)
+
+
+class TweetEmbeddingPipeline:
+    """
+    Embeds tweets from the twitter_web scrapers and appends them to a VectorDB file. Tweets already in the database
+    (by tweet_id) are skipped.
+
+    Usage:
+    pipeline = TweetEmbeddingPipeline(openai_api_key)
+    pipeline.consume(twitter_web.scrape_profiles_parallel(keys, profile_handles))
+    """
+
+    def __init__(self, openai_api_key: str, storage_file: str = TWEETS_VECTOR_DB_PATH, batch_size: int = BATCH_SIZE):
+        """
+        :param openai_api_key: OpenAI API key
+        :param storage_file: VectorDB file to append to. Created on the first flush if missing.
+        :param batch_size: Tweets per embedding call and appended segment
+        """
+        self.storage_file = storage_file
+        self.batch_size = batch_size
+        if Path(storage_file).exists():
+            self.db = get_db(storage_file, openai_api_key, key="text")
+        else:
+            self.db = VectorDB(openai_api_key, key="text")
+        self.tweet_ids = {document.get("tweet_id") for document in self.db.documents}
+        self.buffer = []
+
+    def feed(self, tweet: dict):
+        """
+        Add a tweet to the current batch. The batch is flushed once it is full.
+        :param tweet: Tweet dict as returned by the twitter_web scrapers
+        """
+        if not tweet.get("tweet_id") or not tweet.get("tweet_text") or tweet["tweet_id"] in self.tweet_ids:
+            return
+        self.tweet_ids.add(tweet["tweet_id"])
+        self.buffer.append({"text": tweet["tweet_text"],
+                            "tweet_id": tweet["tweet_id"],
+                            "tweet_url": tweet.get("tweet_url", ""),
+                            "profile_handle": tweet.get("profile_handle", "")})
+        if len(self.buffer) >= self.batch_size:
+            self.flush()
+
+    def flush(self) -> int:
+        """
+        Embed and append the current batch.
+        :return: Number of appended tweets
+        """
+        batch, self.buffer = self.buffer, []
+        if batch:
+            Path(self.storage_file).parent.mkdir(parents=True, exist_ok=True)
+            self.db.append(batch, storage_file=self.storage_file)
+            logger.info(f"Appended {len(batch)} tweets to {self.storage_file}.")
+        return len(batch)
+
+    def consume(self, tweets) -> int:
+        """
+        Feed all tweets from an iterable (e.g. a scraper generator) and flush the last batch.
+        :param tweets: Iterable of tweet dicts
+        :return: Number of tweets in the database after ingestion
+        """
+        for tweet in tweets:
+            self.feed(tweet)
+        self.flush()
+        return len(self.db.documents)
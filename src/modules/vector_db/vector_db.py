@@ -7,11 +7,14 @@ import gzip
 import pickle
 import json
 import random
+import threading
 
 import numpy as np
 import openai
 from pathlib import Path
 
+from .. import metrics, tracing
+
 MAX_BATCH_SIZE = 2048  # OpenAI batch endpoint max size https://github.com/openai/openai-python/blob/main/openai
 
 
@@ -97,6 +100,18 @@ def _get_embedding(documents, key=None, model="text-embedding-ada-002"):
     return embeddings
 
 
+def _load_segments(f) -> list[dict]:
+    """
+    Read all pickled segments from an open file, until the end of the file.
+    """
+    segments = []
+    while True:
+        try:
+            segments.append(pickle.load(f))
+        except EOFError:
+            return segments
+
+
 class VectorDB:
     """
     Rewritten HyperDB object.
@@ -125,6 +140,8 @@ class VectorDB:
         self.documents = []
         self.vectors = None
         self.metadata = None
+        self._storage_file = None
+        self._storage_offset = 0
         self.embedding_function = embedding_function or (
             lambda docs: _get_embedding(docs, key=key)
         )
@@ -151,7 +168,8 @@ class VectorDB:
             )
 
     def __repr__(self):
-        return f"VectorDB(documents={self.documents}, vectors={self.vectors}, similarity_metric={self.similarity_metric})"
+        return (f"VectorDB(documents={self.documents}, vectors={self.vectors}, "
+                f"similarity_metric={self.similarity_metric})")
 
     def dict(self, vectors=False):
         if vectors:
@@ -195,6 +213,34 @@ class VectorDB:
         for vector, document in zip(vectors, documents):
             self.add_document(document, vector)
 
+    def append(self, documents: list, vectors=None, storage_file: str = None):
+        """
+        Append a batch of documents. The batch is embedded in one call and, if storage_file is given, written to the
+        end of the file as a new segment, so the existing database is never rewritten.
+        :param documents: Documents to append
+        :param vectors: Vectors of the documents. Embedded with embedding_function if None.
+        :param storage_file: Database file to append the batch to. Optional.
+        """
+        if not documents:
+            return
+        if vectors is None:
+            vectors = self.embedding_function(documents)
+        vectors = np.asarray(vectors, dtype=np.float32)
+        if self.vectors is not None and self.vectors.shape[1] != vectors.shape[1]:
+            raise ValueError("All vectors must have the same length.")
+
+        self.documents.extend(documents)
+        self.vectors = vectors if self.vectors is None else np.vstack([self.vectors, vectors])
+
+        if storage_file:
+            data = {"vectors": vectors, "documents": documents}
+            # Each batch is a separate gzip member (or pickle record), which load reads back in order
+            opener = gzip.open if storage_file.endswith(".gz") else open
+            with opener(storage_file, "ab") as f:
+                pickle.dump(data, f)
+            if storage_file == self._storage_file:
+                self._storage_offset = Path(storage_file).stat().st_size
+
     def save(self, storage_file):
         data = {"vectors": self.vectors, "documents": self.documents}
         if storage_file.endswith(".gz"):
@@ -204,6 +250,7 @@ class VectorDB:
             with open(storage_file, "wb") as f:
                 pickle.dump(data, f)
 
+    @metrics.timed("vector_load_seconds", "Time spent loading VectorDB files")
     def load(self, file_location):
         """
         Load a database from a .pickle.gz file.
@@ -214,15 +261,14 @@ class VectorDB:
         if Path(file_location).is_dir():
             file_location = f"{file_location}/{Path(file_location).stem}.pickle.gz"
 
-        # Load the database
-        if file_location.endswith(".gz"):
-            with gzip.open(file_location, "rb") as f:
-                data = pickle.load(f)
-        else:
-            with open(file_location, "rb") as f:
-                data = pickle.load(f)
-        self.vectors = data["vectors"].astype(np.float32)
-        self.documents = data["documents"]
+        # Load the database. Files may hold several segments written by append.
+        opener = gzip.open if file_location.endswith(".gz") else open
+        with opener(file_location, "rb") as f:
+            segments = _load_segments(f)
+        self.vectors = np.vstack([data["vectors"] for data in segments]).astype(np.float32)
+        self.documents = [document for data in segments for document in data["documents"]]
+        self._storage_file = file_location
+        self._storage_offset = Path(file_location).stat().st_size
 
         # Check if metadata exists and load it
         metadata_path = Path(file_location).parent / "metadata.jsonl"
@@ -230,6 +276,34 @@ class VectorDB:
             with open(metadata_path, "r") as f:
                 self.metadata = json.load(f)
 
+    def refresh(self) -> int:
+        """
+        Load segments appended to the loaded database file since it was loaded (e.g. by another process), without
+        reading the rest of the file again.
+        :return: Number of new documents
+        """
+        if self._storage_file is None or Path(self._storage_file).stat().st_size == self._storage_offset:
+            return 0
+
+        with open(self._storage_file, "rb") as raw:
+            raw.seek(self._storage_offset)
+            if self._storage_file.endswith(".gz"):
+                with gzip.GzipFile(fileobj=raw, mode="rb") as f:
+                    segments = _load_segments(f)
+            else:
+                segments = _load_segments(raw)
+            self._storage_offset = raw.seek(0, 2)
+
+        documents = [document for data in segments for document in data["documents"]]
+        if segments:
+            # Documents are extended before vectors, so concurrent queries never rank a vector without its document
+            vectors = np.vstack([data["vectors"] for data in segments]).astype(np.float32)
+            self.documents.extend(documents)
+            self.vectors = vectors if self.vectors is None else np.vstack([self.vectors, vectors])
+        return len(documents)
+
+    @metrics.timed("vector_query_seconds", "Time spent in VectorDB queries")
+    @tracing.traced("vector_db.query")
     def query(self, query_text, top_k=5, return_similarities=False, return_text_only=True) -> list:
         """
         Query the database.
@@ -250,3 +324,28 @@ class VectorDB:
         if return_text_only:
             return [doc["text"] for doc in docs]
         return docs
+
+
+_databases: dict[tuple[str, str], VectorDB] = {}
+_databases_lock = threading.Lock()
+
+
+def get_db(file_location: str, openai_api_key, key=None) -> VectorDB:
+    """
+    Get the shared database of a file. The file is loaded on first use; later calls only load segments appended
+    since (see VectorDB.refresh), so generators do not re-read every segment on each call.
+    :param file_location: Path to a .pickle.gz file or a directory containing one
+    :param openai_api_key: OpenAI API key
+    :param key: Key to use for embedding function
+    :return: VectorDB
+    """
+    with _databases_lock:
+        cache_key = (file_location, key)
+        if cache_key not in _databases:
+            db = VectorDB(openai_api_key, key=key)
+            db.load(file_location)
+            _databases[cache_key] = db
+        else:
+            openai.api_key = openai_api_key
+            _databases[cache_key].refresh()
+        return _databases[cache_key]
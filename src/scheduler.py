@@ -2,30 +2,42 @@
 Scheduler class definition.
 """
 
+import json
+import time
 import logging
-import yaml
+import datetime
+import functools
 import importlib
+import threading
+
+import croniter
 
 from apscheduler.schedulers.blocking import BlockingScheduler
 from apscheduler.jobstores.memory import MemoryJobStore
 from apscheduler.triggers.cron import CronTrigger
 
 import content
-import generators
-from modules import sqlite_db
+import settings
+from modules import sqlite_db, media_store, metrics, tracing, cron_planner
+
+POST_MAX_ATTEMPTS = 5  # Attempts per post before it is marked failed
+POST_RETRY_SECONDS = 60  # Delay before the first retry of a failed post. Doubles with every attempt.
+POST_LEASE_SECONDS = 3600  # A post still posting after this long is assumed lost with its process
+
+TASK_MAX_ATTEMPTS = 5  # Attempts per worker task before it is marked failed
+
+logger = logging.getLogger(__name__)
 
 
 def _load_config() -> dict:
     """
-    Load config.yaml
+    Load config.yaml (parsed once, shared with main.py)
     :return:
     """
-    with open("config.yaml", "r") as f:
-        config = yaml.load(f, Loader=yaml.FullLoader)
-    return config
+    return settings.load()
 
 
-def _load_function(func_path: str or None) -> callable or None:
+def load_function(func_path: str or None) -> callable or None:
     """
     Load function from path.
     """
@@ -44,7 +56,15 @@ def _load_function(func_path: str or None) -> callable or None:
         return getattr(module, func_name)
 
 
-def _assemble_content_objects() -> list[content.ContentObject]:
+@functools.lru_cache(maxsize=4096)
+def _cron_trigger(cron: str) -> CronTrigger:
+    """
+    Get the trigger of a cron expression. Triggers are stateless, so content objects sharing an expression share one.
+    """
+    return CronTrigger.from_crontab(cron)
+
+
+def assemble_content_objects() -> list[content.ContentObject]:
     """
     Assemble content objects from config.yaml
     :return: List of content objects
@@ -52,9 +72,9 @@ def _assemble_content_objects() -> list[content.ContentObject]:
     content_objects = []
     for content_object_params in _load_config()["scheduler"]["content_object_params"]:
         co = content.TwitterContentObject(
-            gen_func=_load_function(content_object_params["gen_func"]),
-            post_func=_load_function(content_object_params["post_func"]),
-            auth_func=_load_function(content_object_params["auth_func"]),
+            gen_func=load_function(content_object_params["gen_func"]),
+            post_func=load_function(content_object_params["post_func"]),
+            auth_func=load_function(content_object_params["auth_func"]),
             cron=content_object_params["cron"],
             is_authorized=content_object_params["is_authorized"],
             keys_path=content_object_params["keys_path"],
@@ -64,19 +84,100 @@ def _assemble_content_objects() -> list[content.ContentObject]:
     return content_objects
 
 
-def _gen_and_auth_content_object(co: content.ContentObject) -> content.ContentObject or None:
+def gen_and_auth_content_object(co: content.ContentObject) -> content.ContentObject or None:
     """
     Generate and authorize content object.
     """
-    co.run_gen_func()
+    with tracing.span("gen_and_auth", trace_id=co.hash, gen_func=co.gen_func.__name__):
+        co.run_gen_func()
+
+        # 3 attempts to authorize
+        for i in range(5):
+            if co.run_auth_func():
+                return co
+            else:
+                co.run_gen_func()
+        return None
+
+
+def gen_and_batch_auth_content_objects(content_objects: list[content.ContentObject],
+                                       batch_auth_func: callable) -> list[content.ContentObject]:
+    """
+    Generate content objects and authorize them together through batch_auth_func. Rejected content objects are
+    regenerated and sent for review again with the next digest.
+    :return: List of authorized content objects
+    """
+    for co in content_objects:
+        co.run_gen_func()
 
-    # 3 attempts to authorize
+    authorized = []
+    pending = content_objects
     for i in range(5):
-        if co.run_auth_func():
-            return co
-        else:
+        # One digest per key set, as the digest is sent with the keys of its first content object
+        groups = {}
+        for co in pending:
+            groups.setdefault(co.keys_path, []).append(co)
+
+        rejected = []
+        for group in groups.values():
+            decisions = content.ContentObject.run_batch_auth_func(group, batch_auth_func)
+            for co, decision in zip(group, decisions):
+                (authorized if decision else rejected).append(co)
+
+        if not rejected:
+            break
+        for co in rejected:
             co.run_gen_func()
-    return None
+        pending = rejected
+
+    return authorized
+
+
+def _post_outbox_entry(db: sqlite_db.Database, entry: dict):
+    """
+    Post a claimed outbox entry and record the outcome. Failed attempts are retried with exponential backoff. Post
+    functions that record posted ids in posted_tweet_ids (see twitter_api) resume a partially posted thread from the
+    last posted id; for other content a failure after a partial post cannot be told apart, so it is retried as a whole.
+    """
+    co = getattr(content, entry["table_name"]).deserialize(json.loads(entry["content"]))
+    if hasattr(co, "posted_tweet_ids"):
+        co.posted_tweet_ids = json.loads(entry["progress"]) if entry.get("progress") else []
+    try:
+        result = co.run_post_func()
+    except Exception as e:
+        attempts = entry["attempts"]
+        retry_at = time.time() + POST_RETRY_SECONDS * 2 ** (attempts - 1) if attempts < POST_MAX_ATTEMPTS else None
+        progress = json.dumps(co.posted_tweet_ids) if getattr(co, "posted_tweet_ids", None) else None
+        db.fail_outbox_entry(entry["id"], error=repr(e), retry_at=retry_at, progress=progress)
+        state = "pending" if retry_at else "failed"
+        metrics.counter("outbox_posts_total", "Outbox post attempts by outcome").inc(state=state)
+        posted = f" after {len(co.posted_tweet_ids)} posted tweets" if progress else ""
+        logger.error(f"Posting {entry['id']} failed{posted} (attempt {attempts}/{POST_MAX_ATTEMPTS}): {e}")
+        return
+
+    db.complete_outbox_entry(entry["id"], result=str(result))
+    metrics.counter("outbox_posts_total", "Outbox post attempts by outcome").inc(state="posted")
+    logger.info(f"Posted {entry['id']}.")
+
+
+def drain_outbox(db: sqlite_db.Database, post_id: str = None, max_posts: int = None) -> int:
+    """
+    Claim and post due posts from the outbox until none are left.
+    :param db: Database
+    :param post_id: Only post this post
+    :param max_posts: Maximum number of posts. No limit if None.
+    :return: Number of claimed posts
+    """
+    claimed = 0
+    while max_posts is None or claimed < max_posts:
+        entry = db.claim_outbox_entry(lease_seconds=POST_LEASE_SECONDS, post_id=post_id)
+        if entry is None:
+            break
+        _post_outbox_entry(db, entry)
+        claimed += 1
+        if post_id is not None:
+            break
+    return claimed
 
 
 class Scheduler(BlockingScheduler):
@@ -86,39 +187,94 @@ class Scheduler(BlockingScheduler):
      Core jobs:
         - _update_database : update content database from config.yaml (generate content if missing)
         - _update_scheduler : update scheduler jobs from content database
+        - _collect_media_garbage : delete generated media no longer referenced by the content database
+        - _write_metrics : write pipeline metrics to the metrics file (if configured)
+        - _process_outbox : post due posts from the outbox (retries and posts left over by a previous process)
+        - _run_scrape_job : scrape tweets for generators (scheduler.scrape_jobs in config.yaml, if configured)
 
     Custom jobs:
-        - Are added to scheduler with the core job _update_scheduler. Triggered at specified times.
+        - Are added to scheduler with the core job _update_scheduler, or by _update_database as soon as a content
+          object is generated and authorized. Triggered at specified times.
+
+    Startup does not wait for generation: jobs are registered from the authorized content already in the database, and
+    missing content is generated in the background once the scheduler is started.
+
+    Posting goes through the outbox table. When a job fires, its content row is moved to the outbox in one transaction
+    and then claimed and posted, so a crash never loses content. Failed posts are retried with exponential backoff, and
+    a retried thread resumes after its last posted tweet. A post interrupted while posting is marked failed rather than
+    retried, so nothing is posted twice.
+
+    Coordinator mode (see worker.py): the scheduler only evaluates cron triggers. Missing content is enqueued as
+    "generate" tasks and fired jobs only move their content to the outbox; worker processes claim both from the
+    database. Core job _process_outbox is replaced by _recover_leases.
 
     """
 
-    def __init__(self):
+    def __init__(self, coordinator: bool = False):
+        """
+        :param coordinator: If True, run as coordinator of worker processes instead of generating and posting
+        """
         super().__init__()
         self.config = None
+        self.coordinator = coordinator
         self.logger = logging.getLogger(__name__)
-        self.logger.info("Initializing scheduler...")
+        self.logger.info(f"Initializing scheduler{' (coordinator)' if coordinator else ''}...")
 
         self.add_jobstore(MemoryJobStore(), "default")
         self.config = _load_config()
+        self._update_database_lock = threading.Lock()
         self.load_core_jobs()
 
-        # Run core jobs at startup
-        self._update_database()
+        # Run core jobs at startup. Content in the database is scheduled right away, while missing content is generated
+        # (and may wait for human authorization) in the background after start().
         self._update_scheduler()
+        self.add_job(self._update_database, id="startup_update_database", name="_update_database",
+                     misfire_grace_time=None)
+        if not coordinator:
+            self.add_job(self._process_outbox, id="startup_process_outbox", name="_process_outbox",
+                         misfire_grace_time=None)
 
+    @metrics.timed("scheduler_core_job_seconds", "Time spent in scheduler core jobs", job="update_database")
     def _update_database(self):
         """
         Core job 1
         Updates the content database by assembling content objects defined in config.yaml. Content objects are
         generated and authorized if missing from database. Content objects are stored in database with their unique hash
-        as primary key. Content objects are updated if hash is already found in database.
+        as primary key. Content objects are updated if hash is already found in database. Each content object is
+        scheduled as soon as it is stored. Skipped if a previous run is still generating.
+        """
+        if not self._update_database_lock.acquire(blocking=False):
+            self.logger.info("Content database update already running. Skipping...")
+            return
+        try:
+            self._update_database_unlocked()
+        finally:
+            self._update_database_lock.release()
+
+    def _update_database_unlocked(self):
+        """
+        Body of _update_database. Must only run while holding _update_database_lock.
         """
         # Load content objects from config.yaml
-        content_objects = _assemble_content_objects()
+        content_objects = assemble_content_objects()
 
         # Load database
         db = sqlite_db.Database(db_file_path=self.config["paths"]["sql_database"])
 
+        # Batch authorization is used if a digest auth function is configured
+        batch_auth_func = load_function(self.config["scheduler"].get("digest_auth_func"))
+        missing = []
+
+        # Generate the content firing soonest first. With pregenerate_hours set, content firing later than that is left
+        # for a later run.
+        next_fires = cron_planner.CronPlanner((co.hash, co.cron) for co in content_objects).next_fire_times()
+        content_objects.sort(key=lambda co: next_fires[co.cron])
+        pregenerate_hours = self.config["scheduler"].get("pregenerate_hours")
+        horizon = datetime.datetime.now() + datetime.timedelta(hours=pregenerate_hours) if pregenerate_hours else None
+
+        if self.coordinator:
+            db.create_task_table()
+
         # Insert content objects into database if missing (check with hash)
         for co in content_objects:
             db.create_table(table_name=co.__class__.__name__, fields=list(co.serialize().keys()))
@@ -129,17 +285,50 @@ class Scheduler(BlockingScheduler):
                          where=f"hash='{co.hash}'"):
                 continue
 
+            if horizon and next_fires[co.cron] > horizon:
+                continue
+
+            # Leave generation to the workers
+            if self.coordinator:
+                if db.enqueue_task(kind="generate", key=co.hash):
+                    self.logger.info(f"Enqueued generation of {co.__class__.__name__} {co.hash[:16]}.")
+                continue
+
+            if batch_auth_func:
+                missing.append(co)
+                continue
+
             # Generate and authorize content object
             self.logger.info(f"Generating and authorizing {co.__class__.__name__}...")
-            co = _gen_and_auth_content_object(co)
+            co = gen_and_auth_content_object(co)
             if co:
-                db.update(table_name=co.__class__.__name__,
-                          fields=list(co.serialize().keys()),
-                          values=list(co.serialize().values()),
-                          where=f"hash='{co.hash}'")
+                row = co.serialize()
+                db.update_many(table_name=co.__class__.__name__,
+                               fields=list(row.keys()),
+                               rows=[list(row.values())],
+                               key_field="hash")
+                self._add_content_job(co)
+
+        if missing:
+            self.logger.info(f"Generating and authorizing {len(missing)} content objects as a digest...")
+            authorized = gen_and_batch_auth_content_objects(missing, batch_auth_func)
+
+            # Write all authorized content objects in one transaction per table
+            tables = {}
+            for co in authorized:
+                tables.setdefault(co.__class__.__name__, []).append(co.serialize())
+            for table_name, rows in tables.items():
+                fields = list(rows[0].keys())
+                db.update_many(table_name=table_name,
+                               fields=fields,
+                               rows=[[row[field] for field in fields] for row in rows],
+                               key_field="hash")
+            for co in authorized:
+                self._add_content_job(co)
 
         db.close()
 
+    @metrics.timed("scheduler_core_job_seconds", "Time spent in scheduler core jobs", job="update_scheduler")
     def _update_scheduler(self):
         """
         Core job 2
@@ -154,12 +343,14 @@ class Scheduler(BlockingScheduler):
         # Load content objects from database
         content_objects = []
         for table in tables:
+            # Skip tables that do not hold content objects (e.g. scraped tweets)
+            if table != "TwitterContentObject":
+                continue
             for x in db.select(table_name=table,
                                fields="*",
                                where=""):
-                if table == "TwitterContentObject":
-                    co = content.TwitterContentObject.deserialize(x)
-                    content_objects.append(co)
+                co = content.TwitterContentObject.deserialize(x)
+                content_objects.append(co)
 
         for co in content_objects:
 
@@ -167,28 +358,143 @@ class Scheduler(BlockingScheduler):
             if not co.is_authorized:
                 continue
 
-            def run_and_remove(self_, co_, db_file_path):
-                """
-                Remove job from scheduler and database after running.
-                """
-                db_ = sqlite_db.Database(db_file_path=db_file_path)
+            self._add_content_job(co)
+
+        db.close()
+
+    def _add_content_job(self, co: content.ContentObject):
+        """
+        Add (or replace) the job posting an authorized content object at its cron time.
+        """
+
+        def run_and_remove(self_, co_, db_file_path):
+            """
+            Remove job from scheduler, move content object from database to outbox, then post it.
+            """
+            with tracing.span("run_and_remove", trace_id=co_.hash, gen_func=co_.gen_func.__name__):
                 self_.remove_job(co_.hash)
-                db_.delete(table_name=co_.__class__.__name__,
-                           where=f"hash='{co_.hash}'")
-                co_.run_post_func()
 
-            self.add_job(func=run_and_remove,
-                         trigger=CronTrigger.from_crontab(co.cron),
-                         args=[self, co, self.config["paths"]["sql_database"]],
-                         name=co.__class__.__name__,
-                         id=co.hash,
-                         replace_existing=True)
+                # The post id is the fire time of the job, so a job run again for the same fire adds no second post
+                fire_time = croniter.croniter(co_.cron, datetime.datetime.now() + datetime.timedelta(seconds=1))
+                post_id = f"{co_.hash}:{fire_time.get_prev(datetime.datetime).isoformat()}"
+
+                db_ = sqlite_db.Database(db_file_path=db_file_path)
+                db_.create_outbox_table()
+                db_.move_to_outbox(post_id=post_id,
+                                   table_name=co_.__class__.__name__,
+                                   content_hash=co_.hash,
+                                   content=json.dumps(co_.serialize()),
+                                   media=co_.media if getattr(co_, "media", None) else None)
+                db_.close()
+
+                # Workers claim the post from the outbox in coordinator mode
+                if not self_.coordinator:
+                    self_._process_outbox(post_id=post_id)
+
+        self.add_job(func=run_and_remove,
+                     trigger=_cron_trigger(co.cron),
+                     args=[self, co, self.config["paths"]["sql_database"]],
+                     name=co.__class__.__name__,
+                     id=co.hash,
+                     replace_existing=True)
+
+    def upcoming(self, hours: float) -> list[tuple[datetime.datetime, content.ContentObject]]:
+        """
+        Get the authorized content objects in the database that post in the next hours.
+        :param hours: Hours to look ahead
+        :return: List of (fire time, content object), sorted by fire time
+        """
+        db = sqlite_db.Database(db_file_path=self.config["paths"]["sql_database"])
+        content_objects = {}
+        if "TwitterContentObject" in db.list_tables():
+            for x in db.select(table_name="TwitterContentObject", fields="*", where=""):
+                co = content.TwitterContentObject.deserialize(x)
+                if co.is_authorized:
+                    content_objects[co.hash] = co
+        db.close()
+
+        planner = cron_planner.CronPlanner((co.hash, co.cron) for co in content_objects.values())
+        return [(fire_time, content_objects[key]) for fire_time, key in planner.upcoming(hours)]
+
+    def _collect_media_garbage(self):
+        """
+        Core job 3
+        Delete generated media that is no longer referenced by any content object in the database.
+        """
+        db = sqlite_db.Database(db_file_path=self.config["paths"]["sql_database"])
+        media_store.collect_garbage(db)
+        db.close()
+
+    def _write_metrics(self):
+        """
+        Core job 4
+        Write pipeline metrics to the configured metrics file.
+        """
+        metrics.write(self.config["metrics"]["file"])
+
+    def _process_outbox(self, post_id: str = None):
+        """
+        Core job 5
+        Recover posts whose lease expired, then claim and post due posts from the outbox until none are left.
+        :param post_id: Only post this post (e.g. right after its job moved it to the outbox)
+        """
+        db = sqlite_db.Database(db_file_path=self.config["paths"]["sql_database"])
+        db.create_outbox_table()
+        expired = db.expire_outbox_leases()
+        if expired:
+            self.logger.error(f"{expired} posts were interrupted while posting and are marked failed. Check them.")
+        drain_outbox(db, post_id=post_id)
+        db.close()
 
+    def _recover_leases(self):
+        """
+        Core job 5 (coordinator mode)
+        Return tasks of crashed or stuck workers to the queue, and mark posts interrupted while posting as failed.
+        """
+        db = sqlite_db.Database(db_file_path=self.config["paths"]["sql_database"])
+        db.create_outbox_table()
+        db.create_task_table()
+        expired = db.expire_outbox_leases()
+        if expired:
+            self.logger.error(f"{expired} posts were interrupted while posting and are marked failed. Check them.")
+        expired = db.expire_task_leases(max_attempts=TASK_MAX_ATTEMPTS)
+        if expired:
+            self.logger.warning(f"{expired} worker tasks exceeded their lease and were returned to the queue.")
         db.close()
 
+    def _run_scrape_job(self, func_path: str, keys_path: str, kwargs: dict = None):
+        """
+        Core job 6
+        Scrape tweets into the scraped tweets table and the tweets VectorDB, where generators sample and retrieve them
+        (e.g. TwitterBot.scrape_profiles, read by random_copycat, random_reply and topical_thought).
+        :param func_path: Path of the scrape function, called with the keys dict and kwargs
+        :param keys_path: Path to keys file
+        :param kwargs: Keyword arguments to the scrape function. Optional.
+        """
+        with open(keys_path, "r") as f:
+            keys = json.load(f)
+        with metrics.timer("scrape_seconds", "Time spent in scrape jobs", func=func_path):
+            stored = load_function(func_path)(keys, **(kwargs or {}))
+        self.logger.info(f"Scrape job {func_path} stored {stored} new tweets.")
+
     def load_core_jobs(self):
         """
         Load scheduler core jobs.
         """
         self.add_job(self._update_database, "cron", hour="*", minute="*/10", second="0")
-        self.add_job(self._update_scheduler, "cron", hour="*", minute="*/10", second="0")
+        self.add_job(self._collect_media_garbage, "cron", hour="*", minute="5", second="0")
+        if self.coordinator:
+            # Pick up content generated by the workers quickly
+            self.add_job(self._update_scheduler, "cron", minute="*", second="0")
+            self.add_job(self._recover_leases, "cron", minute="*", second="15")
+        else:
+            self.add_job(self._update_scheduler, "cron", hour="*", minute="*/10", second="0")
+            self.add_job(self._process_outbox, "cron", minute="*", second="15")
+        if self.config.get("metrics", {}).get("file"):
+            self.add_job(self._write_metrics, "cron", minute="*", second="30")
+        for scrape_job in self.config["scheduler"].get("scrape_jobs") or []:
+            self.add_job(self._run_scrape_job,
+                         trigger=_cron_trigger(scrape_job["cron"]),
+                         args=(scrape_job["func"], scrape_job["keys_path"], scrape_job.get("kwargs")),
+                         max_instances=1,
+                         coalesce=True)
@@ -0,0 +1,28 @@
+"""
+Settings. config.yaml is parsed once and shared by all modules. It is parsed again only after the file changes, so
+edits are still picked up by the scheduler core jobs.
+"""
+
+import os
+import threading
+
+import yaml
+
+CONFIG_PATH = "config.yaml"
+
+_configs: dict[str, tuple[float, dict]] = {}  # path -> (modification time, config)
+_lock = threading.Lock()
+
+
+def load(path: str = CONFIG_PATH) -> dict:
+    """
+    Get the parsed config. Treat it as read-only, as it is shared.
+    :param path: Path to config file
+    :return: Config dict
+    """
+    mtime = os.path.getmtime(path)
+    with _lock:
+        if path not in _configs or _configs[path][0] != mtime:
+            with open(path, "r") as f:
+                _configs[path] = (mtime, yaml.load(f, Loader=yaml.FullLoader))
+        return _configs[path][1]
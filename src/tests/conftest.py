@@ -0,0 +1,8 @@
+"""
+Shared pytest setup. Modules are imported the way the program runs them, from the src directory.
+"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,59 @@
+import datetime
+
+import croniter
+import pytest
+
+from modules.cron_planner import CronPlanner, is_valid
+
+NOW = datetime.datetime(2024, 2, 27, 13, 37, 12)  # Crosses a leap day and a month boundary within the window
+
+EXPRESSIONS = [
+    "45 11 * * *",
+    "*/15 * * * *",
+    "0 9-17/2 * * mon-fri",
+    "30 6 1,15 * *",
+    "0 0 29 2 *",
+    "0 12 * * 7",
+    "0 8 13 * 5",  # Both day fields restricted: either matches
+    "5 4 * jan,mar *",
+    "0 0 L * *",  # Not supported by numpy, evaluated with croniter
+    "@daily",
+]
+
+
+def _croniter_fires(cron, start, end):
+    times = []
+    it = croniter.croniter(cron, start - datetime.timedelta(microseconds=1))
+    while (t := it.get_next(datetime.datetime)) < end:
+        times.append(t)
+    return times
+
+
+@pytest.mark.parametrize("cron", EXPRESSIONS)
+def test_fires_between_matches_croniter(cron):
+    start, end = NOW, NOW + datetime.timedelta(days=40)
+    assert CronPlanner([("key", cron)]).fires_between(start, end)[cron] == _croniter_fires(cron, start, end)
+
+
+@pytest.mark.parametrize("cron", EXPRESSIONS + ["0 0 1 1 *"])  # Next fire outside the numpy window
+def test_next_fire_times_match_croniter(cron):
+    planner = CronPlanner([("key", cron)])
+    assert planner.next_fire_times(NOW)[cron] == croniter.croniter(cron, NOW).get_next(datetime.datetime)
+
+
+def test_upcoming_is_sorted_and_lists_every_key():
+    planner = CronPlanner([("a", "0 * * * *"), ("b", "0 * * * *"), ("c", "30 * * * *")])
+    upcoming = planner.upcoming(hours=2, now=NOW)
+    assert upcoming == [(datetime.datetime(2024, 2, 27, 14, 0), "a"),
+                        (datetime.datetime(2024, 2, 27, 14, 0), "b"),
+                        (datetime.datetime(2024, 2, 27, 14, 30), "c"),
+                        (datetime.datetime(2024, 2, 27, 15, 0), "a"),
+                        (datetime.datetime(2024, 2, 27, 15, 0), "b"),
+                        (datetime.datetime(2024, 2, 27, 15, 30), "c")]
+
+
+def test_invalid_expressions():
+    assert not is_valid("61 * * * *")
+    assert not is_valid("not a cron")
+    with pytest.raises(ValueError):
+        CronPlanner([("key", "* * *")])
@@ -0,0 +1,93 @@
+import time
+
+import pytest
+
+from modules import sqlite_db
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = sqlite_db.Database(db_file_path=str(tmp_path / "test.db"))
+    db.create_table(table_name="TwitterContentObject", fields=["hash", "text"])
+    db.insert(table_name="TwitterContentObject", fields=["hash", "text"], values=["abc", "Hello"])
+    db.create_outbox_table()
+    yield db
+    db.close()
+
+
+def _state(db, post_id):
+    return db.select(table_name=sqlite_db.OUTBOX_TABLE, fields="*", where=f"id='{post_id}'")[0]
+
+
+def test_move_to_outbox_deletes_content_row(db):
+    assert db.move_to_outbox("abc:1", "TwitterContentObject", "abc", content='{"text": "Hello"}', media="a.png")
+    assert db.select(table_name="TwitterContentObject", fields="*") == []
+    row = _state(db, "abc:1")
+    assert (row["state"], row["attempts"], row["media"]) == ("pending", 0, "a.png")
+
+
+def test_move_to_outbox_is_idempotent(db):
+    assert db.move_to_outbox("abc:1", "TwitterContentObject", "abc", content="{}")
+    assert not db.move_to_outbox("abc:1", "TwitterContentObject", "abc", content="{}")
+
+
+def test_claim_complete(db):
+    db.move_to_outbox("abc:1", "TwitterContentObject", "abc", content="{}", media="a.png")
+    entry = db.claim_outbox_entry(lease_seconds=60)
+    assert (entry["id"], entry["state"], entry["attempts"]) == ("abc:1", "posting", 1)
+    assert db.claim_outbox_entry(lease_seconds=60) is None  # Claimed exactly once
+
+    db.complete_outbox_entry("abc:1", result="123")
+    row = _state(db, "abc:1")
+    assert (row["state"], row["result"], row["media"]) == ("posted", "123", None)
+    assert db.claim_outbox_entry(lease_seconds=60) is None
+
+
+def test_claim_by_post_id(db):
+    db.move_to_outbox("abc:1", "TwitterContentObject", "abc", content="{}")
+    db.move_to_outbox("abc:2", "TwitterContentObject", "abc", content="{}")
+    assert db.claim_outbox_entry(lease_seconds=60, post_id="abc:2")["id"] == "abc:2"
+    assert db.claim_outbox_entry(lease_seconds=60, post_id="abc:2") is None
+
+
+def test_fail_with_retry_keeps_progress(db):
+    db.move_to_outbox("abc:1", "TwitterContentObject", "abc", content="{}")
+    db.claim_outbox_entry(lease_seconds=60)
+    db.fail_outbox_entry("abc:1", error="boom", retry_at=time.time() + 3600, progress='["1", "2"]')
+    row = _state(db, "abc:1")
+    assert (row["state"], row["error"], row["progress"]) == ("pending", "boom", '["1", "2"]')
+    assert db.claim_outbox_entry(lease_seconds=60) is None  # Not due yet
+
+    db.cursor.execute(f'UPDATE "{sqlite_db.OUTBOX_TABLE}" SET "next_attempt_at" = 0')
+    entry = db.claim_outbox_entry(lease_seconds=60)
+    assert (entry["attempts"], entry["progress"]) == (2, '["1", "2"]')
+
+    db.fail_outbox_entry("abc:1", error="boom again", retry_at=0)
+    assert _state(db, "abc:1")["progress"] == '["1", "2"]'  # Kept if no new progress
+
+
+def test_fail_without_retry(db):
+    db.move_to_outbox("abc:1", "TwitterContentObject", "abc", content="{}")
+    db.claim_outbox_entry(lease_seconds=60)
+    db.fail_outbox_entry("abc:1", error="boom")
+    assert _state(db, "abc:1")["state"] == "failed"
+    assert db.claim_outbox_entry(lease_seconds=60) is None
+
+
+def test_expired_lease_is_failed_not_retried(db):
+    db.move_to_outbox("abc:1", "TwitterContentObject", "abc", content="{}")
+    db.claim_outbox_entry(lease_seconds=-1)
+    assert db.expire_outbox_leases() == 1
+    assert _state(db, "abc:1")["state"] == "failed"
+    # A late outcome of the lost attempt does not change the row
+    db.complete_outbox_entry("abc:1", result="123")
+    assert _state(db, "abc:1")["state"] == "failed"
+
+
+def test_progress_column_added_to_existing_table(tmp_path):
+    db = sqlite_db.Database(db_file_path=str(tmp_path / "old.db"))
+    db.create_table(table_name=sqlite_db.OUTBOX_TABLE, fields=["id", "state"])
+    db.create_outbox_table()
+    db.cursor.execute(f'PRAGMA table_info("{sqlite_db.OUTBOX_TABLE}")')
+    assert "progress" in [x[1] for x in db.cursor.fetchall()]
+    db.close()
@@ -0,0 +1,86 @@
+import time
+
+import pytest
+
+from modules import sqlite_db
+
+
+@pytest.fixture
+def db(tmp_path):
+    db = sqlite_db.Database(db_file_path=str(tmp_path / "test.db"))
+    db.create_task_table()
+    yield db
+    db.close()
+
+
+def _task(db, task_id):
+    return db.select(table_name=sqlite_db.TASK_TABLE, fields="*", where=f"id={task_id}")[0]
+
+
+def test_enqueue_skips_pending_and_running_duplicates(db):
+    assert db.enqueue_task(kind="generate", key="abc")
+    assert not db.enqueue_task(kind="generate", key="abc")
+    assert db.enqueue_task(kind="generate", key="def")
+    assert db.enqueue_task(kind="other", key="abc")
+
+    token, tasks = db.claim_tasks(kind="generate", worker_id="w", lease_seconds=60, limit=1)
+    assert not db.enqueue_task(kind="generate", key="abc")  # Running
+    db.complete_task(tasks[0]["id"], token)
+    assert db.enqueue_task(kind="generate", key="abc")  # Done tasks do not block a new one
+
+
+def test_claim_is_exclusive_and_limited(db):
+    for key in "abc":
+        db.enqueue_task(kind="generate", key=key)
+    token, tasks = db.claim_tasks(kind="generate", worker_id="w1", lease_seconds=60, limit=2)
+    assert [t["key"] for t in tasks] == ["a", "b"]
+    assert all(t["state"] == "running" and t["attempts"] == 1 and t["claimed_by"] == token for t in tasks)
+
+    _, tasks = db.claim_tasks(kind="generate", worker_id="w2", lease_seconds=60, limit=10)
+    assert [t["key"] for t in tasks] == ["c"]
+    assert db.claim_tasks(kind="generate", worker_id="w3", lease_seconds=60, limit=10)[1] == []
+
+
+def test_fail_with_retry_and_without(db):
+    db.enqueue_task(kind="generate", key="abc")
+    token, (task,) = db.claim_tasks(kind="generate", worker_id="w", lease_seconds=60)
+    db.fail_task(task["id"], token, error="boom", retry_at=time.time() + 3600)
+    assert (_task(db, task["id"])["state"], _task(db, task["id"])["error"]) == ("pending", "boom")
+    assert db.claim_tasks(kind="generate", worker_id="w", lease_seconds=60)[1] == []  # Not due yet
+
+    db.cursor.execute(f'UPDATE "{sqlite_db.TASK_TABLE}" SET "next_attempt_at" = 0')
+    token, (task,) = db.claim_tasks(kind="generate", worker_id="w", lease_seconds=60)
+    assert task["attempts"] == 2
+    db.fail_task(task["id"], token, error="boom")
+    assert _task(db, task["id"])["state"] == "failed"
+
+
+def test_expired_leases_return_to_queue_until_attempts_are_used(db):
+    db.enqueue_task(kind="generate", key="abc")
+    db.claim_tasks(kind="generate", worker_id="w", lease_seconds=-1)
+    assert db.expire_task_leases(max_attempts=2) == 1
+    assert _task(db, 1)["state"] == "pending"
+
+    db.claim_tasks(kind="generate", worker_id="w", lease_seconds=-1)
+    assert db.expire_task_leases(max_attempts=2) == 1
+    assert _task(db, 1)["state"] == "failed"
+
+
+def test_renewed_leases_do_not_expire(db):
+    db.enqueue_task(kind="generate", key="abc")
+    token, _ = db.claim_tasks(kind="generate", worker_id="w", lease_seconds=-1)
+    assert db.renew_task_leases(token, lease_seconds=60) == 1
+    assert db.expire_task_leases(max_attempts=5) == 0
+
+
+def test_lost_claim_cannot_complete(db):
+    db.enqueue_task(kind="generate", key="abc")
+    old_token, (task,) = db.claim_tasks(kind="generate", worker_id="w1", lease_seconds=-1)
+    db.expire_task_leases(max_attempts=5)
+    new_token, _ = db.claim_tasks(kind="generate", worker_id="w2", lease_seconds=60)
+
+    assert db.renew_task_leases(old_token, lease_seconds=60) == 0
+    db.complete_task(task["id"], old_token)
+    assert _task(db, task["id"])["state"] == "running"
+    db.complete_task(task["id"], new_token)
+    assert _task(db, task["id"])["state"] == "done"
@@ -0,0 +1,62 @@
+from modules import thread_splitter
+from modules.thread_splitter import split_thread, weighted_length, graphemes
+
+FAMILY = "\U0001F468\u200d\U0001F469\u200d\U0001F467"  # ZWJ sequence
+THUMBS_UP = "\U0001F44D\U0001F3FB"  # Skin tone modifier
+FLAG = "\U0001F1EB\U0001F1F7"  # Regional indicator pair
+KEYCAP = "1\ufe0f\u20e3"  # Keycap sequence
+
+
+def test_empty():
+    assert split_thread("") == []
+    assert split_thread(None) == []
+
+
+def test_short_text_is_one_chunk():
+    assert split_thread("Know thyself.") == ["Know thyself."]
+
+
+def test_chunks_fit_and_break_between_sentences():
+    sentence = "The obstacle is the way and what stands in the way becomes the way. "
+    chunks = split_thread(sentence * 20)
+    assert len(chunks) > 1
+    assert all(weighted_length(chunk) <= thread_splitter.MAX_WEIGHTED_LENGTH for chunk in chunks)
+    assert all(chunk.endswith(".") for chunk in chunks)
+    assert " ".join(chunks) == (sentence * 20).strip()
+
+
+def test_apostrophes_and_quotes_are_kept():
+    text = "Don't fear death. It's \"only\" nature's way. " * 15
+    chunks = split_thread(text)
+    assert " ".join(chunks) == text.strip()
+    assert all("Don't" in chunk or "It's" in chunk for chunk in chunks)
+
+
+def test_long_word_is_split():
+    chunks = split_thread("a" * 300)
+    assert [len(chunk) for chunk in chunks] == [280, 20]
+
+
+def test_newlines_are_preserved():
+    assert split_thread("First line\nSecond line") == ["First line\nSecond line"]
+
+
+def test_emoji_sequences_are_single_graphemes():
+    for emoji in (FAMILY, THUMBS_UP, FLAG, KEYCAP):
+        assert graphemes(emoji) == [emoji]
+        assert weighted_length(emoji) == thread_splitter.EMOJI_WEIGHT
+
+
+def test_emoji_are_never_split():
+    text = FAMILY * 200
+    chunks = split_thread(text)
+    assert "".join(chunks) == text
+    assert all(weighted_length(chunk) <= thread_splitter.MAX_WEIGHTED_LENGTH for chunk in chunks)
+    assert all(graphemes(chunk) == [FAMILY] * (len(chunk) // len(FAMILY)) for chunk in chunks)
+
+
+def test_weighted_length():
+    assert weighted_length("abc") == 3
+    assert weighted_length("\u65e5\u672c") == 4  # CJK characters count double
+    text = "see https://example.com/a/very/long/path/that/is/shortened"
+    assert weighted_length(text) == 4 + thread_splitter.URL_LENGTH
@@ -0,0 +1,33 @@
+import numpy as np
+
+from modules.vector_db import VectorDB, get_db
+
+
+def _write_db(path, texts):
+    db = VectorDB(None, embedding_function=lambda docs: None)
+    db.append([{"text": text} for text in texts], vectors=np.eye(len(texts), 4), storage_file=str(path))
+
+
+def test_get_db_reuses_instance_and_refreshes(tmp_path):
+    path = tmp_path / "tweets.pickle.gz"
+    _write_db(path, ["a", "b"])
+
+    first = get_db(str(path), None, key="text")
+    assert [document["text"] for document in first.documents] == ["a", "b"]
+
+    _write_db(path, ["c"])
+    second = get_db(str(path), None, key="text")
+    assert second is first
+    assert [document["text"] for document in second.documents] == ["a", "b", "c"]
+    assert second.vectors.shape == (3, 4)
+
+
+def test_refresh_without_new_segments(tmp_path):
+    path = tmp_path / "tweets.pickle"
+    _write_db(path, ["a"])
+    db = VectorDB(None, embedding_function=lambda docs: None)
+    db.load(str(path))
+    assert db.refresh() == 0
+    _write_db(path, ["b", "c"])
+    assert db.refresh() == 2
+    assert len(db.documents) == db.vectors.shape[0] == 3
@@ -0,0 +1,258 @@
+"""
+Worker processes. Workers claim generation tasks and posts from the queue shared through the SQLite database, so
+generation (including image rendering) and slow network calls scale across cores, while the coordinator
+(Scheduler(coordinator=True), started by main.py if scheduler.workers is set in config.yaml) only evaluates cron
+triggers.
+A stuck or crashed worker only holds its own tasks, which return to the queue when their lease expires.
+Execute from command line (from the src directory) to add workers to a running coordinator:
+python worker.py --workers 2
+"""
+
+import os
+import time
+import socket
+import logging
+import argparse
+import threading
+import multiprocessing
+from contextlib import contextmanager
+
+import settings
+import scheduler
+from modules import sqlite_db, metrics, tracing
+
+TASK_LEASE_SECONDS = 300  # Renewed while the task runs, so only crashed or stuck workers lose their tasks
+TASK_TIMEOUT_SECONDS = 6 * 3600  # Leases are no longer renewed after this long (generation may wait for approval)
+TASK_RETRY_SECONDS = 60  # Delay before the first retry of a failed task. Doubles with every attempt.
+POLL_SECONDS = 5  # Idle workers check the queue this often
+DIGEST_SIZE = 10  # Generation tasks claimed at once if a digest auth function is configured
+METRICS_WRITE_SECONDS = 60  # Worker processes write their metrics file this often
+
+
+class Worker:
+    """
+    Worker that claims tasks from the shared queue. Posts are time critical, so due posts are always taken first.
+    """
+
+    def __init__(self, worker_id: str = None, poll_seconds: float = POLL_SECONDS):
+        """
+        :param worker_id: Worker id recorded with claimed tasks. Defaults to host and process id.
+        :param poll_seconds: Seconds to wait when the queue is empty
+        """
+        self.worker_id = worker_id or f"{socket.gethostname()}:{os.getpid()}"
+        self.poll_seconds = poll_seconds
+        self.config = settings.load()
+        self.db_file_path = self.config["paths"]["sql_database"]
+        self.logger = logging.getLogger(__name__)
+
+    def run(self, stop_event: threading.Event = None):
+        """
+        Work until stop_event is set (forever if None).
+        """
+        self.logger.info(f"Worker {self.worker_id} started.")
+        db = sqlite_db.Database(db_file_path=self.db_file_path)
+        db.create_outbox_table()
+        db.create_task_table()
+        db.close()
+
+        stop_event = stop_event or threading.Event()
+        while not stop_event.is_set():
+            try:
+                busy = self.run_once()
+            except Exception as e:
+                self.logger.exception(f"Worker {self.worker_id} failed: {e}")
+                busy = False
+            if not busy:
+                stop_event.wait(self.poll_seconds)
+
+    def run_once(self) -> bool:
+        """
+        Claim and run one post or one batch of generation tasks.
+        :return: True if anything was claimed
+        """
+        db = sqlite_db.Database(db_file_path=self.db_file_path)
+        try:
+            if scheduler.drain_outbox(db, max_posts=1):
+                return True
+
+            batch_auth_func = scheduler.load_function(self.config["scheduler"].get("digest_auth_func"))
+            token, tasks = db.claim_tasks(kind="generate",
+                                          worker_id=self.worker_id,
+                                          lease_seconds=TASK_LEASE_SECONDS,
+                                          limit=DIGEST_SIZE if batch_auth_func else 1)
+            if not tasks:
+                return False
+            with self._heartbeat(token):
+                self._generate(db, token, tasks, batch_auth_func)
+            return True
+        finally:
+            db.close()
+
+    @contextmanager
+    def _heartbeat(self, token: str):
+        """
+        Renew the leases of claimed tasks from a background thread while the block runs, up to TASK_TIMEOUT_SECONDS.
+        A task that runs longer is assumed stuck: its leases expire and it returns to the queue.
+        """
+        done = threading.Event()
+
+        def renew():
+            db = sqlite_db.Database(db_file_path=self.db_file_path)
+            deadline = time.monotonic() + TASK_TIMEOUT_SECONDS
+            while not done.wait(TASK_LEASE_SECONDS / 3) and time.monotonic() < deadline:
+                db.renew_task_leases(token, TASK_LEASE_SECONDS)
+            db.close()
+
+        thread = threading.Thread(target=renew, name="task_heartbeat", daemon=True)
+        thread.start()
+        try:
+            yield
+        finally:
+            done.set()
+            thread.join()
+
+    def _generate(self, db: sqlite_db.Database, token: str, tasks: list[dict], batch_auth_func: callable or None):
+        """
+        Generate and authorize the content objects of claimed tasks and store them for the coordinator to schedule.
+        """
+        content_objects = {co.hash: co for co in scheduler.assemble_content_objects()}
+        claimed = []
+        for task in tasks:
+            if task["key"] in content_objects:
+                claimed.append((task, content_objects[task["key"]]))
+            else:
+                # Removed from config.yaml since the task was enqueued
+                db.complete_task(task["id"], token)
+
+        try:
+            if batch_auth_func:
+                authorized = scheduler.gen_and_batch_auth_content_objects([co for _, co in claimed], batch_auth_func)
+            else:
+                authorized = [co for co in (scheduler.gen_and_auth_content_object(co) for _, co in claimed) if co]
+        except Exception as e:
+            self.logger.exception(f"Generation failed: {e}")
+            for task, _ in claimed:
+                self._fail(db, token, task, repr(e))
+            return
+
+        authorized_hashes = {co.hash for co in authorized}
+        for task, co in claimed:
+            if co.hash not in authorized_hashes:
+                self._fail(db, token, task, "Not authorized.")
+                continue
+            row = co.serialize()
+            db.create_table(table_name=co.__class__.__name__, fields=list(row.keys()))
+            db.update_many(table_name=co.__class__.__name__,
+                           fields=list(row.keys()),
+                           rows=[list(row.values())],
+                           key_field="hash")
+            db.complete_task(task["id"], token)
+            metrics.counter("worker_tasks_total", "Worker tasks by outcome").inc(state="done")
+            self.logger.info(f"Generated {co.__class__.__name__} {co.hash[:16]}.")
+
+    def _fail(self, db: sqlite_db.Database, token: str, task: dict, error: str):
+        attempts = task["attempts"]
+        retry_at = None
+        if attempts < scheduler.TASK_MAX_ATTEMPTS:
+            retry_at = time.time() + TASK_RETRY_SECONDS * 2 ** (attempts - 1)
+        db.fail_task(task["id"], token, error=error, retry_at=retry_at)
+        metrics.counter("worker_tasks_total", "Worker tasks by outcome").inc(state="pending" if retry_at else "failed")
+
+
+def _metrics_file(metrics_file: str, worker_name: str) -> str:
+    """
+    Get the metrics file of a worker process, e.g. ../logs/metrics.worker-0.prom for ../logs/metrics.prom.
+    """
+    root, ext = os.path.splitext(metrics_file)
+    return f"{root}.{worker_name}{ext}"
+
+
+def _write_metrics(path: str):
+    """
+    Write the metrics of this process to path every METRICS_WRITE_SECONDS.
+    """
+    while True:
+        time.sleep(METRICS_WRITE_SECONDS)
+        try:
+            metrics.write(path)
+        except OSError as e:
+            logging.getLogger(__name__).error(f"Failed to write metrics to {path}: {e}")
+
+
+def _run_worker(worker_id: str):
+    """
+    Entry point of worker processes. Spans are appended to the shared trace file, and metrics are written to a file
+    per worker next to the metrics file of the coordinator, labelled with the worker.
+    """
+    if not logging.getLogger().handlers:
+        logging.basicConfig(level=logging.INFO, format="%(levelname)s : %(asctime)s : %(name)s : %(message)s")
+    config = settings.load()
+    tracing.configure(config.get("tracing", {}).get("file"))
+    worker_name = worker_id.rsplit(":", 1)[-1]
+    metrics.set_process_labels(worker=worker_name)
+    if config.get("metrics", {}).get("file"):
+        threading.Thread(target=_write_metrics,
+                         args=(_metrics_file(config["metrics"]["file"], worker_name),),
+                         name="metrics_writer",
+                         daemon=True).start()
+    Worker(worker_id).run()
+
+
+class WorkerPool:
+    """
+    Fixed number of worker processes. Processes that exit are replaced by ensure().
+    """
+
+    def __init__(self, size: int):
+        """
+        :param size: Number of worker processes
+        """
+        self.size = size
+        self.logger = logging.getLogger(__name__)
+        self._context = multiprocessing.get_context("spawn")
+        self._processes: dict[str, multiprocessing.Process] = {}
+
+    def start(self):
+        self.ensure()
+        return self
+
+    def ensure(self):
+        """
+        Start missing worker processes and replace exited ones.
+        """
+        for i in range(self.size):
+            worker_id = f"{socket.gethostname()}:{os.getpid()}:worker-{i}"
+            process = self._processes.get(worker_id)
+            if process is not None and process.is_alive():
+                continue
+            if process is not None:
+                self.logger.warning(f"Worker {worker_id} exited with code {process.exitcode}. Restarting...")
+            process = self._context.Process(target=_run_worker, args=(worker_id,), name=worker_id, daemon=True)
+            process.start()
+            self._processes[worker_id] = process
+
+    def stop(self):
+        for process in self._processes.values():
+            process.terminate()
+        for process in self._processes.values():
+            process.join()
+
+
+def main():
+    # Get command line arguments
+    parser = argparse.ArgumentParser(description="Run worker processes for a coordinator started by main.py.")
+    parser.add_argument("--workers", type=int, default=1, help="Number of worker processes.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(levelname)s : %(asctime)s : %(name)s : %(message)s")
+    pool = WorkerPool(args.workers).start()
+    try:
+        while True:
+            time.sleep(30)
+            pool.ensure()
+    except KeyboardInterrupt:
+        pool.stop()
+
+
+if __name__ == "__main__":
+    main()